@@ -1,10 +1,11 @@
 import streamlit as st
 from datetime import date
+import smtplib
 import time
 
 # Import refactored cloud-ready modules
 from modules import credential_storage, preferences, report_generator, email_sender
-from modules import prompt_parser
+from modules import prompt_parser, parse_cache, outbox
 
 st.set_page_config(
     page_title="Email Automation System",
@@ -127,6 +128,8 @@ def init_session_state():
         st.session_state["refined_email_html"] = None
     if "show_refined" not in st.session_state:
         st.session_state["show_refined"] = False
+    if "incremental_parser" not in st.session_state:
+        st.session_state["incremental_parser"] = prompt_parser.IncrementalParser(prompt_parser.POLICY_WORKLOG)
 
 
 def sidebar_credentials():
@@ -181,12 +184,9 @@ def sidebar_credentials():
             if st.button("Login", use_container_width=True, type="primary"):
                 if email and app_password:
                     with st.spinner("Validating credentials..."):
-                        # Test SMTP connection
+                        # Test SMTP login; the session is pooled for the first send
                         try:
-                            import smtplib
-                            server = smtplib.SMTP_SSL("smtp.gmail.com", 465)
-                            server.login(email, app_password)
-                            server.quit()
+                            email_sender.validate_credentials(email, app_password)
                             
                             # Save to Supabase
                             if credential_storage.save_credentials(email, email, app_password):
@@ -296,6 +296,44 @@ def sidebar_credentials():
             **Database:** Supabase PostgreSQL  
             **SMTP:** Gmail (Port 465 SSL)
             """)
+            
+            cache_stats = parse_cache.get_parse_cache().stats()
+            st.caption(
+                f"Parse cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, "
+                f"{cache_stats['size_bytes'] // 1024} of {cache_stats['max_bytes'] // 1024} KB"
+            )
+            
+            response_stats = report_generator.get_response_cache().stats()
+            st.caption(
+                f"Response cache: {response_stats['memory_hits'] + response_stats['disk_hits']} hits "
+                f"({response_stats['disk_hits']} from disk) / {response_stats['misses']} misses"
+            )
+            
+            limiter_stats = report_generator.get_rate_limiter().stats()
+            st.caption(
+                f"Groq limiter: {limiter_stats['queue_depth']} queued, "
+                f"avg wait {limiter_stats['avg_wait_s']:.1f}s (max {limiter_stats['max_wait_s']:.1f}s), "
+                f"{limiter_stats['retries']} retries"
+            )
+            
+            flight_stats = report_generator.get_single_flight().stats()
+            st.caption(
+                f"Generations: {flight_stats['in_flight']} in flight, "
+                f"{flight_stats['shared']} duplicate requests coalesced"
+            )
+            
+            outbox_stats = outbox.get_outbox().stats()
+            st.caption(
+                f"Outbox: {outbox_stats['pending']} pending, {outbox_stats['retries']} retries, "
+                f"{outbox_stats['failed_stored']} failed"
+            )
+            
+            smtp_stats = email_sender.get_smtp_pool().stats()
+            st.caption(
+                f"SMTP pool: {smtp_stats['hit_rate']:.0%} reuse "
+                f"({smtp_stats['hits']} reused / {smtp_stats['misses']} new logins), "
+                f"{smtp_stats['idle']} idle, {smtp_stats['reconnects']} reconnects"
+            )
 
 
 def extract_manager_name_from_email(email: str) -> str:
@@ -355,9 +393,10 @@ def regenerate_refined_email(current_user, creds, user_prefs, stored_recipient,
     # Clear current refined state
     st.session_state["show_refined"] = False
     st.session_state["refined_email_html"] = None
+    st.session_state["tone_variants"] = None
     
     with st.spinner("Re-refining with AI..."):
-        tasks = prompt_parser.extract_tasks(original_prompt)
+        tasks = parse_cache.cached_extract_tasks(original_prompt)
         
         if not tasks:
             st.error("Could not extract any tasks.")
@@ -372,11 +411,15 @@ def regenerate_refined_email(current_user, creds, user_prefs, stored_recipient,
 
         manager_name = extract_manager_name_from_email(stored_recipient)
         
+        # Explicit regenerate: bypass the response cache
         report = report_generator.generate_email_report(
             tasks=tasks,
             manager_name=manager_name,
             tone=tone,
             sender_name=sender_name,
+            force_fresh=True,
+            fast_mode=st.session_state.get("fast_mode", False),
+            user_id=current_user,
         )
         
         if original_subject and original_subject.strip():
@@ -386,6 +429,8 @@ def regenerate_refined_email(current_user, creds, user_prefs, stored_recipient,
         
         # Store new refined email
         st.session_state["refined_email_html"] = report.body_html
+        st.session_state["refined_metadata"] = report.metadata
+        st.session_state["tone_variants"] = None
         st.session_state["refined_subject"] = final_subject
         st.session_state["refined_recipient"] = stored_recipient
         st.session_state["show_refined"] = True
@@ -393,6 +438,77 @@ def regenerate_refined_email(current_user, creds, user_prefs, stored_recipient,
     st.rerun()
 
 
+def update_refined_email(current_user, user_prefs, new_prompt):
+    """Apply work log edits to the refined email, regenerating only what changed."""
+    
+    original_recipient = st.session_state.get("original_recipient", "")
+    
+    with st.spinner("Updating tasks..."):
+        tasks = parse_cache.cached_extract_tasks(new_prompt)
+        
+        if not tasks:
+            st.error("Could not extract any tasks.")
+            st.stop()
+        
+        sender_name = user_prefs.get("sender_name", "") or "Team Member"
+        metadata = st.session_state.get("refined_metadata") or {}
+        
+        previous = report_generator.EmailReport(
+            subject=st.session_state.get("refined_subject", ""),
+            body_html=st.session_state["refined_email_html"],
+            metadata=metadata,
+        )
+        # An unchanged list would make regenerate_email_report rewrite the whole email
+        if not report_generator.tasks_changed(previous, tasks):
+            st.info("The task list is unchanged, so the email was left as it is.")
+            return
+        
+        report = report_generator.regenerate_email_report(
+            previous,
+            tasks=tasks,
+            manager_name=extract_manager_name_from_email(original_recipient),
+            tone=metadata.get("tone", st.session_state.get("email_tone", "formal")),
+            sender_name=sender_name,
+            user_id=current_user,
+        )
+        
+        st.session_state["original_prompt"] = new_prompt
+        st.session_state["refined_email_html"] = report.body_html
+        st.session_state["refined_metadata"] = report.metadata
+        st.session_state["tone_variants"] = None
+    
+    st.rerun()
+
+
+def compare_tone_variants(current_user, user_prefs):
+    """Generate every tone for the refined email in one AI call."""
+    
+    original_prompt = st.session_state.get("original_prompt", "")
+    original_recipient = st.session_state.get("original_recipient", "")
+    
+    with st.spinner("Writing all tones..."):
+        tasks = parse_cache.cached_extract_tasks(original_prompt)
+        
+        if not tasks:
+            st.error("Could not extract any tasks.")
+            st.stop()
+        
+        sender_name = user_prefs.get("sender_name", "") or "Team Member"
+        
+        variants = report_generator.generate_tone_variants(
+            tasks=tasks,
+            manager_name=extract_manager_name_from_email(original_recipient),
+            sender_name=sender_name,
+            user_id=current_user,
+        )
+        
+        st.session_state["tone_variants"] = {tone: report.body_html for tone, report in variants.items()}
+        st.session_state["tone_variant_metadata"] = {tone: report.metadata for tone, report in variants.items()}
+        st.session_state.pop("tone_variant_choice", None)
+    
+    st.rerun()
+
+
 def html_to_plain_text(html_content: str) -> str:
     """Convert HTML email to editable plain text format with proper spacing."""
     import re
@@ -528,6 +644,8 @@ def clear_form():
     st.session_state["form_cleared"] = True
     st.session_state["show_refined"] = False
     st.session_state["refined_email_html"] = None
+    st.session_state["refined_metadata"] = None
+    st.session_state["tone_variants"] = None
 
     # Clear refined states
     if "refined_subject" in st.session_state:
@@ -581,6 +699,13 @@ def main():
         st.session_state["is_authenticated"] = False
         st.rerun()
     
+    # Lets the outbox deliver this account's mail queued before a restart
+    outbox.get_outbox().remember_credentials(creds["email"], creds["app_password"])
+    
+    show_send_result()
+    if st.session_state.get("send_job"):
+        render_send_status()
+    
     # Instructions
     with st.expander("How to use", expanded=False):
         st.markdown("""
@@ -663,6 +788,12 @@ def main():
             label_visibility="collapsed"
         )
     
+    st.checkbox(
+        "Fast mode (instant template, no AI)",
+        key="fast_mode",
+        help="Render the email from the built-in template instead of calling the AI model",
+    )
+    
     # Initialize session state for templates
     if "raw_prompt_value" not in st.session_state:
         st.session_state["raw_prompt_value"] = ""
@@ -733,6 +864,12 @@ def main():
             if raw_prompt != template_content:
                 st.session_state["last_selected_template"] = "Custom"
 
+    # Live preview: only lines changed since the last rerun are reclassified
+    detected_tasks = st.session_state["incremental_parser"].update(raw_prompt)
+    if detected_tasks:
+        with st.expander(f"{len(detected_tasks)} tasks detected", expanded=False):
+            st.markdown("\n".join(f"- {task}" for task in detected_tasks))
+
     # Action buttons
     col1, col2, col3 = st.columns([1, 1, 1])
 
@@ -789,6 +926,36 @@ def main():
         st.markdown("---")
         st.markdown("### Refined Email")
         
+        # Switch between cached tone variants without another AI call
+        tone_variants = st.session_state.get("tone_variants")
+        if tone_variants:
+            variant_tones = list(tone_variants)
+            current_tone = st.session_state.get("email_tone", "formal")
+            chosen_tone = st.radio(
+                "Tone variant",
+                options=variant_tones,
+                index=variant_tones.index(current_tone) if current_tone in variant_tones else 0,
+                format_func=str.capitalize,
+                horizontal=True,
+                key="tone_variant_choice",
+            )
+            st.session_state["refined_email_html"] = tone_variants[chosen_tone]
+            # Each variant may have its own origin (LLM or per-tone template fallback)
+            st.session_state["refined_metadata"] = st.session_state.get("tone_variant_metadata", {}).get(chosen_tone)
+        elif st.button("Compare all tones", help="Write formal, neutral and friendly versions in one AI call"):
+            compare_tone_variants(current_user, user_prefs)
+        
+        with st.expander("Edit tasks"):
+            edited_prompt = st.text_area(
+                "Work log",
+                value=st.session_state.get("original_prompt", ""),
+                height=150,
+                key="refined_prompt_editor",
+                help="Add, remove or reword tasks; only the changed items are regenerated",
+            )
+            if st.button("Update email"):
+                update_refined_email(current_user, user_prefs, edited_prompt)
+        
         # Convert HTML to editable plain text
         plain_text = html_to_plain_text(st.session_state["refined_email_html"])
         
@@ -852,7 +1019,7 @@ def handle_send(current_user, creds, user_prefs, recipient_email, subject_input,
     """Handle 'Send' button - send without AI refinement."""
     
     with st.spinner("Processing your work log..."):
-        tasks = prompt_parser.extract_tasks(raw_prompt)
+        tasks = parse_cache.cached_extract_tasks(raw_prompt)
         
         if not tasks:
             st.error("Could not extract any tasks.")
@@ -883,46 +1050,126 @@ def handle_send(current_user, creds, user_prefs, recipient_email, subject_input,
 </body>
 </html>"""
     
-    st.markdown("---")
-    st.markdown("### Sending Email")
+    queue_send(creds, recipient_email, subject, html_body, cc_emails, bcc_emails, effect="snow")
+
+
+def queue_send(creds, recipient_email, subject, html_body, cc_emails, bcc_emails, effect="balloons"):
+    """
+    Hand the email to the background outbox and rerun to follow its progress.
+    Returns False, without queueing, while an earlier send is still pending.
+    """
     
-    try:
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        status_text.text("Preparing email...")
-        progress_bar.progress(25)
-        time.sleep(0.3)
-        
-        status_text.text("Connecting to Gmail...")
-        progress_bar.progress(50)
-        time.sleep(0.3)
-        
-        status_text.text("Sending email...")
-        progress_bar.progress(75)
-        
-        email_sender.send_email(
-            from_email=creds["email"],
-            app_password=creds["app_password"],
-            to_email=recipient_email,
-            subject=subject,
-            html_body=html_body,
-            cc_emails=cc_emails,
-            bcc_emails=bcc_emails,
+    send_job = st.session_state.get("send_job")
+    if send_job:
+        # The earlier send must not clear the form that still holds this email
+        send_job["keep_form"] = True
+        st.error(
+            "Send rejected: an earlier email is still being sent. "
+            "This email was kept, so you can send it once that one finishes."
         )
-        
-        progress_bar.progress(100)
-        status_text.text("Email sent successfully!")
-        
-        st.success(f"**Email sent to {recipient_email}!**")
-        st.snow()
-        
-        time.sleep(2)
-        clear_form()
+        return False
+    
+    st.session_state.pop("send_result", None)
+    job_id = outbox.get_outbox().submit(
+        from_email=creds["email"],
+        app_password=creds["app_password"],
+        to_email=recipient_email,
+        subject=subject,
+        html_body=html_body,
+        cc_emails=cc_emails,
+        bcc_emails=bcc_emails,
+    )
+    st.session_state["send_job"] = {"job_id": job_id, "recipient": recipient_email, "effect": effect}
+    st.rerun()
+
+
+SEND_PROGRESS = {
+    outbox.QUEUED: (25, "Queued..."),
+    outbox.CONNECTING: (60, "Connecting to Gmail and sending..."),
+    outbox.RETRYING: (40, "Gmail is busy, retrying shortly..."),
+    outbox.SENT: (100, "Email sent successfully!"),
+    outbox.FAILED: (100, "Sending failed"),
+}
+
+
+@st.fragment(run_every=0.5)
+def render_send_status():
+    """Poll the outbox job for the current send without blocking the page."""
+    
+    send_job = st.session_state.get("send_job")
+    if not send_job:
+        return
+    
+    job = outbox.get_outbox().status(send_job["job_id"])
+    if job is None:
+        st.session_state.pop("send_job", None)
         st.rerun()
     
-    except Exception as e:
-        st.error(f"Failed to send email: {str(e)}")
+    st.markdown("### Sending Email")
+    progress, label = SEND_PROGRESS[job.state]
+    st.progress(progress, text=label)
+    if job.state == outbox.RETRYING:
+        st.caption(f"Attempt {job.attempts} failed: {job.error}")
+    
+    if job.done:
+        st.session_state.pop("send_job", None)
+        st.session_state["send_result"] = {**send_job, "state": job.state, "error": job.error}
+        if job.state == outbox.SENT and not send_job.get("keep_form"):
+            clear_form()
+        st.rerun()
+
+
+def show_send_result():
+    """Report the outcome of the last finished send; failures stay until retried or dismissed."""
+    
+    result = st.session_state.get("send_result")
+    if not result:
+        return
+    
+    if result["state"] == outbox.SENT:
+        st.session_state.pop("send_result", None)
+        st.success(f"**Email sent to {result['recipient']}!**")
+        if result["effect"] == "snow":
+            st.snow()
+        else:
+            st.balloons()
+        return
+    
+    st.error(f"Failed to send email: {result['error']}")
+    col1, col2 = st.columns(2)
+    with col1:
+        # The outbox still holds the rendered message, so nothing is regenerated
+        if st.button("Retry sending", use_container_width=True):
+            st.session_state.pop("send_result", None)
+            if outbox.get_outbox().retry(result["job_id"]):
+                st.session_state["send_job"] = {
+                    key: result[key] for key in ("job_id", "recipient", "effect", "keep_form") if key in result
+                }
+            st.rerun()
+    with col2:
+        if st.button("Dismiss", use_container_width=True):
+            st.session_state.pop("send_result", None)
+            st.rerun()
+
+
+def render_streaming_preview(stream, placeholder, height: int = 600, min_interval: float = 0.15):
+    """
+    Render a ReportStream into a placeholder as chunks arrive.
+    Redraws are throttled to min_interval seconds; returns the final report.
+    """
+    html = ""
+    last_render = 0.0
+    for chunk in stream:
+        html += chunk
+        now = time.monotonic()
+        if now - last_render >= min_interval:
+            with placeholder.container():
+                st.components.v1.html(html, height=height, scrolling=True)
+            last_render = now
+    
+    with placeholder.container():
+        st.components.v1.html(stream.report.body_html, height=height, scrolling=True)
+    return stream.report
 
 
 def handle_refine(current_user, creds, user_prefs, recipient_email, subject_input, raw_prompt):
@@ -933,7 +1180,7 @@ def handle_refine(current_user, creds, user_prefs, recipient_email, subject_inpu
     st.session_state["original_recipient"] = recipient_email
 
     with st.spinner("Refining with AI..."):
-        tasks = prompt_parser.extract_tasks(raw_prompt)
+        tasks = parse_cache.cached_extract_tasks(raw_prompt)
         
         if not tasks:
             st.error("Could not extract any tasks.")
@@ -948,12 +1195,16 @@ def handle_refine(current_user, creds, user_prefs, recipient_email, subject_inpu
 
         manager_name = extract_manager_name_from_email(recipient_email)
         
-        report = report_generator.generate_email_report(
+        st.markdown("### Email Preview")
+        stream = report_generator.stream_email_report(
             tasks=tasks,
             manager_name=manager_name,
             tone=tone,
             sender_name=sender_name,
+            fast_mode=st.session_state.get("fast_mode", False),
+            user_id=current_user,
         )
+        report = render_streaming_preview(stream, st.empty())
         
         if subject_input and subject_input.strip():
             final_subject = subject_input.strip()
@@ -961,6 +1212,8 @@ def handle_refine(current_user, creds, user_prefs, recipient_email, subject_inpu
             final_subject = report.subject
         
         st.session_state["refined_email_html"] = report.body_html
+        st.session_state["refined_metadata"] = report.metadata
+        st.session_state["tone_variants"] = None
         st.session_state["refined_subject"] = final_subject
         st.session_state["refined_recipient"] = recipient_email
         st.session_state["show_refined"] = True
@@ -972,7 +1225,7 @@ def handle_refine_and_send(current_user, creds, user_prefs, recipient_email, sub
     """Handle 'Refine & Send' button - generate and send immediately."""
     
     with st.spinner("✨ Refining with AI..."):
-        tasks = prompt_parser.extract_tasks(raw_prompt)
+        tasks = parse_cache.cached_extract_tasks(raw_prompt)
         
         if not tasks:
             st.error("Could not extract any tasks.")
@@ -987,63 +1240,45 @@ def handle_refine_and_send(current_user, creds, user_prefs, recipient_email, sub
 
         manager_name = extract_manager_name_from_email(recipient_email)
         
-        report = report_generator.generate_email_report(
-            tasks=tasks,
-            manager_name=manager_name,
-            tone=tone,
-            sender_name=sender_name,
-        )
+        st.markdown("---")
+        st.markdown("### Email Preview")
+        
+        with st.expander("View Email Content", expanded=True):
+            stream = report_generator.stream_email_report(
+                tasks=tasks,
+                manager_name=manager_name,
+                tone=tone,
+                sender_name=sender_name,
+                fast_mode=st.session_state.get("fast_mode", False),
+                user_id=current_user,
+                latency_budget=report_generator.LLM_LATENCY_BUDGET_SECONDS,
+            )
+            report = render_streaming_preview(stream, st.empty())
+        
+        if report.metadata.get("hedge_outcome") == "template":
+            st.info("AI response was slow, so the standard template is being sent.")
         
         if subject_input and subject_input.strip():
             final_subject = subject_input.strip()
         else:
             final_subject = report.subject
     
-    st.markdown("---")
-    st.markdown("### Email Preview")
-    
-    with st.expander("View Email Content", expanded=True):
-        st.components.v1.html(report.body_html, height=600, scrolling=True)
-    
-    st.markdown("### Sending Email...")
-    
-    try:
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        status_text.text("Preparing email...")
-        progress_bar.progress(25)
-        time.sleep(0.3)
-        
-        status_text.text("Connecting to Gmail...")
-        progress_bar.progress(50)
-        time.sleep(0.3)
-        
-        status_text.text("Sending email...")
-        progress_bar.progress(75)
-        
-        email_sender.send_email(
-            from_email=creds["email"],
-            app_password=creds["app_password"],
-            to_email=recipient_email,
-            subject=final_subject,
-            html_body=report.body_html,
-            cc_emails=user_prefs.get("cc_emails", ""),
-            bcc_emails=user_prefs.get("bcc_emails", ""),
-        )
-        
-        progress_bar.progress(100)
-        status_text.text("Email sent successfully!")
-        
-        st.success(f"**Email sent to {recipient_email}!**")
-        st.balloons()
-        
-        time.sleep(2)
-        clear_form()
-        st.rerun()
-    
-    except Exception as e:
-        st.error(f"Failed to send email: {str(e)}")
+    queued = queue_send(
+        creds,
+        recipient_email,
+        final_subject,
+        report.body_html,
+        user_prefs.get("cc_emails", ""),
+        user_prefs.get("bcc_emails", ""),
+    )
+    if not queued:
+        # Keep the generated email in the refined view so it can be sent later
+        st.session_state["refined_email_html"] = report.body_html
+        st.session_state["refined_metadata"] = report.metadata
+        st.session_state["tone_variants"] = None
+        st.session_state["refined_subject"] = final_subject
+        st.session_state["refined_recipient"] = recipient_email
+        st.session_state["show_refined"] = True
 
 
 def send_refined_email_action(current_user, creds, user_prefs, recipient_email, subject_input, edited_content):
@@ -1064,42 +1299,14 @@ def send_refined_email_action(current_user, creds, user_prefs, recipient_email,
     else:
         final_subject = st.session_state.get("refined_subject", "Daily Task Report")
     
-    st.markdown("---")
-    st.markdown("### Sending Refined Email...")
-    
-    try:
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        status_text.text("Preparing...")
-        progress_bar.progress(33)
-        time.sleep(0.3)
-        
-        status_text.text("Sending...")
-        progress_bar.progress(66)
-        
-        email_sender.send_email(
-            from_email=creds["email"],
-            app_password=creds["app_password"],
-            to_email=recipient_email,
-            subject=final_subject,
-            html_body=html_body,
-            cc_emails=user_prefs.get("cc_emails", ""),
-            bcc_emails=user_prefs.get("bcc_emails", ""),
-        )
-        
-        progress_bar.progress(100)
-        status_text.text("Sent!")
-        
-        st.success(f"**Email sent to {recipient_email}!**")
-        st.balloons()
-        
-        time.sleep(2)
-        clear_form()
-        st.rerun()
-    
-    except Exception as e:
-        st.error(f"Failed to send: {str(e)}")
+    queue_send(
+        creds,
+        recipient_email,
+        final_subject,
+        html_body,
+        user_prefs.get("cc_emails", ""),
+        user_prefs.get("bcc_emails", ""),
+    )
 
 
 if __name__ == "__main__":
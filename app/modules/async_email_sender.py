@@ -0,0 +1,240 @@
+"""Asyncio email delivery for batch jobs, independent of Streamlit."""
+import asyncio
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import aiosmtplib
+
+from .email_sender import build_message
+from .smtp_pool import SMTP_HOST, SMTP_POOL_IDLE_TIMEOUT, SMTP_PORT, _account_key
+
+ASYNC_SMTP_MAX_CONCURRENCY = int(os.getenv("ASYNC_SMTP_MAX_CONCURRENCY", "50"))
+# Gmail rejects logins beyond a handful of simultaneous sessions per account
+ASYNC_SMTP_MAX_PER_ACCOUNT = int(os.getenv("ASYNC_SMTP_MAX_PER_ACCOUNT", "5"))
+SMTP_CONNECT_TIMEOUT = float(os.getenv("SMTP_CONNECT_TIMEOUT", "15"))
+SMTP_AUTH_TIMEOUT = float(os.getenv("SMTP_AUTH_TIMEOUT", "15"))
+SMTP_DATA_TIMEOUT = float(os.getenv("SMTP_DATA_TIMEOUT", "60"))
+
+# The server answered and aiosmtplib sent RSET, so the connection is still
+# usable (same rule as smtp_pool.SESSION_INTACT_ERRORS); SMTPNotSupported is
+# raised before any command is sent
+SESSION_INTACT_ERRORS = (
+    aiosmtplib.SMTPResponseException,
+    aiosmtplib.SMTPRecipientsRefused,
+    aiosmtplib.SMTPNotSupported,
+)
+
+
+class AsyncEmailSender:
+    """
+    Sends email concurrently from one event loop over aiosmtplib.
+
+    At most max_concurrency sends run at once overall, and at most
+    max_per_account for any one sender address. Each account keeps up to
+    max_per_account authenticated connections open between sends, so a
+    batch pays the TLS handshake and AUTH once per connection rather than
+    once per message. A connection stays open after the server rejects a
+    recipient or the message, and is closed once idle for idle_timeout.
+    Connect, AUTH and each transaction command (MAIL, RCPT, DATA) have
+    their own timeout.
+
+    Bound to the event loop it is first used on; use it as an async
+    context manager, or call aclose(), to close idle connections.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = ASYNC_SMTP_MAX_CONCURRENCY,
+        max_per_account: int = ASYNC_SMTP_MAX_PER_ACCOUNT,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        connect_timeout: float = SMTP_CONNECT_TIMEOUT,
+        auth_timeout: float = SMTP_AUTH_TIMEOUT,
+        data_timeout: float = SMTP_DATA_TIMEOUT,
+        idle_timeout: float = SMTP_POOL_IDLE_TIMEOUT,
+    ):
+        if max_concurrency < 1 or max_per_account < 1:
+            raise ValueError("concurrency limits must be at least 1")
+        self.max_per_account = max_per_account
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.auth_timeout = auth_timeout
+        self.data_timeout = data_timeout
+        self.idle_timeout = idle_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._account_semaphores: Dict[str, asyncio.Semaphore] = {}
+        # Per login (address + password hash): (connection, monotonic time it was last returned)
+        self._idle: Dict[str, List[Tuple[aiosmtplib.SMTP, float]]] = {}
+        self.counters = {"sent": 0, "failed": 0, "connects": 0, "reused": 0, "expired": 0}
+
+    async def __aenter__(self) -> "AsyncEmailSender":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def _connect(self, from_email: str, app_password: str) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(
+            hostname=self.host,
+            port=self.port,
+            use_tls=self.port == 465,
+            timeout=self.data_timeout,
+        )
+        await client.connect(timeout=self.connect_timeout)
+        try:
+            await client.login(from_email, app_password, timeout=self.auth_timeout)
+        except BaseException:
+            client.close()
+            raise
+        self.counters["connects"] += 1
+        return client
+
+    async def _quit(self, client: aiosmtplib.SMTP) -> None:
+        try:
+            await client.quit(timeout=self.connect_timeout)
+        except Exception:
+            client.close()
+
+    async def _prune(self, now: float) -> None:
+        """Close connections idle longer than idle_timeout, for every account."""
+        stale = []
+        for key in list(self._idle):
+            idle = self._idle[key]
+            keep = [entry for entry in idle if now - entry[1] <= self.idle_timeout]
+            stale.extend(client for client, last_used in idle if now - last_used > self.idle_timeout)
+            if keep:
+                self._idle[key] = keep
+            else:
+                del self._idle[key]
+        self.counters["expired"] += len(stale)
+        for client in stale:
+            await self._quit(client)
+
+    async def _checkout(self, key: str, from_email: str, app_password: str):
+        # Keyed by password too, so a changed or revoked password never reuses a session
+        await self._prune(time.monotonic())
+        idle = self._idle.get(key)
+        while idle:
+            client, _ = idle.pop()
+            if client.is_connected:
+                self.counters["reused"] += 1
+                return client, True
+        return await self._connect(from_email, app_password), False
+
+    def _checkin(self, key: str, client: aiosmtplib.SMTP) -> None:
+        # The account semaphore caps open connections at max_per_account
+        if client.is_connected:
+            self._idle.setdefault(key, []).append((client, time.monotonic()))
+
+    async def _deliver(self, from_email: str, app_password: str, recipients: List[str], message: str) -> None:
+        key = _account_key(from_email, app_password)
+        client, reused = await self._checkout(key, from_email, app_password)
+        try:
+            await client.sendmail(from_email, recipients, message, timeout=self.data_timeout)
+        except SESSION_INTACT_ERRORS:
+            self._checkin(key, client)
+            raise
+        except aiosmtplib.SMTPServerDisconnected:
+            client.close()
+            if not reused:
+                raise
+            # The server dropped an idle connection; one fresh attempt
+            client = await self._connect(from_email, app_password)
+            try:
+                await client.sendmail(from_email, recipients, message, timeout=self.data_timeout)
+            except SESSION_INTACT_ERRORS:
+                self._checkin(key, client)
+                raise
+            except BaseException:
+                client.close()
+                raise
+        except BaseException:
+            client.close()
+            raise
+        self._checkin(key, client)
+
+    async def send_email(
+        self,
+        from_email: str,
+        app_password: str,
+        to_email: str,
+        subject: str,
+        html_body: str,
+        text_body: str = None,
+        cc_emails: str = "",
+        bcc_emails: str = "",
+    ) -> None:
+        """
+        Async counterpart of email_sender.send_email.
+
+        Args:
+            from_email: Sender's Gmail address
+            app_password: Gmail app password
+            to_email: Recipient's email address
+            subject: Email subject
+            html_body: HTML version of email body
+            text_body: Plain text version (optional)
+            cc_emails: Comma-separated CC emails (optional)
+            bcc_emails: Comma-separated BCC emails (optional)
+
+        Raises:
+            aiosmtplib.SMTPException: If Gmail rejects the login or the
+                message, or a step exceeds its timeout
+        """
+        msg, all_recipients = build_message(
+            from_email, to_email, subject, html_body, text_body, cc_emails, bcc_emails
+        )
+        account_semaphore = self._account_semaphores.setdefault(
+            _account_key(from_email, app_password), asyncio.Semaphore(self.max_per_account)
+        )
+        async with self._semaphore, account_semaphore:
+            try:
+                await self._deliver(from_email, app_password, all_recipients, msg.as_string())
+            except Exception as e:
+                self.counters["failed"] += 1
+                print(f"Failed to send email to {to_email}: {e}")
+                raise
+        self.counters["sent"] += 1
+
+    async def aclose(self) -> None:
+        """Close every idle connection."""
+        clients = [client for idle in self._idle.values() for client, _ in idle]
+        self._idle.clear()
+        for client in clients:
+            await self._quit(client)
+
+
+async def asend_many(
+    messages: Iterable[Dict[str, Any]],
+    sender: Optional[AsyncEmailSender] = None,
+    return_exceptions: bool = True,
+) -> List[Union[None, BaseException]]:
+    """
+    Send many emails concurrently from one event loop.
+
+    Args:
+        messages: Keyword arguments for AsyncEmailSender.send_email, one dict per email
+        sender: Sender to use (defaults to a new one, closed afterwards)
+        return_exceptions: Put failures in the result list instead of raising
+
+    Returns:
+        One entry per message in input order: None when sent, or the
+        exception raised for it when return_exceptions is set
+    """
+    if sender is not None:
+        return await asyncio.gather(
+            *(sender.send_email(**kwargs) for kwargs in messages),
+            return_exceptions=return_exceptions,
+        )
+    async with AsyncEmailSender() as owned:
+        return await asend_many(messages, owned, return_exceptions)
+
+
+def send_many(
+    messages: Iterable[Dict[str, Any]],
+    return_exceptions: bool = True,
+) -> List[Union[None, BaseException]]:
+    """Blocking wrapper around asend_many for scripts and cron jobs."""
+    return asyncio.run(asend_many(messages, return_exceptions=return_exceptions))
@@ -0,0 +1,295 @@
+"""Asyncio report generation for batch jobs, independent of Streamlit."""
+import asyncio
+import os
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from .report_core import (
+    GROQ_MODEL,
+    EmailReport,
+    bind_output_budget,
+    cached_report,
+    clean_html_response,
+    create_groq_client,
+    prepare_request,
+    reserved_tokens,
+    store_report,
+    tokens_used,
+)
+from .prompt_builder import BuiltPrompt
+from .rate_limiter import (
+    GROQ_MAX_RETRIES,
+    AcquireTicket,
+    RateLimiter,
+    RateLimitTimeout,
+    backoff_delay,
+    is_retryable,
+)
+from .response_cache import ResponseCache
+from .template_renderer import render_fallback_report, render_template_report
+
+ASYNC_MAX_CONCURRENCY = int(os.getenv("ASYNC_MAX_CONCURRENCY", "8"))
+ASYNC_REQUEST_TIMEOUT = float(os.getenv("ASYNC_REQUEST_TIMEOUT", "60"))
+
+_default_client = None
+_default_cache: Optional[ResponseCache] = None
+_default_limiter: Optional[RateLimiter] = None
+
+
+def _get_client():
+    """Lazily create the shared Groq client from GROQ_API_KEY."""
+    global _default_client
+    if _default_client is None:
+        _default_client = create_groq_client()
+    return _default_client
+
+
+def _get_cache() -> ResponseCache:
+    """Lazily open the shared response cache (same store as the app)."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
+
+
+def _get_limiter() -> RateLimiter:
+    """Lazily create the process-wide rate limiter for batch runs."""
+    global _default_limiter
+    if _default_limiter is None:
+        _default_limiter = RateLimiter()
+    return _default_limiter
+
+
+async def _acquire(
+    limiter: RateLimiter, user_id: str, tokens: int, timeout: Optional[float] = None
+) -> None:
+    """
+    Wait for rate-limit capacity without blocking the event loop. If the
+    awaiting task is cancelled, the waiter leaves the queue (or its grant
+    is refunded) instead of holding capacity nobody will use.
+
+    Raises:
+        RateLimitTimeout: If no capacity is granted within timeout
+    """
+    ticket = AcquireTicket()
+    try:
+        # acquire blocks on a threading.Condition, so keep it off the event loop
+        await asyncio.to_thread(limiter.acquire, user_id, tokens, timeout, ticket)
+    except asyncio.CancelledError:
+        limiter.cancel(ticket)
+        raise
+
+
+async def _ainvoke_with_retry(
+    llm,
+    prompt: BuiltPrompt,
+    limiter: RateLimiter,
+    user_id: str,
+    timeout: Optional[float],
+):
+    """
+    Rate-limited ainvoke with jittered exponential backoff on retryable
+    errors. timeout is one deadline for the whole call: queueing behind
+    the rate limiter, every attempt and every backoff sleep count against
+    it. An attempt cut off by the deadline is not retried, and a retry is
+    only scheduled if its backoff ends before the deadline. Each granted
+    reservation is settled: a failed attempt returns all of it, a
+    successful one whatever the response did not use.
+
+    Raises:
+        asyncio.TimeoutError: If the deadline passes; the message gives
+            the elapsed time and number of attempts
+    """
+    tokens = reserved_tokens(prompt)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = None if timeout is None else started + timeout
+
+    def remaining() -> Optional[float]:
+        return None if deadline is None else deadline - loop.time()
+
+    def expired(attempts: int) -> asyncio.TimeoutError:
+        return asyncio.TimeoutError(
+            f"no response after {loop.time() - started:.1f}s of a {timeout}s budget "
+            f"({attempts} attempt{'s' if attempts != 1 else ''})"
+        )
+
+    attempt = 0
+    while True:
+        left = remaining()
+        if left is not None and left <= 0:
+            raise expired(attempt)
+        try:
+            await _acquire(limiter, user_id, tokens, left)
+        except RateLimitTimeout:
+            raise expired(attempt) from None
+
+        try:
+            response = await asyncio.wait_for(llm.ainvoke(prompt.messages), remaining())
+        except asyncio.TimeoutError as e:
+            limiter.settle(tokens)
+            # Our own deadline; retrying could only overrun it
+            if deadline is not None:
+                raise expired(attempt + 1) from e
+            error = e
+        except asyncio.CancelledError:
+            limiter.settle(tokens)
+            raise
+        except Exception as e:
+            limiter.settle(tokens)
+            error = e
+        else:
+            limiter.settle(tokens, tokens_used(prompt, response))
+            return response
+
+        left = remaining()
+        if left is not None and left <= 0:
+            raise expired(attempt + 1) from error
+        if not is_retryable(error) or attempt >= GROQ_MAX_RETRIES:
+            raise error
+        delay = backoff_delay(attempt, error)
+        if left is not None and delay >= left:
+            raise expired(attempt + 1) from error
+        print(f"Groq call failed ({type(error).__name__}), retry {attempt + 1} in {delay:.1f}s")
+        limiter.record_retry()
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def agenerate_email_report(
+    tasks: List[str],
+    manager_name: str = "Manager",
+    report_date: Optional[date] = None,
+    tone: str = "formal",
+    sender_name: str = "",
+    force_fresh: bool = False,
+    fast_mode: bool = False,
+    fallback_on_error: bool = True,
+    llm=None,
+    cache: Optional[ResponseCache] = None,
+    timeout: Optional[float] = ASYNC_REQUEST_TIMEOUT,
+    limiter: Optional[RateLimiter] = None,
+    user_id: str = "batch",
+) -> EmailReport:
+    """
+    Async counterpart of report_generator.generate_email_report.
+
+    Args:
+        tasks: List of completed tasks
+        manager_name: Recipient's name for greeting
+        report_date: Date of report (defaults to today)
+        tone: Email tone (formal/neutral/friendly)
+        sender_name: Name to sign email with
+        force_fresh: Skip the cache lookup (the fresh result is still cached)
+        fast_mode: Render the offline template instead of calling the LLM
+        fallback_on_error: Return the template report if the model call
+            fails or times out, instead of raising
+        llm: Chat model to use (defaults to a Groq client from GROQ_API_KEY)
+        cache: Response cache (defaults to the shared on-disk cache)
+        timeout: Overall seconds allowed for the model call, including
+            rate-limit waits, retries and backoff; None for no limit
+        limiter: Rate limiter (defaults to the process-wide limiter)
+        user_id: Caller identity for fair scheduling under the limiter
+
+    Returns:
+        EmailReport with subject and HTML body
+
+    Raises:
+        asyncio.TimeoutError: If no response arrives within timeout and
+            fallback_on_error is not set
+    """
+    if fast_mode:
+        return render_template_report(tasks, manager_name, report_date, tone, sender_name)
+
+    request = prepare_request(tasks, manager_name, report_date, tone, sender_name)
+    cache = cache or _get_cache()
+
+    if not force_fresh:
+        cached = await asyncio.to_thread(cached_report, cache, request)
+        if cached is not None:
+            return cached
+
+    llm = bind_output_budget(llm or _get_client(), request)
+
+    try:
+        response = await _ainvoke_with_retry(
+            llm, request.prompt, limiter or _get_limiter(), user_id, timeout
+        )
+    except asyncio.TimeoutError as e:
+        print(f"Groq API timed out: {e} ({len(request.tasks)} tasks)")
+        if fallback_on_error:
+            return render_fallback_report(request, e)
+        raise
+    except Exception as e:
+        print(f"Groq API failed: {e}")
+        if fallback_on_error:
+            return render_fallback_report(request, e)
+        raise
+
+    body_html = clean_html_response(response.content)
+    return await asyncio.to_thread(
+        store_report,
+        cache,
+        request,
+        body_html,
+        {"generation_method": "groq", "model": GROQ_MODEL},
+    )
+
+
+async def agenerate_many(
+    requests: Iterable[Dict[str, Any]],
+    max_concurrency: int = ASYNC_MAX_CONCURRENCY,
+    timeout: Optional[float] = ASYNC_REQUEST_TIMEOUT,
+    llm=None,
+    cache: Optional[ResponseCache] = None,
+    return_exceptions: bool = True,
+) -> List[Union[EmailReport, BaseException]]:
+    """
+    Generate many reports concurrently.
+
+    At most max_concurrency requests run at once; timeout bounds each
+    request's model call end to end, rate-limit waits and retries
+    included, but not the time spent waiting for a concurrency slot.
+    Cancelling the returned coroutine cancels every pending request and
+    withdraws their rate-limit waits. The Groq client is only created if
+    some request actually needs the model.
+
+    Args:
+        requests: Keyword arguments for agenerate_email_report, one dict per report
+        max_concurrency: Maximum simultaneous generations
+        timeout: Per-request deadline in seconds for the model call
+        llm: Chat model shared by all requests (defaults to a Groq client
+            from GROQ_API_KEY, created on first use)
+        cache: Response cache shared by all requests
+        return_exceptions: Put failures in the result list instead of raising
+
+    Returns:
+        Results in the same order as requests: an EmailReport, or the
+        exception raised for that request when return_exceptions is set
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(kwargs: Dict[str, Any]) -> EmailReport:
+        async with semaphore:
+            return await agenerate_email_report(
+                **kwargs, llm=llm, cache=cache, timeout=timeout
+            )
+
+    return await asyncio.gather(
+        *(run(kwargs) for kwargs in requests), return_exceptions=return_exceptions
+    )
+
+
+def generate_many(
+    requests: Iterable[Dict[str, Any]],
+    max_concurrency: int = ASYNC_MAX_CONCURRENCY,
+    timeout: Optional[float] = ASYNC_REQUEST_TIMEOUT,
+    **kwargs,
+) -> List[Union[EmailReport, BaseException]]:
+    """Blocking wrapper around agenerate_many for scripts and cron jobs."""
+    return asyncio.run(
+        agenerate_many(requests, max_concurrency=max_concurrency, timeout=timeout, **kwargs)
+    )
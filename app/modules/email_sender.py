@@ -1,31 +1,57 @@
+import os
+import re
 import smtplib
+import time
+from dataclasses import dataclass
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from typing import Optional
+from html import escape
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
+from .smtp_pool import DISCONNECT_ERRORS, SESSION_INTACT_ERRORS, SMTPPool
 
-def send_email(
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "20"))
+BULK_BATCH_PAUSE_SECONDS = float(os.getenv("BULK_BATCH_PAUSE_SECONDS", "1.0"))
+
+MERGE_FIELD_REGEX = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+_default_pool: Optional[SMTPPool] = None
+
+
+def get_smtp_pool() -> SMTPPool:
+    """Process-wide pool of authenticated SMTP sessions."""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = SMTPPool()
+    return _default_pool
+
+
+def validate_credentials(from_email: str, app_password: str) -> None:
+    """
+    Log in to Gmail SMTP to check an account's app password. The
+    authenticated session stays in the pool for the next send.
+    
+    Raises:
+        smtplib.SMTPAuthenticationError: If Gmail rejects the credentials
+    """
+    with get_smtp_pool().connection(from_email, app_password):
+        pass
+
+
+def build_message(
     from_email: str,
-    app_password: str,
     to_email: str,
     subject: str,
     html_body: str,
     text_body: str = None,
     cc_emails: str = "",
     bcc_emails: str = "",
-):
+) -> Tuple[MIMEMultipart, List[str]]:
     """
-    Send an email via Gmail SMTP with SSL on port 465 (cloud-compatible).
+    Render the MIME message and the full envelope recipient list.
     
-    Args:
-        from_email: Sender's Gmail address
-        app_password: Gmail app password
-        to_email: Recipient's email address
-        subject: Email subject
-        html_body: HTML version of email body
-        text_body: Plain text version (optional)
-        cc_emails: Comma-separated CC emails (optional)
-        bcc_emails: Comma-separated BCC emails (optional)
+    Returns:
+        (message, recipients) where recipients covers TO + CC + BCC
     """
     # Create message
     msg = MIMEMultipart("alternative")
@@ -57,13 +83,245 @@ def send_email(
         bcc_list = [email.strip() for email in bcc_emails.split(",") if email.strip()]
         all_recipients.extend(bcc_list)
     
-    # Use SMTP_SSL on port 465 for cloud compatibility
+    return msg, all_recipients
+
+
+def send_message(from_email: str, app_password: str, recipients: List[str], message: str) -> None:
+    """
+    Send an already rendered message over a pooled Gmail session.
+    smtplib errors propagate unchanged so callers can classify them.
+    """
+    get_smtp_pool().sendmail(from_email, app_password, recipients, message)
+
+
+def is_permanent_failure(error: BaseException) -> bool:
+    """
+    True if resending the same message cannot succeed: 5xx replies
+    (bad credentials, rejected sender or recipients, refused content).
+    4xx replies, disconnects and network errors are transient.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return False
+    # Other SMTPExceptions (e.g. a required extension the server lacks)
+    # subclass OSError but will fail the same way again
+    if isinstance(error, smtplib.SMTPException):
+        return True
+    if isinstance(error, OSError):
+        return False
+    return True
+
+
+def send_email(
+    from_email: str,
+    app_password: str,
+    to_email: str,
+    subject: str,
+    html_body: str,
+    text_body: str = None,
+    cc_emails: str = "",
+    bcc_emails: str = "",
+):
+    """
+    Send an email via SMTP_HOST (Gmail by default), with implicit TLS when
+    SMTP_PORT is 465 and STARTTLS on any other port (587 under
+    docker-compose). Reuses a pooled, already authenticated session for
+    the account when one is alive.
+    
+    Args:
+        from_email: Sender's Gmail address
+        app_password: Gmail app password
+        to_email: Recipient's email address
+        subject: Email subject
+        html_body: HTML version of email body
+        text_body: Plain text version (optional)
+        cc_emails: Comma-separated CC emails (optional)
+        bcc_emails: Comma-separated BCC emails (optional)
+    """
+    msg, all_recipients = build_message(
+        from_email, to_email, subject, html_body, text_body, cc_emails, bcc_emails
+    )
+    
+    # The pool picks SMTP_SSL or STARTTLS from SMTP_PORT
     try:
-        server = smtplib.SMTP_SSL("smtp.gmail.com", 465)
-        server.login(from_email, app_password)
-        server.sendmail(from_email, all_recipients, msg.as_string())
-        server.quit()
+        send_message(from_email, app_password, all_recipients, msg.as_string())
         print(f"Email sent successfully to {len(all_recipients)} recipient(s)")
     except Exception as e:
         print(f"Failed to send email: {e}")
         raise Exception(f"Failed to send email: {str(e)}")
+
+
+class _MergeText:
+    """A string split once into literal runs and {{ field }} slots."""
+    
+    def __init__(self, text: str, html: bool = False):
+        self.html = html
+        self.parts = MERGE_FIELD_REGEX.split(text)  # literal, field, literal, ...
+        self.fields = set(self.parts[1::2])
+    
+    @property
+    def is_static(self) -> bool:
+        return not self.fields
+    
+    def render(self, values: Dict[str, str]) -> str:
+        rendered = []
+        for index, part in enumerate(self.parts):
+            if index % 2:
+                value = str(values[part])  # KeyError for a missing field
+                part = escape(value) if self.html else value
+            rendered.append(part)
+        return "".join(rendered)
+
+
+class MergeTemplate:
+    """
+    A message compiled once for many recipients.
+    
+    Subject, HTML and text bodies may contain {{ field }} placeholders;
+    values are HTML-escaped in the HTML body. Body parts without
+    placeholders are encoded once and shared by every rendered message,
+    so a report sent unchanged to N people only costs N sets of headers.
+    """
+    
+    def __init__(self, from_email: str, subject: str, html_body: str, text_body: str = None):
+        self.from_email = from_email
+        self.subject = _MergeText(subject)
+        self.html = _MergeText(html_body, html=True)
+        self.text = _MergeText(text_body) if text_body else None
+        # Encoded once; MIMEText base64/QP-encodes its payload on construction
+        self._static_html = MIMEText(html_body, "html") if self.html.is_static else None
+        self._static_text = (
+            MIMEText(text_body, "plain") if self.text is not None and self.text.is_static else None
+        )
+    
+    @property
+    def fields(self) -> set:
+        fields = self.subject.fields | self.html.fields
+        return fields | self.text.fields if self.text is not None else fields
+    
+    def render(self, to_email: str, values: Optional[Dict[str, str]] = None) -> str:
+        """
+        Full message for one recipient.
+        
+        Raises:
+            KeyError: If a placeholder has no value in values
+        """
+        values = values or {}
+        msg = MIMEMultipart("alternative")
+        msg["From"] = self.from_email
+        msg["To"] = to_email
+        msg["Subject"] = self.subject.render(values)
+        
+        if self.text is not None:
+            msg.attach(self._static_text or MIMEText(self.text.render(values), "plain"))
+        msg.attach(self._static_html or MIMEText(self.html.render(values), "html"))
+        return msg.as_string()
+
+
+@dataclass
+class BulkResult:
+    """Outcome of one message in a bulk send."""
+    to_email: str
+    sent: bool
+    error: Optional[str] = None
+    permanent: bool = False
+
+
+def send_bulk(
+    from_email: str,
+    app_password: str,
+    subject: str,
+    html_body: str,
+    recipients: Iterable[Union[str, Tuple[str, Dict[str, str]]]],
+    text_body: str = None,
+    batch_size: int = BULK_BATCH_SIZE,
+    batch_pause: float = BULK_BATCH_PAUSE_SECONDS,
+) -> List[BulkResult]:
+    """
+    Mail-merge one message to many recipients over a single pooled session.
+    
+    The template is compiled once; each recipient gets their own message
+    (their address in To, placeholders filled from their values). After
+    every batch_size messages the sender pauses batch_pause seconds to stay
+    under Gmail's sending rate. Messages go out one after another on the
+    session; smtplib waits for each reply, so commands are not pipelined
+    and the saving is the per-message connect, TLS and AUTH.
+    
+    A failure only affects its own message: any error is recorded for that
+    recipient and the batch continues. A dropped session is replaced and
+    the message retried once, and after any other unexpected error the
+    next message starts on a fresh session. If the login itself is
+    rejected, every remaining message is reported as failed.
+    
+    Args:
+        from_email: Sender's Gmail address
+        app_password: Gmail app password
+        subject: Subject, may contain {{ field }} placeholders
+        html_body: HTML body, may contain {{ field }} placeholders
+        recipients: Addresses, or (address, {field: value}) pairs
+        text_body: Plain text version (optional, may contain placeholders)
+        batch_size: Messages per batch (0 for no pauses)
+        batch_pause: Seconds to wait between batches
+    
+    Returns:
+        One BulkResult per recipient, in input order
+    """
+    template = MergeTemplate(from_email, subject, html_body, text_body)
+    pool = get_smtp_pool()
+    session = None
+    auth_error = None
+    results: List[BulkResult] = []
+    
+    try:
+        for index, entry in enumerate(recipients):
+            to_email, values = (entry, {}) if isinstance(entry, str) else entry
+            if auth_error is not None:
+                # Nothing else in the batch can go out either
+                results.append(BulkResult(to_email, False, auth_error, permanent=True))
+                continue
+            if index and batch_size and index % batch_size == 0:
+                time.sleep(batch_pause)
+            
+            try:
+                message = template.render(to_email, values)
+            except KeyError as e:
+                results.append(BulkResult(to_email, False, f"Missing merge field {e}", permanent=True))
+                continue
+            
+            for attempt in range(2):
+                try:
+                    if session is None:
+                        session, _ = pool.acquire(from_email, app_password)
+                    session.server.sendmail(from_email, [to_email], message)
+                    results.append(BulkResult(to_email, True))
+                    break
+                except smtplib.SMTPAuthenticationError as e:
+                    auth_error = str(e)
+                    results.append(BulkResult(to_email, False, auth_error, permanent=True))
+                    break
+                except SESSION_INTACT_ERRORS as e:
+                    results.append(BulkResult(to_email, False, str(e), is_permanent_failure(e)))
+                    break
+                except Exception as e:
+                    # The session is discarded either way. Drops and network
+                    # errors get one retry on a fresh login; anything else
+                    # (e.g. SMTPNotSupportedError) fails this message only
+                    if session is not None:
+                        pool.release(from_email, app_password, session, broken=True)
+                        session = None
+                    network_error = isinstance(e, DISCONNECT_ERRORS) or (
+                        isinstance(e, OSError) and not isinstance(e, smtplib.SMTPException)
+                    )
+                    if attempt or not network_error:
+                        results.append(BulkResult(to_email, False, str(e), is_permanent_failure(e)))
+                        break
+    finally:
+        if session is not None:
+            pool.release(from_email, app_password, session)
+    
+    sent = sum(1 for result in results if result.sent)
+    print(f"Bulk send: {sent} of {len(results)} message(s) sent")
+    return results
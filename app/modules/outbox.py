@@ -0,0 +1,324 @@
+"""Durable outbox: emails are stored in SQLite and sent by background workers."""
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from .email_sender import build_message, is_permanent_failure, send_message
+from .rate_limiter import backoff_delay
+from .storage import connect_private, data_path
+
+# Persistent volume, not /tmp: queued mail must survive reboots and container rebuilds
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", data_path("outbox.sqlite3"))
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "2"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_RETRY_BASE_DELAY = float(os.getenv("OUTBOX_RETRY_BASE_DELAY", "15"))
+OUTBOX_RETRY_MAX_DELAY = float(os.getenv("OUTBOX_RETRY_MAX_DELAY", "1800"))
+OUTBOX_RETENTION_SECONDS = int(os.getenv("OUTBOX_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+QUEUED = "queued"
+CONNECTING = "connecting"
+RETRYING = "retrying"
+SENT = "sent"
+FAILED = "failed"
+PENDING_STATES = (QUEUED, RETRYING)
+FINAL_STATES = (SENT, FAILED)
+
+_JOB_COLUMNS = (
+    "job_id, from_email, to_email, subject, state, attempts, "
+    "next_attempt_at, last_error, created_at, updated_at"
+)
+
+
+@dataclass
+class SendJob:
+    """Public view of one outbox entry (no message body or password)."""
+    job_id: str
+    from_email: str
+    to_email: str
+    subject: str
+    state: str = QUEUED
+    attempts: int = 0
+    next_attempt_at: float = 0.0
+    error: Optional[str] = None
+    created_at: float = 0.0
+    updated_at: float = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self.state in FINAL_STATES
+
+
+class Outbox:
+    """
+    SQLite-backed queue of rendered emails drained by daemon worker threads.
+
+    Each row holds the full MIME message, its envelope recipients, the
+    attempt count and the next retry time. Transient failures (4xx,
+    disconnects, network errors) are retried with exponential backoff up
+    to max_attempts; permanent ones (5xx) fail at once. Failed rows keep
+    their message, so retry() can resend without regenerating anything.
+
+    The database file is owner-only (0600) and app passwords are never
+    written to it. Workers only pick up rows whose account has a
+    password registered in this process (through submit() or
+    remember_credentials()). Rows that were mid-send when the process
+    stopped are queued again on startup, so a restart can deliver a
+    message twice but never drops one. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        db_path: str = OUTBOX_PATH,
+        send_fn: Callable[[str, str, List[str], str], None] = send_message,
+        workers: int = OUTBOX_WORKERS,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+        retry_base_delay: float = OUTBOX_RETRY_BASE_DELAY,
+        retry_max_delay: float = OUTBOX_RETRY_MAX_DELAY,
+        retention_seconds: int = OUTBOX_RETENTION_SECONDS,
+    ):
+        self.db_path = db_path
+        self.send_fn = send_fn
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.retention_seconds = retention_seconds
+        self._passwords: Dict[str, str] = {}
+        self._cond = threading.Condition()
+        self._threads = []
+        self.counters = {"submitted": 0, "sent": 0, "failed": 0, "retries": 0, "recovered": 0}
+
+        # Rows hold full message bodies and recipient lists
+        self._conn = connect_private(db_path)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS outbox (
+                job_id TEXT PRIMARY KEY,
+                from_email TEXT NOT NULL,
+                to_email TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                recipients TEXT NOT NULL,
+                message TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS outbox_due ON outbox (state, next_attempt_at)"
+        )
+        # A row left mid-send by a previous process may or may not have
+        # reached Gmail; resending is the safe side
+        recovered = self._conn.execute(
+            "UPDATE outbox SET state = ? WHERE state = ?", (QUEUED, CONNECTING)
+        ).rowcount
+        self._conn.commit()
+        self.counters["recovered"] = recovered
+        if recovered:
+            print(f"Outbox: re-queued {recovered} message(s) interrupted by a restart")
+
+    def _start_workers(self) -> None:
+        # Called with the lock held
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"outbox-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def remember_credentials(self, from_email: str, app_password: str) -> None:
+        """Register an account's password so its queued rows can be sent."""
+        with self._cond:
+            self._passwords[from_email] = app_password
+            self._start_workers()
+            self._cond.notify_all()
+
+    def submit(
+        self,
+        from_email: str,
+        app_password: str,
+        to_email: str,
+        subject: str,
+        html_body: str,
+        text_body: str = None,
+        cc_emails: str = "",
+        bcc_emails: str = "",
+    ) -> str:
+        """
+        Render and persist an email for sending; same arguments as
+        email_sender.send_email.
+
+        Returns:
+            Job id for status(), wait() and retry()
+        """
+        msg, recipients = build_message(
+            from_email, to_email, subject, html_body, text_body, cc_emails, bcc_emails
+        )
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._cond:
+            self._prune(now)
+            self._conn.execute(
+                """INSERT INTO outbox (job_id, from_email, to_email, subject, recipients,
+                    message, state, attempts, next_attempt_at, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)""",
+                (job_id, from_email, to_email, subject, json.dumps(recipients),
+                 msg.as_string(), QUEUED, now, now, now),
+            )
+            self._conn.commit()
+            self._passwords[from_email] = app_password
+            self.counters["submitted"] += 1
+            self._start_workers()
+            self._cond.notify_all()
+        return job_id
+
+    def retry(self, job_id: str) -> bool:
+        """Queue a failed job again with a fresh attempt count."""
+        now = time.time()
+        with self._cond:
+            updated = self._conn.execute(
+                """UPDATE outbox SET state = ?, attempts = 0, next_attempt_at = ?,
+                    last_error = NULL, updated_at = ?
+                WHERE job_id = ? AND state = ?""",
+                (QUEUED, now, now, job_id, FAILED),
+            ).rowcount
+            self._conn.commit()
+            self._cond.notify_all()
+        return bool(updated)
+
+    def _prune(self, now: float) -> None:
+        # Called with the lock held
+        self._conn.execute(
+            "DELETE FROM outbox WHERE state IN (?, ?) AND updated_at < ?",
+            (*FINAL_STATES, now - self.retention_seconds),
+        )
+
+    def _claim(self, now: float):
+        """
+        Mark the next due row we hold a password for as connecting.
+        Returns ((job_id, from_email, password, recipients, message,
+        attempts), None), or (None, seconds until the next due row or
+        None when nothing is waiting).
+        """
+        rows = self._conn.execute(
+            """SELECT job_id, from_email, attempts, next_attempt_at
+            FROM outbox WHERE state IN (?, ?) ORDER BY next_attempt_at""",
+            PENDING_STATES,
+        ).fetchall()
+        for job_id, from_email, attempts, next_attempt_at in rows:
+            password = self._passwords.get(from_email)
+            if password is None:
+                continue
+            if next_attempt_at > now:
+                return None, next_attempt_at - now
+            recipients, message = self._conn.execute(
+                "SELECT recipients, message FROM outbox WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            self._conn.execute(
+                "UPDATE outbox SET state = ?, updated_at = ? WHERE job_id = ?",
+                (CONNECTING, now, job_id),
+            )
+            self._conn.commit()
+            return (job_id, from_email, password, json.loads(recipients), message, attempts), None
+        return None, None
+
+    def _finish(self, job_id: str, attempts: int, error: Optional[BaseException]) -> None:
+        now = time.time()
+        with self._cond:
+            if error is None:
+                # The body is no longer needed once Gmail has accepted it
+                self._conn.execute(
+                    """UPDATE outbox SET state = ?, attempts = ?, message = '',
+                        last_error = NULL, updated_at = ? WHERE job_id = ?""",
+                    (SENT, attempts, now, job_id),
+                )
+                self.counters["sent"] += 1
+            elif is_permanent_failure(error) or attempts >= self.max_attempts:
+                self._conn.execute(
+                    """UPDATE outbox SET state = ?, attempts = ?, last_error = ?,
+                        updated_at = ? WHERE job_id = ?""",
+                    (FAILED, attempts, str(error), now, job_id),
+                )
+                self.counters["failed"] += 1
+                print(f"Outbox job {job_id[:8]} failed after {attempts} attempt(s): {error}")
+            else:
+                delay = max(
+                    self.retry_base_delay,
+                    backoff_delay(attempts - 1, None, self.retry_base_delay, self.retry_max_delay),
+                )
+                self._conn.execute(
+                    """UPDATE outbox SET state = ?, attempts = ?, next_attempt_at = ?,
+                        last_error = ?, updated_at = ? WHERE job_id = ?""",
+                    (RETRYING, attempts, now + delay, str(error), now, job_id),
+                )
+                self.counters["retries"] += 1
+                print(f"Outbox job {job_id[:8]} deferred ({error}), retry {attempts} in {delay:.0f}s")
+            self._conn.commit()
+            self._cond.notify_all()
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                claimed, wait_for = self._claim(time.time())
+                if claimed is None:
+                    self._cond.wait(timeout=wait_for)
+                    continue
+
+            job_id, from_email, password, recipients, message, attempts = claimed
+            try:
+                self.send_fn(from_email, password, recipients, message)
+            except Exception as e:
+                self._finish(job_id, attempts + 1, e)
+            else:
+                self._finish(job_id, attempts + 1, None)
+
+    def status(self, job_id: str) -> Optional[SendJob]:
+        """Snapshot of a job, or None if unknown or already pruned."""
+        with self._cond:
+            row = self._conn.execute(
+                f"SELECT {_JOB_COLUMNS} FROM outbox WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return SendJob(*row) if row is not None else None
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[SendJob]:
+        """Block until the job finishes or timeout elapses; returns its snapshot."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                job = self.status(job_id)
+                if job is None or job.done:
+                    return job
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return job
+                self._cond.wait(timeout=remaining)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            by_state = dict(
+                self._conn.execute("SELECT state, COUNT(*) FROM outbox GROUP BY state").fetchall()
+            )
+        return {
+            **self.counters,
+            "pending": sum(by_state.get(state, 0) for state in (*PENDING_STATES, CONNECTING)),
+            "failed_stored": by_state.get(FAILED, 0),
+        }
+
+
+_default_outbox: Optional[Outbox] = None
+_default_lock = threading.Lock()
+
+
+def get_outbox() -> Outbox:
+    """Process-wide outbox shared by all sessions."""
+    global _default_outbox
+    with _default_lock:
+        if _default_outbox is None:
+            _default_outbox = Outbox()
+        return _default_outbox
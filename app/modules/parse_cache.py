@@ -0,0 +1,85 @@
+"""Content-addressed LRU cache for parsed work logs, shared across sessions."""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple
+
+import streamlit as st
+from .prompt_parser import extract_tasks
+
+PARSE_CACHE_MAX_BYTES = int(os.getenv("PARSE_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+
+# Rough per-entry bookkeeping cost (key digest, tuple, dict slot)
+ENTRY_OVERHEAD_BYTES = 128
+
+
+def prompt_key(text: str) -> str:
+    """Hash prompt text so the cache never holds the raw prompt."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ParseCache:
+    """
+    Bounded LRU of parse results keyed by prompt hash.
+    Size is tracked as the UTF-8 bytes of cached tasks plus a fixed overhead.
+    Thread-safe, since Streamlit serves sessions from multiple threads.
+    """
+
+    def __init__(self, max_bytes: int = PARSE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        self._entries: "OrderedDict[str, Tuple[Tuple[str, ...], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_parse(self, text: str, parser: Callable[[str], List[str]]) -> List[str]:
+        """Return cached tasks for text, parsing (and caching) on a miss."""
+        key = prompt_key(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry[0])
+            self.misses += 1
+
+        tasks = tuple(parser(text))
+        size = ENTRY_OVERHEAD_BYTES + sum(len(task.encode("utf-8")) for task in tasks)
+
+        with self._lock:
+            if size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (tasks, size)
+                self._size += size
+                while self._size > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self._size -= evicted_size
+        return list(tasks)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current occupancy."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+@st.cache_resource
+def get_parse_cache() -> ParseCache:
+    """Process-wide parse cache shared by every Streamlit session."""
+    return ParseCache(PARSE_CACHE_MAX_BYTES)
+
+
+def cached_extract_tasks(text: str) -> List[str]:
+    """extract_tasks through the shared parse cache."""
+    return get_parse_cache().get_or_parse(text, extract_tasks)
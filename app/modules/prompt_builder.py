@@ -0,0 +1,280 @@
+"""Token-budgeted prompt construction for report generation."""
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+PROMPT_VERSION = 2
+
+# Input budget for the task list, and bounds for the completion size
+PROMPT_TASK_TOKEN_BUDGET = int(os.getenv("PROMPT_TASK_TOKEN_BUDGET", "1200"))
+PROMPT_MAX_TASK_CHARS = int(os.getenv("PROMPT_MAX_TASK_CHARS", "300"))
+PROMPT_SUMMARY_TOKENS = 120
+
+OUTPUT_BASE_TOKENS = 400
+OUTPUT_TOKENS_PER_TASK = 60
+OUTPUT_MIN_TOKENS = 512
+OUTPUT_MAX_TOKENS = 2048
+# With the largest prompt this still reserves well under the default
+# 6000 tokens/min, so a combined request never waits for a full bucket
+MULTI_TONE_MAX_TOKENS = 3072
+
+# Byte-identical on every call so provider-side prefix caching applies.
+# Everything request-specific lives in the trailing user message.
+SYSTEM_PREFIX = """You are a professional email writing assistant. Generate HTML email reports.
+
+The user message ends with a Preferences block (tone, date, manager name,
+sender name) followed by the completed tasks.
+
+Generate a well-formatted HTML email body with:
+1. Proper HTML structure (<html>, <head>, <body>, <style>)
+2. Professional greeting starting with "Dear <Manager Name>,"
+3. Brief intro paragraph (1-2 sentences)
+4. Clean task list using <ul> and <li> tags, one <li> per task
+5. Professional closing paragraph matching the requested tone
+6. Signature with "Sincerely," or "Best regards," followed by the sender name
+7. Inline CSS for professional styling
+
+CRITICAL RULES:
+- DO NOT include any subject line or title in the email body
+- DO NOT include the date as a heading
+- Start DIRECTLY with "Dear <Manager Name>,"
+- The subject line is handled separately, NEVER put it in the email body
+- Return ONLY the complete HTML code
+- Do NOT wrap it in markdown code blocks or add any explanation"""
+
+
+@dataclass
+class BuiltPrompt:
+    """Messages for one report plus the size estimates behind them."""
+    messages: list
+    max_tokens: int
+    estimates: Dict[str, int] = field(default_factory=dict)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap local token estimate (~4 characters per token for English text
+    with Llama-style tokenizers). Errs slightly high, which is the safe side
+    for budgeting.
+    """
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def _shorten(text: str, max_chars: int) -> str:
+    """Cut text at a word boundary, marking the cut with an ellipsis."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0] or text[:max_chars]
+    return cut.rstrip(" ,;:.") + "..."
+
+
+def _summarize_tasks(tasks: List[str], token_budget: int) -> str:
+    """
+    Collapse tasks that did not fit into one line: a count plus the first
+    few words of each, as many as the budget allows.
+    """
+    prefix = f"Plus {len(tasks)} more tasks, briefly: "
+    budget_chars = max(token_budget * 4 - len(prefix), 0)
+    heads = []
+    used = 0
+    for task in tasks:
+        head = " ".join(task.split()[:5])
+        if used + len(head) + 2 > budget_chars:
+            break
+        heads.append(head)
+        used += len(head) + 2
+    if len(heads) < len(tasks):
+        heads.append("...")
+    return prefix + "; ".join(heads)
+
+
+def fit_tasks(tasks: List[str], token_budget: int = PROMPT_TASK_TOKEN_BUDGET) -> Tuple[List[str], int, int]:
+    """
+    Fit a task list into a token budget.
+
+    Each task is capped at PROMPT_MAX_TASK_CHARS. Tasks are kept in order
+    while they fit; if some do not, space is reserved for a one-line
+    summary of the remainder.
+
+    Returns:
+        (task lines to send, number of tasks shortened, number summarized)
+    """
+    shortened = [_shorten(task, PROMPT_MAX_TASK_CHARS) for task in tasks]
+    trimmed = sum(1 for before, after in zip(tasks, shortened) if before != after)
+
+    costs = [estimate_tokens(f"- {task}\n") for task in shortened]
+    if sum(costs) <= token_budget:
+        return shortened, trimmed, 0
+
+    kept = []
+    used = 0
+    limit = max(token_budget - PROMPT_SUMMARY_TOKENS, 0)
+    for task, cost in zip(shortened, costs):
+        if used + cost > limit:
+            break
+        kept.append(task)
+        used += cost
+
+    # Always send at least one real task
+    if not kept:
+        kept = [shortened[0]]
+    rest = shortened[len(kept):]
+    return kept + [_summarize_tasks(rest, PROMPT_SUMMARY_TOKENS)], trimmed, len(rest)
+
+
+def output_token_budget(task_count: int) -> int:
+    """Size max_tokens from the number of list items the model will write."""
+    estimate = OUTPUT_BASE_TOKENS + OUTPUT_TOKENS_PER_TASK * task_count
+    return max(OUTPUT_MIN_TOKENS, min(OUTPUT_MAX_TOKENS, estimate))
+
+
+def _preferences_block(
+    tone_line: str, date_str: str, manager_name: str, sender_name: str, tasks_text: str
+) -> str:
+    """Trailing, request-specific part of the user message."""
+    return f"""Preferences:
+- {tone_line}
+- Date: {date_str}
+- Manager Name: {manager_name}
+- Sender Name: {sender_name}
+
+Completed tasks:
+{tasks_text}"""
+
+
+def _estimates(
+    user_prompt: str, tasks_text: str, max_tokens: int, sent: int, trimmed: int, summarized: int
+) -> Dict[str, int]:
+    system_tokens = estimate_tokens(SYSTEM_PREFIX)
+    return {
+        "prompt_version": PROMPT_VERSION,
+        "prompt_tokens_est": system_tokens + estimate_tokens(user_prompt),
+        "static_prefix_tokens_est": system_tokens,
+        "task_tokens_est": estimate_tokens(tasks_text),
+        "max_tokens": max_tokens,
+        "tasks_sent": sent,
+        "tasks_trimmed": trimmed,
+        "tasks_summarized": summarized,
+    }
+
+
+def build_prompt(
+    tasks: List[str],
+    manager_name: str,
+    date_str: str,
+    tone: str,
+    sender_name: str,
+    task_token_budget: int = PROMPT_TASK_TOKEN_BUDGET,
+) -> BuiltPrompt:
+    """
+    Build the messages for one report within the task token budget.
+
+    Args:
+        tasks: Cleaned task list
+        manager_name: Recipient's name for greeting
+        date_str: Formatted report date
+        tone: Email tone (formal/neutral/friendly)
+        sender_name: Name to sign email with
+        task_token_budget: Token budget for the task list
+
+    Returns:
+        BuiltPrompt with messages, max_tokens and estimates
+    """
+    task_lines, trimmed, summarized = fit_tasks(tasks, task_token_budget)
+    tasks_text = "\n".join(f"- {task}" for task in task_lines)
+    user_prompt = _preferences_block(f"Tone: {tone}", date_str, manager_name, sender_name, tasks_text)
+    max_tokens = output_token_budget(len(task_lines))
+
+    return BuiltPrompt(
+        messages=[SystemMessage(content=SYSTEM_PREFIX), HumanMessage(content=user_prompt)],
+        max_tokens=max_tokens,
+        estimates=_estimates(
+            user_prompt, tasks_text, max_tokens,
+            len(task_lines) - (1 if summarized else 0), trimmed, summarized,
+        ),
+    )
+
+
+def tone_marker(tone: str) -> str:
+    """Delimiter line preceding each variant in a multi-tone response."""
+    return f"<!-- TONE: {tone} -->"
+
+
+def build_multi_tone_prompt(
+    tasks: List[str],
+    manager_name: str,
+    date_str: str,
+    tones: List[str],
+    sender_name: str,
+    task_token_budget: int = PROMPT_TASK_TOKEN_BUDGET,
+) -> BuiltPrompt:
+    """
+    Build one request asking for a complete email per tone, each preceded
+    by its tone_marker line. Shares the static system prefix with
+    build_prompt; max_tokens covers every variant, up to
+    MULTI_TONE_MAX_TOKENS.
+    """
+    task_lines, trimmed, summarized = fit_tasks(tasks, task_token_budget)
+    tasks_text = "\n".join(f"- {task}" for task in task_lines)
+    markers = "\n".join(tone_marker(tone) for tone in tones)
+    user_prompt = _preferences_block(
+        f"Tones: {', '.join(tones)}", date_str, manager_name, sender_name, tasks_text
+    ) + f"""
+
+Write {len(tones)} separate complete HTML emails, one per tone, in this order.
+Put each marker line below on its own line directly before its email:
+{markers}"""
+    max_tokens = min(output_token_budget(len(task_lines)) * len(tones), MULTI_TONE_MAX_TOKENS)
+
+    return BuiltPrompt(
+        messages=[SystemMessage(content=SYSTEM_PREFIX), HumanMessage(content=user_prompt)],
+        max_tokens=max_tokens,
+        estimates=_estimates(
+            user_prompt, tasks_text, max_tokens,
+            len(task_lines) - (1 if summarized else 0), trimmed, summarized,
+        ),
+    )
+
+
+# Static prefix for partial regeneration of individual list items
+ITEMS_SYSTEM_PREFIX = """You write task list items for professional status-report emails.
+
+For each task in the user message, write exactly one HTML <li> element that
+states the task clearly and concisely in the requested tone, matching the
+markup and style of the example item.
+
+Return ONLY the <li> elements, one per line, in the same order as the tasks.
+Do NOT add a <ul>, any other text, or markdown code blocks."""
+
+ITEM_OUTPUT_TOKENS = 80
+
+
+def build_items_prompt(tasks: List[str], tone: str, example_item: str) -> BuiltPrompt:
+    """Build a small request for just the <li> items of new or changed tasks."""
+    task_lines = [_shorten(task, PROMPT_MAX_TASK_CHARS) for task in tasks]
+    tasks_text = "\n".join(f"{index}. {task}" for index, task in enumerate(task_lines, 1))
+    user_prompt = f"""Tone: {tone}
+Example item: {example_item}
+
+Tasks:
+{tasks_text}"""
+    max_tokens = 40 + ITEM_OUTPUT_TOKENS * len(task_lines)
+    system_tokens = estimate_tokens(ITEMS_SYSTEM_PREFIX)
+
+    return BuiltPrompt(
+        messages=[SystemMessage(content=ITEMS_SYSTEM_PREFIX), HumanMessage(content=user_prompt)],
+        max_tokens=max_tokens,
+        estimates={
+            "prompt_version": PROMPT_VERSION,
+            "prompt_tokens_est": system_tokens + estimate_tokens(user_prompt),
+            "static_prefix_tokens_est": system_tokens,
+            "task_tokens_est": estimate_tokens(tasks_text),
+            "max_tokens": max_tokens,
+            "tasks_sent": len(task_lines),
+            "tasks_trimmed": sum(1 for before, after in zip(tasks, task_lines) if before != after),
+            "tasks_summarized": 0,
+        },
+    )
@@ -1,25 +1,145 @@
 import re
 import json
-from typing import List, Tuple, Optional
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from itertools import chain, islice
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
 
 EMAIL_REGEX = re.compile(
     r"([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)"
 )
 
+# Lines that are clearly headers/metadata (matched against lowercased, stripped text)
+SKIP_LINE_REGEX = re.compile(
+    r"^(?:send\s+to|recipient|to|date|for\s+date)[\s:=-]"
+    r"|^(?:today'?s?\s+tasks?|summary|work\s+log|tasks?\s+completed)[\s:]"
+)
+
+NUMBERED_REGEX = re.compile(r"^\d+[\.\)]\s+(.+)")
+
+# Keywords that introduce the recipient; spaces match any whitespace run
+RECIPIENT_KEYWORDS = [
+    "send to",
+    "recipient",
+    "to",
+    "email to",
+    "email this report to",
+]
+
+# Keywords that mark the start of the task section (matched literally, lowercase)
+HEADER_KEYWORDS = [
+    "today's tasks",
+    "tasks completed today",
+    "summary of today's work",
+    "work log for today",
+    "here is what i completed today",
+    "completed today",
+    "today i",
+]
+
+
+def build_keyword_pattern(keywords: Iterable[str], flexible_whitespace: bool = False) -> str:
+    """
+    Compile keywords into one trie-shaped regex.
+    
+    Shared prefixes are factored out, so at each input position the regex
+    engine follows a single path down the trie instead of trying every
+    keyword in turn: scanning cost depends on input length and keyword
+    depth, not on how many keywords (or locales) are configured.
+    Longer keywords win over their prefixes.
+    """
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword.lower():
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    
+    def emit(node: dict) -> str:
+        terminal = "" in node
+        branches = []
+        for ch in sorted(key for key in node if key):
+            token = r"\s+" if flexible_whitespace and ch.isspace() else re.escape(ch)
+            branches.append(token + emit(node[ch]))
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            return body + "?" if len(branches) == 1 and len(body) == 1 else f"(?:{body})?"
+        return body
+    
+    if not trie:
+        # Matches nothing
+        return "(?!)"
+    return emit(trie)
+
+
+def _compile_recipient_scanner(keywords: Iterable[str]) -> "re.Pattern[str]":
+    """
+    Single-scan matcher for recipient keywords.
+    Keywords only hit when a separator follows; the address directly
+    after the separator, if any, is captured in the same match.
+    """
+    return re.compile(
+        f"(?:{build_keyword_pattern(keywords, flexible_whitespace=True)})"
+        r"(?=[\s:=-])(?:[\s:=-]+(?P<address>[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+))?",
+        re.IGNORECASE,
+    )
+
+
+RECIPIENT_SCAN_REGEX = _compile_recipient_scanner(RECIPIENT_KEYWORDS)
+HEADER_REGEX = re.compile(build_keyword_pattern(HEADER_KEYWORDS))
+
+
+def configure_keywords(
+    recipient_keywords: Optional[Iterable[str]] = None,
+    header_keywords: Optional[Iterable[str]] = None,
+) -> None:
+    """
+    Replace the recipient and/or header keyword lists and recompile the matchers.
+    Results already held by parse caches or IncrementalParser instances are not refreshed.
+    """
+    global RECIPIENT_KEYWORDS, HEADER_KEYWORDS, RECIPIENT_SCAN_REGEX, HEADER_REGEX
+    
+    if recipient_keywords is not None:
+        RECIPIENT_KEYWORDS = list(recipient_keywords)
+        RECIPIENT_SCAN_REGEX = _compile_recipient_scanner(RECIPIENT_KEYWORDS)
+    if header_keywords is not None:
+        HEADER_KEYWORDS = [keyword.lower() for keyword in header_keywords]
+        HEADER_REGEX = re.compile(build_keyword_pattern(HEADER_KEYWORDS))
+
+
+# Line kinds produced by classify_line
+LINE_BLANK = 0
+LINE_METADATA = 1
+LINE_EMAIL = 2
+LINE_BULLET = 3
+LINE_NUMBERED = 4
+LINE_TEXT = 5
+
+# (kind, text, is_header): text is the task payload for bullets/numbered
+# lines and the stripped line otherwise
+LineRecord = Tuple[int, str, bool]
+
+
 def extract_recipient_email(raw_prompt: str) -> str | None:
     """
     Extract the first email address from the prompt.
     Enhanced to look for 'Send to:', 'Recipient:', etc.
     """
-    # First, try specific patterns
-    send_to_patterns = [
-        r"(?:send\s+to|recipient|to|email\s+(?:to|this\s+report\s+to))[\s:=-]+([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)",
-    ]
+    # No '@' candidate means no address at all
+    if "@" not in raw_prompt:
+        return None
     
-    for pattern in send_to_patterns:
-        match = re.search(pattern, raw_prompt, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
+    # One scan over every recipient keyword; the first one directly
+    # followed by an address wins
+    for hit in RECIPIENT_SCAN_REGEX.finditer(raw_prompt):
+        address = hit.group("address")
+        if address:
+            return address.strip()
     
     # Fallback: any email in the prompt
     match = EMAIL_REGEX.search(raw_prompt)
@@ -29,105 +149,315 @@ def extract_recipient_email(raw_prompt: str) -> str | None:
     return None
 
 
+def classify_line(line: str) -> LineRecord:
+    """
+    Classify a single prompt line exactly once.
+    The header flag is independent of the kind, since header lines
+    such as "Tasks completed today:" are also skipped as metadata.
+    """
+    stripped = line.strip()
+    if not stripped:
+        return (LINE_BLANK, "", False)
+    
+    lowered = stripped.lower()
+    is_header = HEADER_REGEX.search(lowered) is not None
+    
+    if SKIP_LINE_REGEX.match(lowered):
+        return (LINE_METADATA, stripped, is_header)
+    if "@" in stripped and EMAIL_REGEX.search(stripped):
+        return (LINE_EMAIL, stripped, is_header)
+    
+    # Dash bullets: "- Task" / Asterisk bullets: "* Task"
+    if stripped.startswith(("- ", "* ")):
+        return (LINE_BULLET, stripped[2:].strip(), is_header)
+    
+    # Numbered: "1. Task" or "1) Task"
+    if stripped[0].isdigit():
+        num_match = NUMBERED_REGEX.match(stripped)
+        if num_match:
+            return (LINE_NUMBERED, num_match.group(1).strip(), is_header)
+    
+    return (LINE_TEXT, stripped, is_header)
+
+
+def classify_lines(lines: Iterable[str]) -> List[LineRecord]:
+    """Classify every line of a prompt into a line-record array."""
+    return [classify_line(line) for line in lines]
+
+
+# Strategy names reported by select_tasks_with_strategy
+STRATEGY_BULLET = "bullet"
+STRATEGY_HEADER = "header"
+STRATEGY_FALLBACK = "fallback"
+STRATEGY_NONE = "none"
+
+
+def select_tasks_with_strategy(records: List[LineRecord]) -> Tuple[str, List[str]]:
+    """
+    Choose tasks from classified lines using the bullet -> header -> fallback strategy.
+    Returns (strategy, tasks).
+    """
+    # First pass: explicit bullet/numbered lines
+    tasks = [text for kind, text, _ in records if kind == LINE_BULLET or kind == LINE_NUMBERED]
+    if tasks:
+        return STRATEGY_BULLET, tasks
+    
+    # Second pass: content after the first task header keyword
+    start_idx = -1
+    for idx, (_, _, is_header) in enumerate(records):
+        if is_header:
+            start_idx = idx + 1
+            break
+    
+    if start_idx != -1:
+        tasks = [
+            text for kind, text, _ in records[start_idx:]
+            if kind == LINE_TEXT and len(text) > 5
+        ]
+        if tasks:
+            return STRATEGY_HEADER, tasks
+    
+    # Final pass: any substantial free-text line
+    tasks = [text for kind, text, _ in records if kind == LINE_TEXT and len(text) > 10]
+    return (STRATEGY_FALLBACK if tasks else STRATEGY_NONE), tasks
+
+
+def select_tasks(records: List[LineRecord]) -> List[str]:
+    """Choose tasks from classified lines (see select_tasks_with_strategy)."""
+    return select_tasks_with_strategy(records)[1]
+
+
 def extract_task_lines(raw_prompt: str) -> List[str]:
     """
     Extract candidate task lines from the prompt using heuristics.
-    Enhanced to handle more formats and edge cases.
+    Each line is classified once, then the strategy is picked from the records.
     Returns flat list of strings, not nested lists
     """
-    lines = raw_prompt.splitlines()
-    tasks: List[str] = []
-    
-    # Skip lines that are clearly headers/metadata
-    skip_patterns = [
-        r"^(send\s+to|recipient|to|date|for\s+date)[\s:=-]",
-        r"^(today'?s?\s+tasks?|summary|work\s+log|tasks?\s+completed)[\s:]",
-    ]
-    
-    def should_skip_line(line: str) -> bool:
-        line_lower = line.lower().strip()
-        if not line_lower:
-            return True
-        for pattern in skip_patterns:
-            if re.match(pattern, line_lower):
-                return True
-        # Skip email lines
-        if EMAIL_REGEX.search(line):
-            return True
-        return False
+    return select_tasks(classify_lines(raw_prompt.splitlines()))
+
+# Policy front-ends over the shared line tokenizer:
+# "prompt" is the full-prompt heuristic (extract_task_lines / parse_prompt),
+# "worklog" is the free-form work log policy used by the app (extract_tasks)
+POLICY_PROMPT = "prompt"
+POLICY_WORKLOG = "worklog"
+
+# Label lines the worklog policy drops (matched on the lowercased line)
+WORKLOG_LABEL_PREFIXES = ("today", "completed", "tasks:", "work log")
+
+# Leading list markers: bullet symbols, or numbering like "1." / "2)".
+# Digits that start the task itself ("2025 roadmap", "1.5 hours") are kept.
+LIST_MARKER_REGEX = re.compile(r"^(?:(?:[•*#.-]+|\d+[.)](?!\d))\s*)+")
+
+
+def worklog_task(record: LineRecord) -> Optional[str]:
+    """Task produced by one line under the worklog policy, or None."""
+    kind, text, _ = record
+    if kind == LINE_BLANK:
+        return None
     
-    # First pass: explicit bullet/numbered lines
-    for line in lines:
-        stripped = line.strip()
-        if should_skip_line(line):
-            continue
+    # Bullet payloads never start with the marker, so labels only apply to other lines
+    if kind != LINE_BULLET and kind != LINE_NUMBERED and text.lower().startswith(WORKLOG_LABEL_PREFIXES):
+        return None
+    
+    cleaned = LIST_MARKER_REGEX.sub("", text, count=1) if text[0] in "•*#.-0123456789" else text
+    return cleaned or None
+
+
+def select_worklog_tasks(records: List[LineRecord]) -> List[str]:
+    """Every non-label line, with list markers removed, is a task."""
+    tasks = []
+    for record in records:
+        task = worklog_task(record)
+        if task is not None:
+            tasks.append(task)
+    return tasks
+
+
+def select_tasks_for_policy(records: List[LineRecord], policy: str = POLICY_PROMPT) -> List[str]:
+    """Apply one of the policy front-ends to classified lines."""
+    if policy == POLICY_WORKLOG:
+        return select_worklog_tasks(records)
+    if policy == POLICY_PROMPT:
+        return select_tasks(records)
+    raise ValueError(f"Unknown parser policy: {policy}")
+
+
+def _is_bullet(record: LineRecord) -> bool:
+    return record[0] == LINE_BULLET or record[0] == LINE_NUMBERED
+
+
+class IncrementalParser:
+    """
+    Parser state that survives edits to the same work log.
+    
+    Keeps the per-line classification from the previous text; on update only
+    the changed line range (between the common prefix and suffix) is
+    reclassified and the task list is patched rather than rebuilt.
+    Results always equal select_tasks_for_policy on the full text.
+    """
+    
+    def __init__(self, policy: str = POLICY_PROMPT):
+        if policy not in (POLICY_PROMPT, POLICY_WORKLOG):
+            raise ValueError(f"Unknown parser policy: {policy}")
+        self.policy = policy
+        self.lines: List[str] = []
+        self.records: List[LineRecord] = []
+        self.tasks: List[str] = []
+        self.bullet_count = 0
+        self.reclassified = 0  # lines classified by the last update
+    
+    def update(self, text: str) -> List[str]:
+        """Re-parse after an edit and return the current task list."""
+        new_lines = text.splitlines()
+        old_lines = self.lines
+        old_len, new_len = len(old_lines), len(new_lines)
         
-        # Dash bullets: "- Task"
-        if stripped.startswith("- "):
-            task = stripped[2:].strip()
-            if task:
-                tasks.append(task)
-            continue
+        # Common prefix/suffix bound the changed range
+        prefix = 0
+        limit = min(old_len, new_len)
+        while prefix < limit and old_lines[prefix] == new_lines[prefix]:
+            prefix += 1
+        suffix = 0
+        limit -= prefix
+        while suffix < limit and old_lines[old_len - 1 - suffix] == new_lines[new_len - 1 - suffix]:
+            suffix += 1
         
-        # Asterisk bullets: "* Task"
-        if stripped.startswith("* "):
-            task = stripped[2:].strip()
-            if task:
-                tasks.append(task)
-            continue
+        old_end, new_end = old_len - suffix, new_len - suffix
+        self.lines = new_lines
+        self.reclassified = new_end - prefix
+        if old_end == prefix and new_end == prefix:
+            return self.tasks
         
-        # Numbered: "1. Task" or "1) Task"
-        num_match = re.match(r"^\d+[\.\)]\s+(.+)", stripped)
-        if num_match:
-            task = num_match.group(1).strip()
-            if task:
-                tasks.append(task)
-            continue
+        removed = self.records[prefix:old_end]
+        added = [classify_line(line) for line in new_lines[prefix:new_end]]
+        self.records[prefix:old_end] = added
+        
+        if self.policy == POLICY_WORKLOG:
+            # Lines map to tasks independently: always splice
+            removed_count = sum(1 for record in removed if worklog_task(record) is not None)
+            added_tasks = select_worklog_tasks(added)
+            start = sum(1 for record in self.records[:prefix] if worklog_task(record) is not None)
+            self.tasks[start:start + removed_count] = added_tasks
+            return self.tasks
+        
+        removed_bullets = [record for record in removed if _is_bullet(record)]
+        added_bullets = [record[1] for record in added if _is_bullet(record)]
+        was_bullet_mode = self.bullet_count > 0
+        self.bullet_count += len(added_bullets) - len(removed_bullets)
+        
+        if was_bullet_mode and self.bullet_count > 0:
+            # Still in the bullet pass: splice the changed bullets in place
+            start = sum(1 for record in self.records[:prefix] if _is_bullet(record))
+            self.tasks[start:start + len(removed_bullets)] = added_bullets
+        else:
+            # Strategy may have changed; reselect from the records (no regex work)
+            self.tasks = select_tasks(self.records)
+        return self.tasks
+
+
+# Lines buffered by iter_task_lines before committing to a strategy
+STREAM_LOOKAHEAD = 64
+
+
+def iter_task_lines(
+    lines: Iterable[str],
+    lookahead: int = STREAM_LOOKAHEAD,
+    policy: str = POLICY_PROMPT,
+) -> Iterator[str]:
+    """
+    Streaming variant of extract_task_lines for very large work logs.
     
-    if tasks:
-        return tasks
-    
-    # Second pass: find content after task header keywords
-    header_keywords = [
-        "today's tasks",
-        "tasks completed today",
-        "summary of today's work",
-        "work log for today",
-        "here is what i completed today",
-        "completed today",
-        "today i",
-    ]
-    
-    normalized_lines = [l.lower() for l in lines]
-    start_idx = -1
+    Accepts any iterable of lines (including an open file) and yields tasks
+    as they are read, holding at most `lookahead` line records in memory.
+    The bullet/header/fallback decision is made from that window, so the
+    output matches extract_task_lines whenever the first bullet or header
+    line falls inside it, or the whole input fits in it.
+    The worklog policy needs no lookahead and always matches extract_tasks.
+    
+    Args:
+        lines: Iterable of prompt lines (trailing newlines are ignored)
+        lookahead: Max lines buffered before choosing a strategy
+        policy: POLICY_PROMPT or POLICY_WORKLOG
     
-    for idx, l in enumerate(normalized_lines):
-        if any(keyword in l for keyword in header_keywords):
+    Yields:
+        Task strings in input order
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    lines = iter(lines)
+    
+    if policy == POLICY_WORKLOG:
+        for line in lines:
+            task = worklog_task(classify_line(line))
+            if task is not None:
+                yield task
+        return
+    if policy != POLICY_PROMPT:
+        raise ValueError(f"Unknown parser policy: {policy}")
+    
+    buffer: List[LineRecord] = []
+    found_bullet = False
+    for line in lines:
+        record = classify_line(line)
+        buffer.append(record)
+        if record[0] == LINE_BULLET or record[0] == LINE_NUMBERED:
+            found_bullet = True
+            break
+        if len(buffer) >= lookahead:
+            break
+    else:
+        # Whole input fit in the window: exact batch semantics
+        yield from select_tasks(buffer)
+        return
+    
+    if found_bullet:
+        # Bullet pass: only bullet/numbered lines are tasks
+        yield from (text for kind, text, _ in buffer if kind == LINE_BULLET or kind == LINE_NUMBERED)
+        for line in lines:
+            kind, text, _ = classify_line(line)
+            if kind == LINE_BULLET or kind == LINE_NUMBERED:
+                yield text
+        return
+    
+    start_idx = -1
+    for idx, (_, _, is_header) in enumerate(buffer):
+        if is_header:
             start_idx = idx + 1
             break
     
     if start_idx != -1:
-        for line in lines[start_idx:]:
-            if should_skip_line(line):
-                continue
-            stripped = line.strip()
-            
-            if len(stripped) > 5:
-                tasks.append(stripped)
+        # Header pass; pre-header lines are kept only for the empty-result fallback
+        min_length = 5
+        fallback = [text for kind, text, _ in buffer[:start_idx] if kind == LINE_TEXT and len(text) > 10]
+        pending = buffer[start_idx:]
+    else:
+        min_length = 10
+        fallback = []
+        pending = buffer
+    buffer = []
     
-    if not tasks:
-        for line in lines:
-            if should_skip_line(line):
-                continue
-            stripped = line.strip()
-            if len(stripped) > 10:
-                tasks.append(stripped)
+    emitted = False
+    for kind, text, _ in pending:
+        if kind == LINE_TEXT and len(text) > min_length:
+            emitted = True
+            yield text
+    pending = []
     
-    return tasks
+    for line in lines:
+        kind, text, _ = classify_line(line)
+        # Late bullets cannot retract earlier output; keep them as tasks
+        if kind == LINE_BULLET or kind == LINE_NUMBERED or (kind == LINE_TEXT and len(text) > min_length):
+            emitted = True
+            yield text
+    
+    if not emitted:
+        yield from fallback
+
 
 def extract_tasks(text: str) -> list:
     """
     Extract tasks from raw text without requiring 'Send to:' line.
+    Uses the shared line tokenizer with the worklog policy.
     
     Args:
         text: Raw work log text
@@ -135,25 +465,7 @@ def extract_tasks(text: str) -> list:
     Returns:
         List of extracted tasks
     """
-    lines = text.strip().split("\n")
-    tasks = []
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        
-        # Skip headers/labels
-        if line.lower().startswith(("today", "completed", "tasks:", "work log")):
-            continue
-        
-        # Remove bullet points, numbers, etc.
-        cleaned = line.lstrip("•-*#123456789.") .strip()
-        
-        if cleaned:
-            tasks.append(cleaned)
-    
-    return tasks
+    return select_worklog_tasks(classify_lines(text.splitlines()))
 
 
 def parse_prompt(raw_prompt: str) -> Tuple[str | None, List[str]]:
@@ -171,29 +483,227 @@ def parse_prompt(raw_prompt: str) -> Tuple[str | None, List[str]]:
     return email, tasks
 
 
-# LLM-based fallback parser
-def parse_prompt_with_llm_fallback(
-    raw_prompt: str,
-    llm_client=None,
-) -> Tuple[str | None, List[str]]:
+@dataclass
+class ParseResult:
+    recipient_email: Optional[str]
+    tasks: List[str]
+    confidence: float
+    strategy: str
+    signals: Dict[str, int] = field(default_factory=dict)
+
+
+# Base confidence per extraction strategy
+STRATEGY_CONFIDENCE = {
+    STRATEGY_BULLET: 0.95,
+    STRATEGY_HEADER: 0.7,
+    STRATEGY_FALLBACK: 0.4,
+    STRATEGY_NONE: 0.0,
+}
+
+# Below this confidence parse_prompt_with_llm_fallback asks the LLM
+LLM_CONFIDENCE_THRESHOLD = float(os.getenv("LLM_CONFIDENCE_THRESHOLD", "0.6"))
+
+
+def score_parse(
+    email: Optional[str],
+    strategy: str,
+    tasks: List[str],
+    records: List[LineRecord],
+) -> Tuple[float, Dict[str, int]]:
     """
-    Use regex parser first, fall back to LLM if extraction fails.
-    This requires an initialized LLM client (Ollama via LangChain).
+    Score how much the regex result can be trusted, in [0, 1].
+    
+    Signals: extraction strategy, share of non-blank lines that were bullets
+    vs free text, lines skipped as metadata/email, tasks that look like
+    inline comma-separated lists, and whether a recipient was found.
     """
-    email, tasks = parse_prompt(raw_prompt)
+    signals = {
+        "bullet_lines": 0,
+        "text_lines": 0,
+        "skipped_lines": 0,
+        "header_found": 0,
+        "inline_list_tasks": 0,
+    }
+    for kind, _, is_header in records:
+        if kind == LINE_BULLET or kind == LINE_NUMBERED:
+            signals["bullet_lines"] += 1
+        elif kind == LINE_TEXT:
+            signals["text_lines"] += 1
+        elif kind != LINE_BLANK:
+            signals["skipped_lines"] += 1
+        if is_header:
+            signals["header_found"] = 1
+    signals["inline_list_tasks"] = sum(1 for task in tasks if task.count(",") >= 2)
     
-    # If regex worked well, return immediately
-    if email and len(tasks) >= 3:
-        return email, tasks
+    confidence = STRATEGY_CONFIDENCE[strategy]
     
-    # Otherwise, use LLM to extract
-    if llm_client is None:
-        # No LLM available, return regex results anyway
-        return email, tasks
+    if strategy == STRATEGY_BULLET:
+        # Free text next to bullets may be missed tasks
+        content = signals["bullet_lines"] + signals["text_lines"]
+        confidence *= 0.75 + 0.25 * signals["bullet_lines"] / content
+    elif strategy == STRATEGY_FALLBACK and signals["header_found"]:
+        # A header with nothing usable after it
+        confidence *= 0.75
+    
+    if signals["inline_list_tasks"]:
+        confidence *= 0.5
     
+    non_blank = signals["bullet_lines"] + signals["text_lines"] + signals["skipped_lines"]
+    if non_blank:
+        # Metadata-heavy prompts leave little task content to go on
+        confidence *= 1.0 - 0.3 * signals["skipped_lines"] / non_blank
+    
+    if not email:
+        confidence *= 0.6
+    
+    return round(confidence, 4), signals
+
+
+def parse_prompt_scored(raw_prompt: str) -> ParseResult:
+    """
+    Regex parse with a confidence score and the signals behind it.
+    Tasks and recipient match parse_prompt.
+    """
+    email = extract_recipient_email(raw_prompt)
+    records = classify_lines(raw_prompt.splitlines())
+    strategy, tasks = select_tasks_with_strategy(records)
+    confidence, signals = score_parse(email, strategy, tasks, records)
+    return ParseResult(
+        recipient_email=email,
+        tasks=tasks,
+        confidence=confidence,
+        strategy=strategy,
+        signals=signals,
+    )
+
+
+# Process-pool cost model, measured with `scripts/benchmark_parser.py --pool-crossover`
+# on the synthetic dataset: in-process parse time per prompt, pool startup per
+# worker, and the pickling/IPC time the pool adds per prompt
+PARSE_COST_US = 14.4
+POOL_STARTUP_US_PER_WORKER = 5125.0
+POOL_OVERHEAD_US = 5.4
+# Fixed batch size at which to start a pool (unset = derive from the cost model)
+PARSE_POOL_MIN_BATCH = os.getenv("PARSE_POOL_MIN_BATCH")
+# Chunks in flight per worker; bounds how far input is read ahead of the consumer
+POOL_PENDING_CHUNKS_PER_WORKER = 2
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects affinity and container cpusets)."""
     try:
-        # Prepare prompt for LLM
-        llm_prompt = f"""Extract the following from this work log:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def pool_crossover(
+    workers: int,
+    parse_cost_us: float = PARSE_COST_US,
+    startup_us_per_worker: float = POOL_STARTUP_US_PER_WORKER,
+    overhead_us: float = POOL_OVERHEAD_US,
+) -> Optional[int]:
+    """
+    Smallest batch a pool of `workers` processes parses faster than one
+    process, or None when it never does (one CPU, or IPC costs more than
+    the parallel speedup saves).
+    
+    Pool time is startup * workers + N * (parse / parallelism + overhead);
+    in-process time is N * parse.
+    """
+    parallelism = min(workers, available_cpus())
+    if parallelism <= 1:
+        return None
+    saving_us = parse_cost_us * (1 - 1 / parallelism) - overhead_us
+    if saving_us <= 0:
+        return None
+    return math.ceil(startup_us_per_worker * workers / saving_us)
+
+
+def _parse_chunk(prompts: List[str]) -> List[Tuple[str | None, List[str]]]:
+    return [parse_prompt(prompt) for prompt in prompts]
+
+
+def _parse_pooled(
+    prompts: Iterator[str],
+    workers: int,
+    chunksize: int,
+) -> Iterator[Tuple[str | None, List[str]]]:
+    # Unlike executor.map, which submits the whole iterable up front, keep
+    # only a few chunks per worker in flight and read more as results are consumed
+    chunks = iter(lambda: list(islice(prompts, chunksize)), [])
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque(
+            executor.submit(_parse_chunk, chunk)
+            for chunk in islice(chunks, workers * POOL_PENDING_CHUNKS_PER_WORKER)
+        )
+        try:
+            while pending:
+                results = pending.popleft().result()
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    pending.append(executor.submit(_parse_chunk, chunk))
+                yield from results
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def parse_prompts(
+    prompts: Iterable[str],
+    workers: Optional[int] = None,
+    chunksize: int = 64,
+    min_batch: Optional[int] = None,
+) -> Iterator[Tuple[str | None, List[str]]]:
+    """
+    Parse many prompts, yielding (recipient_email, tasks) in input order.
+    
+    A process pool is only started once the batch reaches the size where
+    it beats parsing in-process (see pool_crossover); below that, or when
+    the pool can never win, prompts are parsed in this process.
+    
+    Args:
+        prompts: Iterable of raw prompts
+        workers: Process count (defaults to available CPUs; <= 1 parses in-process)
+        chunksize: Prompts sent to a worker per round-trip
+        min_batch: Batch size at which to use the pool (defaults to
+            PARSE_POOL_MIN_BATCH, else pool_crossover(workers))
+    
+    Yields:
+        parse_prompt results, one per input prompt
+    """
+    if workers is None:
+        workers = available_cpus()
+    if min_batch is None and workers > 1:
+        min_batch = int(PARSE_POOL_MIN_BATCH) if PARSE_POOL_MIN_BATCH else pool_crossover(workers)
+    
+    prompts = iter(prompts)
+    
+    # Single worker, or a pool that cannot pay for itself on this host
+    if workers <= 1 or min_batch is None:
+        for prompt in prompts:
+            yield parse_prompt(prompt)
+        return
+    
+    head = list(islice(prompts, min_batch))
+    if len(head) < min_batch:
+        for prompt in head:
+            yield parse_prompt(prompt)
+        return
+    
+    yield from _parse_pooled(chain(head, prompts), workers, max(1, chunksize))
+
+
+# LLM-based fallback parser
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+
+# Only logs up to this size are packed into a shared multi-log request
+LLM_PACK_MAX_CHARS = 2000
+
+
+def _build_llm_prompt(raw_prompt: str) -> str:
+    """Single-log extraction prompt."""
+    return f"""Extract the following from this work log:
 1. Recipient email address
 2. List of tasks completed
 
@@ -208,27 +718,205 @@ Respond in JSON format:
 
 Only return the JSON, nothing else."""
 
-        response = llm_client.invoke(llm_prompt)
-        
-        # Parse JSON from LLM response
-        response_text = response.strip()
-        if response_text.startswith("```"):
-            # Extract content between code fences
-            lines = response_text.split("\n")
-            response_text = "\n".join(lines[1:-1])
-        
-        parsed = json.loads(response_text)
-        
-        llm_email = parsed.get("recipient_email")
-        llm_tasks = parsed.get("tasks", [])
-        
-        # Use LLM results if better than regex
-        final_email = llm_email if llm_email else email
-        final_tasks = llm_tasks if len(llm_tasks) > len(tasks) else tasks
-        
-        return final_email, final_tasks
+
+def _build_packed_llm_prompt(raw_prompts: List[str]) -> str:
+    """Multi-log extraction prompt answered with one JSON array."""
+    logs = "\n\n".join(
+        f"### Log {idx}\n{raw_prompt}" for idx, raw_prompt in enumerate(raw_prompts)
+    )
+    return f"""Extract the following from each of these {len(raw_prompts)} work logs:
+1. Recipient email address
+2. List of tasks completed
+
+{logs}
+
+Respond with a JSON array containing one object per log, in order:
+[
+  {{"index": 0, "recipient_email": "email@example.com", "tasks": ["task 1", "task 2"]}}
+]
+
+Only return the JSON, nothing else."""
+
+
+def _invoke_llm_json(llm_client, llm_prompt: str):
+    """Invoke the LLM and decode its JSON answer."""
+    response = llm_client.invoke(llm_prompt)
+    
+    # Chat models return a message, plain LLMs a string
+    response_text = getattr(response, "content", response).strip()
+    if response_text.startswith("```"):
+        # Extract content between code fences
+        lines = response_text.split("\n")
+        response_text = "\n".join(lines[1:-1])
+    
+    return json.loads(response_text)
+
+
+def _valid_llm_entry(item) -> bool:
+    """
+    True for an object shaped like {"recipient_email": str | null,
+    "tasks": [str, ...]}; either key may be missing.
+    """
+    if not isinstance(item, dict):
+        return False
+    email = item.get("recipient_email")
+    tasks = item.get("tasks", [])
+    return (
+        (email is None or isinstance(email, str))
+        and isinstance(tasks, list)
+        and all(isinstance(task, str) for task in tasks)
+    )
+
+
+def _merge_llm_result(
+    email: Optional[str],
+    tasks: List[str],
+    parsed: dict,
+) -> Tuple[str | None, List[str]]:
+    """
+    Use LLM results where they beat the regex results.
+    Raises ValueError if the LLM entry has the wrong shape.
+    """
+    if not _valid_llm_entry(parsed):
+        raise ValueError(f"Malformed LLM entry: {parsed!r:.200}")
+    llm_email = parsed.get("recipient_email")
+    llm_tasks = parsed.get("tasks", [])
+    
+    final_email = llm_email if llm_email else email
+    final_tasks = llm_tasks if len(llm_tasks) > len(tasks) else tasks
+    
+    return final_email, final_tasks
+
+
+def parse_prompt_with_llm_fallback(
+    raw_prompt: str,
+    llm_client=None,
+    confidence_threshold: float = LLM_CONFIDENCE_THRESHOLD,
+) -> Tuple[str | None, List[str]]:
+    """
+    Use regex parser first, fall back to LLM if extraction fails.
+    The LLM is only called when the regex confidence is below confidence_threshold.
+    This requires an initialized LLM client (Ollama via LangChain).
+    """
+    result = parse_prompt_scored(raw_prompt)
+    email, tasks = result.recipient_email, result.tasks
+    
+    # If regex worked well, return immediately
+    if result.confidence >= confidence_threshold:
+        return email, tasks
+    
+    # Otherwise, use LLM to extract
+    if llm_client is None:
+        # No LLM available, return regex results anyway
+        return email, tasks
+    
+    try:
+        parsed = _invoke_llm_json(llm_client, _build_llm_prompt(raw_prompt))
+        return _merge_llm_result(email, tasks, parsed)
         
     except Exception as e:
         # LLM failed, return regex results
         print(f"LLM fallback failed: {e}")
         return email, tasks
+
+
+def _split_packed_response(parsed, count: int) -> List[Optional[dict]]:
+    """
+    Map a packed JSON-array answer back to its logs.
+    Entries are matched by "index" when present, else by position;
+    anything missing or malformed comes back as None.
+    """
+    entries: List[Optional[dict]] = [None] * count
+    if not isinstance(parsed, list):
+        return entries
+    
+    for position, item in enumerate(parsed):
+        if not _valid_llm_entry(item):
+            continue
+        idx = item.get("index", position)
+        if isinstance(idx, int) and 0 <= idx < count and entries[idx] is None:
+            entries[idx] = item
+    return entries
+
+
+def parse_prompts_with_llm_fallback(
+    raw_prompts: List[str],
+    llm_client=None,
+    confidence_threshold: float = LLM_CONFIDENCE_THRESHOLD,
+    max_concurrency: int = LLM_MAX_CONCURRENCY,
+    pack_size: int = 1,
+    pack_max_chars: int = LLM_PACK_MAX_CHARS,
+) -> List[Tuple[str | None, List[str]]]:
+    """
+    Batch version of parse_prompt_with_llm_fallback.
+    
+    Low-confidence prompts are sent to the LLM concurrently, at most
+    max_concurrency requests in flight. With pack_size > 1, up to that many
+    small logs share one JSON-array request. A prompt whose request fails,
+    or whose entry is missing or malformed, keeps its regex result.
+    
+    Args:
+        raw_prompts: Prompts to parse
+        llm_client: LangChain-style client exposing invoke(prompt)
+        confidence_threshold: LLM is used below this regex confidence
+        max_concurrency: Max concurrent LLM requests
+        pack_size: Max logs per LLM request (1 disables packing)
+        pack_max_chars: Longer logs are always sent on their own
+    
+    Returns:
+        (recipient_email, tasks) per prompt, in input order
+    """
+    raw_prompts = list(raw_prompts)
+    scored = [parse_prompt_scored(raw_prompt) for raw_prompt in raw_prompts]
+    results = [(result.recipient_email, result.tasks) for result in scored]
+    
+    if llm_client is None:
+        return results
+    
+    # Group low-confidence prompts into requests
+    jobs: List[List[int]] = []
+    pack: List[int] = []
+    for idx, result in enumerate(scored):
+        if result.confidence >= confidence_threshold:
+            continue
+        if pack_size > 1 and len(raw_prompts[idx]) <= pack_max_chars:
+            pack.append(idx)
+            if len(pack) == pack_size:
+                jobs.append(pack)
+                pack = []
+        else:
+            jobs.append([idx])
+    if pack:
+        jobs.append(pack)
+    
+    if not jobs:
+        return results
+    
+    def run_job(job: List[int]) -> List[Optional[dict]]:
+        if len(job) == 1:
+            parsed = _invoke_llm_json(llm_client, _build_llm_prompt(raw_prompts[job[0]]))
+            return [parsed if _valid_llm_entry(parsed) else None]
+        packed_prompt = _build_packed_llm_prompt([raw_prompts[idx] for idx in job])
+        return _split_packed_response(_invoke_llm_json(llm_client, packed_prompt), len(job))
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        futures = {executor.submit(run_job, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                entries = future.result()
+            except Exception as e:
+                # Whole request failed: every log in it keeps its regex result
+                print(f"LLM fallback failed for {len(job)} prompt(s): {e}")
+                continue
+            
+            for idx, entry in zip(job, entries):
+                if entry is None:
+                    continue
+                try:
+                    results[idx] = _merge_llm_result(*results[idx], entry)
+                except ValueError as e:
+                    # Only this prompt falls back to its regex result
+                    print(f"LLM fallback ignored for prompt {idx}: {e}")
+    
+    return results
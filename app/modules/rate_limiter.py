@@ -0,0 +1,323 @@
+"""Process-wide token-bucket rate limiting and retry scheduling for LLM calls."""
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Optional, TypeVar
+
+import groq
+
+GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+GROQ_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", "6000"))
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "3"))
+RETRY_BASE_DELAY = float(os.getenv("GROQ_RETRY_BASE_DELAY", "1.0"))
+RETRY_MAX_DELAY = float(os.getenv("GROQ_RETRY_MAX_DELAY", "30.0"))
+
+RETRYABLE_ERRORS = (
+    groq.RateLimitError,
+    groq.APIConnectionError,  # includes APITimeoutError
+    groq.InternalServerError,
+    TimeoutError,
+    ConnectionError,
+)
+
+T = TypeVar("T")
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a caller gives up waiting for rate-limit capacity."""
+
+
+class RateLimitCancelled(Exception):
+    """Raised in a waiting thread whose acquire() was cancelled via its ticket."""
+
+
+class AcquireTicket:
+    """
+    Handle for cancelling an acquire() running on another thread, e.g.
+    under asyncio.to_thread when the awaiting task is cancelled.
+    """
+    __slots__ = ("waiter", "cancelled")
+
+    def __init__(self):
+        self.waiter: Optional["_Waiter"] = None
+        self.cancelled = False
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limits, timeouts, connection drops and 5xx are worth retrying."""
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Seconds requested by a Retry-After header, if the error carries one."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(
+    attempt: int,
+    error: Optional[BaseException] = None,
+    base_delay: float = RETRY_BASE_DELAY,
+    max_delay: float = RETRY_MAX_DELAY,
+) -> float:
+    """
+    Exponential backoff with full jitter: uniform in [0, base * 2^attempt],
+    capped at max_delay. A provider Retry-After takes precedence as a floor.
+    """
+    delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+    retry_after = _retry_after(error) if error is not None else None
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, max_delay))
+    return delay
+
+
+class _Waiter:
+    __slots__ = ("user_id", "tokens", "enqueued_at", "granted")
+
+    def __init__(self, user_id: str, tokens: int):
+        self.user_id = user_id
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+class RateLimiter:
+    """
+    Two token buckets (requests/min and tokens/min) with a fair queue.
+
+    Waiters are grouped per user and served round-robin, one request per
+    user per turn, so a user submitting a burst cannot starve others.
+    The head of the rotation is never skipped, so large requests are not
+    starved by small ones either. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = GROQ_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = GROQ_TOKENS_PER_MINUTE,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_level = float(requests_per_minute)
+        self._token_level = float(tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._cond = threading.Condition()
+        self.counters = {
+            "granted": 0,
+            "retries": 0,
+            "retries_exhausted": 0,
+            "timeouts": 0,
+            "cancelled": 0,
+            "total_wait_s": 0.0,
+            "max_wait_s": 0.0,
+            "max_queue_depth": 0,
+        }
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        self._request_level = min(
+            self.requests_per_minute, self._request_level + elapsed * self.requests_per_minute / 60
+        )
+        self._token_level = min(
+            self.tokens_per_minute, self._token_level + elapsed * self.tokens_per_minute / 60
+        )
+
+    def _queue_depth(self) -> int:
+        return sum(len(waiters) for waiters in self._queues.values())
+
+    def _cost(self, waiter: _Waiter) -> int:
+        # A request larger than the whole bucket waits for a full bucket
+        return min(waiter.tokens, self.tokens_per_minute)
+
+    def _dispatch(self, now: float) -> Optional[float]:
+        """
+        Grant waiters in round-robin order while capacity lasts.
+        Returns seconds until the next waiter can be served, or None if idle.
+        """
+        self._refill(now)
+        while self._queues:
+            user_id, waiters = next(iter(self._queues.items()))
+            head = waiters[0]
+            cost = self._cost(head)
+            if self._request_level < 1 or self._token_level < cost:
+                return max(
+                    (1 - self._request_level) * 60 / self.requests_per_minute,
+                    (cost - self._token_level) * 60 / self.tokens_per_minute,
+                    0.001,
+                )
+
+            self._request_level -= 1
+            self._token_level -= cost
+            waiters.popleft()
+            head.granted = True
+
+            waited = now - head.enqueued_at
+            self.counters["granted"] += 1
+            self.counters["total_wait_s"] += waited
+            self.counters["max_wait_s"] = max(self.counters["max_wait_s"], waited)
+
+            # Rotate this user to the back of the line
+            del self._queues[user_id]
+            if waiters:
+                self._queues[user_id] = waiters
+        return None
+
+    def acquire(
+        self,
+        user_id: str,
+        tokens: int,
+        timeout: Optional[float] = None,
+        ticket: Optional[AcquireTicket] = None,
+    ) -> float:
+        """
+        Block until one request and `tokens` tokens are available for this
+        user's turn.
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            RateLimitTimeout: If timeout elapses first
+            RateLimitCancelled: If cancel(ticket) was called
+        """
+        waiter = _Waiter(user_id, tokens)
+        deadline = None if timeout is None else waiter.enqueued_at + timeout
+
+        with self._cond:
+            if ticket is not None:
+                if ticket.cancelled:
+                    raise RateLimitCancelled("Cancelled before queueing")
+                ticket.waiter = waiter
+            self._queues.setdefault(user_id, deque()).append(waiter)
+            self.counters["max_queue_depth"] = max(self.counters["max_queue_depth"], self._queue_depth())
+
+            while True:
+                if ticket is not None and ticket.cancelled:
+                    raise RateLimitCancelled("Cancelled while queued")
+                now = time.monotonic()
+                next_ready = self._dispatch(now)
+                if waiter.granted:
+                    self._cond.notify_all()
+                    return now - waiter.enqueued_at
+
+                wait_for = next_ready
+                if deadline is not None:
+                    if now >= deadline:
+                        self._abandon(waiter)
+                        raise RateLimitTimeout(f"No LLM capacity within {timeout}s")
+                    wait_for = min(wait_for or deadline - now, deadline - now)
+                self._cond.wait(timeout=wait_for)
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        waiters = self._queues.get(waiter.user_id)
+        if waiters is not None:
+            waiters.remove(waiter)
+            if not waiters:
+                del self._queues[waiter.user_id]
+        self.counters["timeouts"] += 1
+        self._cond.notify_all()
+
+    def cancel(self, ticket: AcquireTicket) -> None:
+        """
+        Withdraw the acquire() holding this ticket. A queued waiter leaves
+        the queue; capacity already granted to a caller that will never
+        use it goes back to the buckets.
+        """
+        with self._cond:
+            if ticket.cancelled:
+                return
+            ticket.cancelled = True
+            waiter = ticket.waiter
+            if waiter is not None:
+                if waiter.granted:
+                    self._request_level = min(self.requests_per_minute, self._request_level + 1)
+                    self._token_level = min(self.tokens_per_minute, self._token_level + self._cost(waiter))
+                else:
+                    waiters = self._queues.get(waiter.user_id)
+                    if waiters is not None and waiter in waiters:
+                        waiters.remove(waiter)
+                        if not waiters:
+                            del self._queues[waiter.user_id]
+            self.counters["cancelled"] += 1
+            self._cond.notify_all()
+
+    def refund(self, tokens: int) -> None:
+        """Return over-reserved tokens once actual usage is known."""
+        if tokens <= 0:
+            return
+        with self._cond:
+            self._token_level = min(self.tokens_per_minute, self._token_level + tokens)
+            self._cond.notify_all()
+
+    def settle(self, reserved: int, used: int = 0) -> None:
+        """
+        Return the unused part of a granted reservation of `reserved`
+        tokens; a failed attempt settles with used=0. Only what acquire()
+        took from the bucket (at most one full bucket) is returned.
+        """
+        self.refund(min(reserved, self.tokens_per_minute) - used)
+
+    def record_retry(self) -> None:
+        with self._cond:
+            self.counters["retries"] += 1
+
+    def call_with_retry(
+        self,
+        fn: Callable[[], T],
+        user_id: str,
+        tokens: int,
+        max_retries: int = GROQ_MAX_RETRIES,
+        used: Optional[Callable[[T], int]] = None,
+    ) -> T:
+        """
+        Run fn under the limiter, retrying retryable errors with jittered
+        exponential backoff. Each attempt waits for its own turn; a failed
+        attempt returns its reservation before the next one is made. If
+        used is given, it reports the tokens the successful result
+        consumed and the rest of the reservation is returned.
+        """
+        attempt = 0
+        while True:
+            self.acquire(user_id, tokens)
+            try:
+                result = fn()
+            except Exception as e:
+                self.settle(tokens)
+                if not is_retryable(e):
+                    raise
+                if attempt >= max_retries:
+                    with self._cond:
+                        self.counters["retries_exhausted"] += 1
+                    raise
+                delay = backoff_delay(attempt, e)
+                print(f"Groq call failed ({type(e).__name__}), retry {attempt + 1} in {delay:.1f}s")
+                self.record_retry()
+                time.sleep(delay)
+                attempt += 1
+                continue
+            if used is not None:
+                self.settle(tokens, used(result))
+            return result
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            self._refill(time.monotonic())
+            granted = self.counters["granted"]
+            return {
+                **self.counters,
+                "queue_depth": self._queue_depth(),
+                "waiting_users": len(self._queues),
+                "avg_wait_s": self.counters["total_wait_s"] / granted if granted else 0.0,
+                "requests_available": self._request_level,
+                "tokens_available": self._token_level,
+            }
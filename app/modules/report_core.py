@@ -0,0 +1,235 @@
+"""Streamlit-independent building blocks for report generation."""
+import os
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional
+
+from langchain_groq import ChatGroq
+
+from .prompt_builder import PROMPT_VERSION, BuiltPrompt, build_prompt, estimate_tokens
+from .response_cache import ResponseCache, make_cache_key
+
+GROQ_MODEL = "llama-3.1-8b-instant"
+GROQ_TIMEOUT_SECONDS = float(os.getenv("GROQ_TIMEOUT_SECONDS", "30"))
+
+
+@dataclass
+class EmailReport:
+    subject: str
+    body_html: str
+    metadata: Optional[dict] = None
+
+
+def create_groq_client(api_key: Optional[str] = None) -> ChatGroq:
+    """
+    Create a Groq chat client without touching Streamlit.
+    
+    Args:
+        api_key: Groq API key (defaults to the GROQ_API_KEY environment variable)
+    
+    Returns:
+        Configured ChatGroq client
+    """
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError("Missing GROQ_API_KEY")
+    
+    return ChatGroq(
+        model=GROQ_MODEL,
+        temperature=0.7,
+        max_tokens=2048,
+        timeout=GROQ_TIMEOUT_SECONDS,
+        # Retries are scheduled by the rate limiter instead
+        max_retries=0,
+        groq_api_key=api_key
+    )
+
+
+TONE_MARKER_REGEX = re.compile(r"<!--\s*TONE:\s*([A-Za-z]+)\s*-->")
+STRAY_FENCE_REGEX = re.compile(r"```(?:html)?")
+
+
+def split_tone_variants(response_text: str, tones: List[str]) -> Optional[Dict[str, str]]:
+    """
+    Split a multi-tone response on its tone markers.
+    Returns {tone: body_html}, or None unless every requested tone has a
+    non-empty HTML body.
+    """
+    parts = TONE_MARKER_REGEX.split(response_text)
+    variants = {}
+    for tone, body in zip(parts[1::2], parts[2::2]):
+        tone = tone.lower()
+        body = STRAY_FENCE_REGEX.sub("", body).strip()
+        if tone in tones and tone not in variants and "<" in body:
+            variants[tone] = body
+    if set(variants) != set(tones):
+        return None
+    return variants
+
+
+def generate_subject(tasks: List[str], report_date: date) -> str:
+    """Generate email subject line."""
+    date_str = report_date.strftime("%b %d, %Y")
+    
+    if not tasks or len(tasks) == 0:
+        return f"Daily Task Report - {date_str}"
+    
+    first_task = str(tasks[0]) if tasks else ""
+    
+    if first_task:
+        # Extract key words
+        key_words = []
+        for word in first_task.split():
+            if len(word) > 4 and word.lower() not in ["fixed", "implemented", "worked", "attended"]:
+                key_words.append(word)
+                if len(key_words) >= 2:
+                    break
+        
+        if key_words:
+            keyword_str = " ".join(key_words[:2])
+            return f"Daily Update: {keyword_str} - {date_str}"
+    
+    return f"Daily Task Report - {date_str}"
+
+
+def clean_tasks(tasks: List) -> List[str]:
+    """Flatten nested task lists and drop empty entries."""
+    cleaned_tasks = []
+    for task in tasks:
+        if isinstance(task, list):
+            for item in task:
+                if item and str(item).strip():
+                    cleaned_tasks.append(str(item).strip())
+        elif task and str(task).strip():
+            cleaned_tasks.append(str(task).strip())
+    return cleaned_tasks
+
+
+def clean_html_response(body_html: str) -> str:
+    """Strip markdown code fences the model sometimes wraps around the HTML."""
+    if "```html" in body_html:
+        parts = body_html.split("```html")
+        if len(parts) > 1:
+            body_html = parts[1].split("```")[0]
+    elif "```" in body_html:
+        parts = body_html.split("```")
+        if len(parts) >= 3:
+            body_html = parts[1]
+    
+    return body_html.strip()
+
+
+@dataclass
+class ReportRequest:
+    """Normalized inputs of one report generation."""
+    tasks: List[str]
+    manager_name: str
+    report_date: date
+    tone: str
+    sender_name: str
+    date_str: str
+    subject: str
+    cache_key: str
+    prompt: BuiltPrompt
+
+
+def prepare_request(
+    tasks: List[str],
+    manager_name: str,
+    report_date: Optional[date],
+    tone: str,
+    sender_name: str,
+) -> ReportRequest:
+    """Validate and normalize generation inputs."""
+    if not tasks:
+        raise ValueError("No tasks provided")
+    
+    if not sender_name or not sender_name.strip():
+        sender_name = "Team Member"
+
+    tasks = clean_tasks(tasks)
+    if not tasks:
+        raise ValueError("No valid tasks after cleaning")
+    
+    if report_date is None:
+        report_date = date.today()
+    
+    date_str = report_date.strftime("%B %d, %Y")
+    return ReportRequest(
+        tasks=tasks,
+        manager_name=manager_name,
+        report_date=report_date,
+        tone=tone,
+        sender_name=sender_name,
+        date_str=date_str,
+        subject=generate_subject(tasks, report_date),
+        cache_key=make_cache_key(
+            tasks, manager_name, report_date, tone, sender_name, GROQ_MODEL,
+            prompt_version=PROMPT_VERSION,
+        ),
+        prompt=build_prompt(tasks, manager_name, date_str, tone, sender_name),
+    )
+
+
+def bind_output_budget(llm, request: ReportRequest):
+    """Limit the completion to the size the prompt builder estimated."""
+    return llm.bind(max_tokens=request.prompt.max_tokens)
+
+
+def reserved_tokens(prompt: BuiltPrompt) -> int:
+    """Tokens to reserve under the rate limiter: prompt estimate plus completion cap."""
+    return prompt.estimates["prompt_tokens_est"] + prompt.max_tokens
+
+
+def tokens_used(prompt: BuiltPrompt, response) -> int:
+    """
+    Tokens a call actually consumed: the provider's count when the
+    response carries usage metadata, otherwise an estimate from the text.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage and usage.get("total_tokens"):
+        return usage["total_tokens"]
+    return prompt.estimates["prompt_tokens_est"] + estimate_tokens(response.content)
+
+
+def report_inputs(request: ReportRequest) -> dict:
+    """Inputs recorded in metadata so a report can later be patched in place."""
+    return {
+        "tasks": request.tasks,
+        "tone": request.tone,
+        "manager_name": request.manager_name,
+        "sender_name": request.sender_name,
+        "report_date": request.report_date.isoformat(),
+    }
+
+
+def cached_report(cache: ResponseCache, request: ReportRequest) -> Optional[EmailReport]:
+    """Return the cached report for this request, if any."""
+    cached = cache.get(request.cache_key)
+    if cached is None:
+        return None
+    
+    value, tier = cached
+    print(f"Response cache hit ({tier}) for {len(request.tasks)} tasks")
+    return EmailReport(
+        subject=value["subject"],
+        body_html=value["body_html"],
+        metadata={**value["metadata"], "cache_hit": True, "cache_tier": tier},
+    )
+
+
+def store_report(
+    cache: ResponseCache, request: ReportRequest, body_html: str, metadata: dict
+) -> EmailReport:
+    """Cache a freshly generated body and wrap it in an EmailReport."""
+    metadata = {**request.prompt.estimates, **metadata, **report_inputs(request)}
+    cache.set(
+        request.cache_key,
+        {"subject": request.subject, "body_html": body_html, "metadata": metadata},
+    )
+    return EmailReport(
+        subject=request.subject,
+        body_html=body_html,
+        metadata={**metadata, "cache_hit": False, "cache_tier": None},
+    )
@@ -1,17 +1,47 @@
 """AI-powered email generation using Groq API."""
+import os
+import queue
+import time
 import streamlit as st
-from langchain_groq import ChatGroq
-from langchain_core.messages import SystemMessage, HumanMessage
-from typing import Optional, List
-from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import replace
+from typing import Dict, Optional, List
 from datetime import date
 
+from .prompt_builder import BuiltPrompt, build_items_prompt, build_multi_tone_prompt
+from .rate_limiter import GROQ_MAX_RETRIES, RateLimiter, backoff_delay, is_retryable
+from .report_core import (
+    GROQ_MODEL,
+    EmailReport,
+    ReportRequest,
+    bind_output_budget,
+    cached_report,
+    clean_html_response,
+    clean_tasks,
+    create_groq_client,
+    prepare_request,
+    report_inputs,
+    reserved_tokens,
+    split_tone_variants,
+    store_report,
+    tokens_used,
+)
+from .report_patcher import (
+    apply_patch,
+    diff_tasks,
+    parse_items_response,
+    should_patch,
+    split_task_list,
+)
+from .response_cache import ResponseCache
+from .single_flight import SingleFlight
+from .template_renderer import render_fallback_report, render_template_report
 
-@dataclass
-class EmailReport:
-    subject: str
-    body_html: str
-    metadata: Optional[dict] = None
+TONES = ["formal", "neutral", "friendly"]
+
+# Default deadline for hedged generation (Refine & Send)
+LLM_LATENCY_BUDGET_SECONDS = float(os.getenv("LLM_LATENCY_BUDGET_SECONDS", "8"))
+HEDGE_MAX_WORKERS = int(os.getenv("HEDGE_MAX_WORKERS", "32"))
 
 
 @st.cache_resource
@@ -21,13 +51,7 @@ def init_groq_client():
     Uses Llama 3.1 8B model for fast inference.
     """
     try:
-        api_key = st.secrets["GROQ_API_KEY"]
-        return ChatGroq(
-            model="llama-3.1-8b-instant",
-            temperature=0.7,
-            max_tokens=2048,
-            groq_api_key=api_key
-        )
+        return create_groq_client(st.secrets["GROQ_API_KEY"])
     except KeyError:
         st.error("Missing GROQ_API_KEY in Streamlit secrets")
         st.stop()
@@ -36,29 +60,132 @@ def init_groq_client():
         st.stop()
 
 
-def _generate_subject(tasks: List[str], report_date: date) -> str:
-    """Generate email subject line."""
-    date_str = report_date.strftime("%b %d, %Y")
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    """Process-wide LLM response cache (memory LRU + SQLite)."""
+    return ResponseCache()
+
+
+@st.cache_resource
+def get_hedge_executor() -> ThreadPoolExecutor:
+    """Worker threads for LLM calls, which may outlive their caller's budget."""
+    return ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="llm-hedge")
+
+
+@st.cache_resource
+def get_single_flight() -> SingleFlight:
+    """Process-wide registry of in-flight generations, keyed by cache key."""
+    return SingleFlight()
+
+
+def _submit_generation(key: str, fn, *args):
+    """
+    Start fn on the worker pool, or join the identical generation already
+    in flight. Returns (future, leader).
+    """
+    future, leader = get_single_flight().submit(key, get_hedge_executor(), fn, *args)
+    if not leader:
+        print("Joining in-flight generation")
+    return future, leader
+
+
+def _own_copy(report: EmailReport, leader: bool) -> EmailReport:
+    """Per-caller copy of a possibly shared result, safe to annotate."""
+    return replace(report, metadata={**report.metadata, "single_flight_shared": not leader})
+
+
+@st.cache_resource
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide Groq rate limiter shared by all sessions."""
+    return RateLimiter()
+
+
+def _invoke_and_store(
+    llm,
+    cache: ResponseCache,
+    limiter: RateLimiter,
+    user_id: str,
+    request: ReportRequest,
+    messages: list,
+) -> EmailReport:
+    """Run one rate-limited LLM call (with retries) and cache the cleaned result."""
+    response = limiter.call_with_retry(
+        lambda: llm.invoke(messages),
+        user_id,
+        reserved_tokens(request.prompt),
+        used=lambda result: tokens_used(request.prompt, result),
+    )
+    body_html = clean_html_response(response.content)
     
-    if not tasks or len(tasks) == 0:
-        return f"Daily Task Report - {date_str}"
+    print(f"Groq API generated {len(body_html)} characters")
     
-    first_task = str(tasks[0]) if tasks else ""
+    return store_report(cache, request, body_html, {"generation_method": "groq", "model": GROQ_MODEL})
+
+
+def _hedge_metadata(
+    outcome: str,
+    latency_budget: float,
+    start: float,
+    template_ms: float,
+    llm_ms: Optional[float] = None,
+) -> dict:
+    """Timings recorded on hedged reports, for tuning the budget."""
+    return {
+        "hedge_outcome": outcome,
+        "latency_budget_s": latency_budget,
+        "template_render_ms": template_ms,
+        "llm_latency_ms": llm_ms,
+        "elapsed_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+def _log_late_result(start: float):
+    """Done-callback reporting how late an abandoned LLM call finished."""
+    def callback(future: Future):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if future.exception() is not None:
+            print(f"Late Groq call failed after {elapsed_ms:.0f} ms: {future.exception()}")
+        else:
+            print(f"Late Groq result cached after {elapsed_ms:.0f} ms")
+    return callback
+
+
+def _render_template_timed(request: ReportRequest):
+    """Render the template stand-in and return (report, render time in ms)."""
+    template_start = time.perf_counter()
+    template = render_template_report(
+        request.tasks, request.manager_name, request.report_date, request.tone, request.sender_name
+    )
+    return template, (time.perf_counter() - template_start) * 1000
+
+
+def _hedged_generate(
+    request: ReportRequest,
+    future: Future,
+    leader: bool,
+    latency_budget: float,
+) -> EmailReport:
+    """
+    Race the LLM against the deadline while the template renders locally.
+    A call that misses the deadline keeps running and caches its result,
+    so the next identical request gets the LLM version.
+    """
+    start = time.perf_counter()
+    template, template_ms = _render_template_timed(request)
     
-    if first_task:
-        # Extract key words
-        key_words = []
-        for word in first_task.split():
-            if len(word) > 4 and word.lower() not in ["fixed", "implemented", "worked", "attended"]:
-                key_words.append(word)
-                if len(key_words) >= 2:
-                    break
-        
-        if key_words:
-            keyword_str = " ".join(key_words[:2])
-            return f"Daily Update: {keyword_str} - {date_str}"
+    remaining = latency_budget - (time.perf_counter() - start)
+    done, _ = wait([future], timeout=max(remaining, 0))
+    if not done:
+        print(f"Groq API exceeded {latency_budget}s budget, returning template")
+        future.add_done_callback(_log_late_result(start))
+        template.metadata.update(_hedge_metadata("template", latency_budget, start, template_ms))
+        return template
     
-    return f"Daily Task Report - {date_str}"
+    # Raises the worker's exception, if any, for the caller's fallback handling
+    report = _own_copy(future.result(), leader)
+    llm_ms = (time.perf_counter() - start) * 1000
+    report.metadata.update(_hedge_metadata("llm", latency_budget, start, template_ms, llm_ms))
+    return report
 
 
 def generate_email_report(
@@ -67,122 +194,545 @@ def generate_email_report(
     report_date: Optional[date] = None,
     tone: str = "formal",
     sender_name: str = "",
+    force_fresh: bool = False,
+    fast_mode: bool = False,
+    fallback_on_error: bool = True,
+    latency_budget: Optional[float] = None,
+    user_id: str = "anonymous",
 ) -> EmailReport:
     """
     Generate complete email report using Groq API.
     
+    Identical requests (same normalized tasks, tone, names, date and model)
+    are served from the response cache unless force_fresh is set.
+    
     Args:
         tasks: List of completed tasks
         manager_name: Recipient's name for greeting
         report_date: Date of report (defaults to today)
         tone: Email tone (formal/neutral/friendly)
         sender_name: Name to sign email with
+        force_fresh: Skip the cache lookup (the fresh result is still cached)
+        fast_mode: Render the offline template instead of calling the LLM
+        fallback_on_error: Return the template report if the LLM call fails
+            or times out, instead of raising
+        latency_budget: Seconds to wait for the LLM before returning the
+            template instead; the LLM result is still cached when it lands.
+            Outcome and timings are recorded in metadata (hedge_outcome,
+            template_render_ms, llm_latency_ms, elapsed_ms).
+        user_id: Caller identity for fair scheduling under the rate limiter
     
     Returns:
         EmailReport with subject and HTML body
     """
-    if not tasks:
-        raise ValueError("No tasks provided")
+    if fast_mode:
+        return render_template_report(tasks, manager_name, report_date, tone, sender_name)
+    
+    request = prepare_request(tasks, manager_name, report_date, tone, sender_name)
+    
+    if not force_fresh:
+        cached = cached_report(get_response_cache(), request)
+        if cached is not None:
+            return cached
     
-    if not sender_name or not sender_name.strip():
-        sender_name = "Team Member"
+    try:
+        llm = bind_output_budget(init_groq_client(), request)
+        messages = request.prompt.messages
+        
+        print(f"Invoking Groq API with {len(request.tasks)} tasks...")
+        future, leader = _submit_generation(
+            request.cache_key, _invoke_and_store,
+            llm, get_response_cache(), get_rate_limiter(), user_id, request, messages,
+        )
+        if latency_budget is not None:
+            return _hedged_generate(request, future, leader, latency_budget)
+        return _own_copy(future.result(), leader)
+        
+    except Exception as e:
+        print(f"Groq API failed: {e}")
+        if fallback_on_error:
+            st.warning("AI generation unavailable, using the standard template instead.")
+            return render_fallback_report(request, e)
+        st.error(f"Failed to generate email: {e}")
+        raise
 
-    # Clean tasks
-    cleaned_tasks = []
-    for task in tasks:
-        if isinstance(task, list):
-            for item in task:
-                if item and str(item).strip():
-                    cleaned_tasks.append(str(item).strip())
-        elif task and str(task).strip():
-            cleaned_tasks.append(str(task).strip())
+
+def _invoke_multi_and_store(
+    llm,
+    cache: ResponseCache,
+    limiter: RateLimiter,
+    user_id: str,
+    prompt: BuiltPrompt,
+    requests: Dict[str, ReportRequest],
+) -> Optional[Dict[str, EmailReport]]:
+    """
+    One LLM call for several tones. Each parsed variant is cached under
+    its own per-tone key; returns None if the response can't be split.
+    """
+    response = limiter.call_with_retry(
+        lambda: llm.invoke(prompt.messages),
+        user_id,
+        reserved_tokens(prompt),
+        used=lambda result: tokens_used(prompt, result),
+    )
     
-    tasks = cleaned_tasks
-    if not tasks:
-        raise ValueError("No valid tasks after cleaning")
+    variants = split_tone_variants(response.content, list(requests))
+    if variants is None:
+        return None
     
-    if report_date is None:
-        report_date = date.today()
+    print(f"Groq API generated {len(variants)} tone variants in one call")
+    return {
+        tone: store_report(
+            cache,
+            requests[tone],
+            body_html,
+            {"generation_method": "groq", "model": GROQ_MODEL, "multi_tone": True},
+        )
+        for tone, body_html in variants.items()
+    }
+
+
+def generate_tone_variants(
+    tasks: List[str],
+    manager_name: str = "Manager",
+    report_date: Optional[date] = None,
+    sender_name: str = "",
+    tones: Optional[List[str]] = None,
+    force_fresh: bool = False,
+    user_id: str = "anonymous",
+) -> Dict[str, EmailReport]:
+    """
+    Generate the report in several tones with a single LLM round-trip.
     
-    date_str = report_date.strftime("%B %d, %Y")
-    subject = _generate_subject(tasks, report_date)
+    Variants are cached under the same keys generate_email_report uses, so
+    a later request for any of these tones is a cache hit. Tones already
+    cached are not regenerated. If the combined response can't be parsed,
+    or its token reservation would need the whole rate-limit bucket,
+    falls back to one generate_email_report call per missing tone.
     
-    try:
-        llm = init_groq_client()
-        
-        # Build system message
-        system_prompt = f"""You are a professional email writing assistant. Generate HTML email reports.
-
-        Preferences:
-        - Tone: {tone}
-        - Date: {date_str}
-        - Manager Name: {manager_name}
-        - Sender Name: {sender_name}
-
-        Generate a well-formatted HTML email body with:
-        1. Proper HTML structure (<html>, <head>, <body>, <style>)
-        2. Professional greeting starting with "Dear {manager_name},"
-        3. Brief intro paragraph (1-2 sentences)
-        4. Clean task list using <ul> and <li> tags
-        5. Professional closing paragraph matching the {tone} tone
-        6. Signature with "Sincerely," or "Best regards," followed by {sender_name}
-        7. Inline CSS for professional styling
-
-        CRITICAL RULES:
-        - DO NOT include any subject line or title in the email body
-        - DO NOT include the date as a heading
-        - Start DIRECTLY with "Dear {manager_name},"
-        - The subject line is handled separately, NEVER put it in the email body
-        - Return ONLY the complete HTML code
-        - Do NOT wrap it in markdown code blocks or add any explanation"""
-
-        # Format tasks list
-        tasks_text = "\n".join(f"- {task}" for task in tasks)
+    Args:
+        tasks: List of completed tasks
+        manager_name: Recipient's name for greeting
+        report_date: Date of report (defaults to today)
+        sender_name: Name to sign email with
+        tones: Tones to generate (defaults to TONES)
+        force_fresh: Skip the cache lookup (fresh results are still cached)
+        user_id: Caller identity for fair scheduling under the rate limiter
+    
+    Returns:
+        Dict mapping each tone to its EmailReport, in the order requested
+    """
+    tones = list(tones or TONES)
+    requests = {
+        tone: prepare_request(tasks, manager_name, report_date, tone, sender_name) for tone in tones
+    }
+    cache = get_response_cache()
+    
+    reports: Dict[str, EmailReport] = {}
+    if not force_fresh:
+        for tone, request in requests.items():
+            cached = cached_report(cache, request)
+            if cached is not None:
+                reports[tone] = cached
+    
+    missing = [tone for tone in tones if tone not in reports]
+    variants = None
+    if len(missing) > 1:
+        first = requests[missing[0]]
+        prompt = build_multi_tone_prompt(
+            first.tasks, first.manager_name, first.date_str, missing, first.sender_name
+        )
+        limiter = get_rate_limiter()
+        if reserved_tokens(prompt) >= limiter.tokens_per_minute:
+            # It would wait for, and then hold, the whole bucket; per-tone calls share it
+            print("Combined tone request too large for the rate limit, using per-tone calls")
+        else:
+            try:
+                llm = init_groq_client().bind(max_tokens=prompt.max_tokens)
+                print(f"Invoking Groq API for {len(missing)} tones with {len(first.tasks)} tasks...")
+                future, leader = _submit_generation(
+                    "tones:" + "|".join(requests[tone].cache_key for tone in missing),
+                    _invoke_multi_and_store,
+                    llm, cache, limiter, user_id, prompt,
+                    {tone: requests[tone] for tone in missing},
+                )
+                variants = future.result()
+            except Exception as e:
+                print(f"Multi-tone generation failed: {e}")
+            
+            if variants is None:
+                print("Combined tone response unusable, falling back to per-tone calls")
+            else:
+                reports.update({tone: _own_copy(report, leader) for tone, report in variants.items()})
+    
+    for tone in missing:
+        if tone not in reports:
+            reports[tone] = generate_email_report(
+                tasks,
+                manager_name=manager_name,
+                report_date=report_date,
+                tone=tone,
+                sender_name=sender_name,
+                force_fresh=force_fresh,
+                user_id=user_id,
+            )
+    
+    return {tone: reports[tone] for tone in tones}
+
+
+def _same_framing(previous: dict, request: ReportRequest) -> bool:
+    """True when greeting, date, tone and signature inputs are unchanged."""
+    return (
+        str(previous.get("tone", "")).lower() == request.tone.lower()
+        and previous.get("manager_name") == request.manager_name
+        and previous.get("sender_name") == request.sender_name
+        and previous.get("report_date") == request.report_date.isoformat()
+    )
+
+
+def _patch_source(previous: dict) -> str:
+    """Generation method of the body a (possibly repeatedly) patched report started from."""
+    if previous.get("generation_method") == "patch":
+        return previous.get("patched_from") or "unknown"
+    return previous.get("generation_method") or "unknown"
+
+
+def tasks_changed(previous: EmailReport, tasks: List[str]) -> bool:
+    """True unless tasks, once cleaned, are the ones previous was built from."""
+    old_tasks = (previous.metadata or {}).get("tasks")
+    return not old_tasks or not diff_tasks(old_tasks, clean_tasks(tasks)).is_empty
+
+
+def regenerate_email_report(
+    previous: EmailReport,
+    tasks: List[str],
+    manager_name: str = "Manager",
+    report_date: Optional[date] = None,
+    tone: str = "formal",
+    sender_name: str = "",
+    user_id: str = "anonymous",
+    fallback_on_error: bool = True,
+) -> EmailReport:
+    """
+    Regenerate a report after its task list was edited, reusing what
+    did not change.
+    
+    The new tasks are diffed against the ones previous was built from.
+    Pure additions and removals patch the <ul> directly, with no LLM call.
+    Changed items are rewritten by a small request covering only those
+    items. Either way the greeting, intro and closing are kept as-is.
+    Falls back to a full fresh generation when nothing changed (an
+    explicit regenerate), when tone or names changed, when most items
+    changed, or when the existing list can't be mapped to its tasks.
+    
+    Args:
+        previous: Report being edited (its metadata must record its tasks)
+        tasks: Updated list of completed tasks
+        manager_name: Recipient's name for greeting
+        report_date: Date of report (defaults to today)
+        tone: Email tone (formal/neutral/friendly)
+        sender_name: Name to sign email with
+        user_id: Caller identity for fair scheduling under the rate limiter
+        fallback_on_error: Use the template if a needed LLM call fails
+    
+    Returns:
+        EmailReport; metadata['generation_method'] is 'patch' when patched,
+        with 'patched_from' naming the method that wrote the original body
+    """
+    request = prepare_request(tasks, manager_name, report_date, tone, sender_name)
+    previous_meta = previous.metadata or {}
+    old_tasks = previous_meta.get("tasks")
+    
+    def regenerate_fully() -> EmailReport:
+        return generate_email_report(
+            tasks,
+            manager_name=manager_name,
+            report_date=report_date,
+            tone=tone,
+            sender_name=sender_name,
+            force_fresh=True,
+            fallback_on_error=fallback_on_error,
+            user_id=user_id,
+        )
+    
+    if not old_tasks or not _same_framing(previous_meta, request):
+        return regenerate_fully()
+    
+    diff = diff_tasks(old_tasks, request.tasks)
+    parts = split_task_list(previous.body_html)
+    if not should_patch(diff, len(request.tasks)) or parts is None or len(parts[1]) != len(old_tasks):
+        return regenerate_fully()
+    
+    patch_meta = {
+        "tasks_added": len(diff.added),
+        "tasks_removed": len(diff.removed),
+        "tasks_changed": len(diff.changed),
+    }
+    new_items = {}
+    if diff.is_pure_add_remove:
+        patch_meta["patch_mode"] = "direct"
+    else:
+        # Ask only for the items that need new wording
+        indices = diff.needs_text()
+        example = parts[1][0] if parts[1] else "<li>...</li>"
+        prompt = build_items_prompt([request.tasks[index] for index in indices], request.tone, example)
+        try:
+            llm = init_groq_client().bind(max_tokens=prompt.max_tokens)
+            print(f"Invoking Groq API for {len(indices)} changed items...")
+            response = get_rate_limiter().call_with_retry(
+                lambda: llm.invoke(prompt.messages),
+                user_id,
+                reserved_tokens(prompt),
+                used=lambda result: tokens_used(prompt, result),
+            )
+        except Exception as e:
+            print(f"Groq API failed: {e}")
+            if not fallback_on_error:
+                st.error(f"Failed to generate email: {e}")
+                raise
+            response = None
         
-        user_prompt = f"""Generate a professional email report for these tasks:
+        items = parse_items_response(response.content, len(indices)) if response is not None else None
+        if items is None and response is not None:
+            print("Changed-item response unusable, regenerating the full email")
+            return regenerate_fully()
+        if items is not None:
+            new_items = dict(zip(indices, items))
+            patch_meta.update({"patch_mode": "llm_items", **prompt.estimates})
+        else:
+            # The LLM is unavailable: patch with plain items rather than fail
+            patch_meta.update({"patch_mode": "direct", "patch_degraded": True})
+    
+    body_html = apply_patch(previous.body_html, old_tasks, request.tasks, diff, new_items)
+    print(f"Patched report task list ({patch_meta['patch_mode']}): {patch_meta}")
+    
+    # patched_from always names the original source, however many patches deep
+    patched_from = _patch_source(previous_meta)
+    degraded = bool(patch_meta.get("patch_degraded") or previous_meta.get("patch_degraded"))
+    metadata = {"generation_method": "patch", "patched_from": patched_from, **patch_meta}
+    if degraded:
+        metadata["patch_degraded"] = True
+    if patched_from == "groq" and not degraded:
+        return store_report(get_response_cache(), request, body_html, {**metadata, "model": GROQ_MODEL})
+    # Patches of template output, or made without the LLM after it failed,
+    # stay out of the LLM response cache
+    return EmailReport(
+        subject=request.subject,
+        body_html=body_html,
+        metadata={**metadata, **report_inputs(request), "cache_hit": False, "cache_tier": None},
+    )
 
-        {tasks_text}
 
-        Remember:
-        - Start with "Dear {manager_name},"
-        - NO subject line in the email body
-        - Use HTML format with proper styling"""
+def _visible_html(text: str) -> str:
+    """
+    Best-effort cleanup of a partial response for live preview:
+    drops an opening code fence and anything after a closing one.
+    """
+    text = text.lstrip()
+    if len(text) < 3 and "```".startswith(text):
+        return ""
+    if text.startswith("```"):
+        newline = text.find("\n")
+        if newline == -1:
+            return ""
+        text = text[newline + 1:]
+    fence = text.find("```")
+    # Hold back trailing backticks that may be the start of a closing fence
+    return text.rstrip("`") if fence == -1 else text[:fence]
+
+
+class ReportStream:
+    """
+    Iterator over HTML chunks of a report as the model produces them.
+    Once exhausted, .report holds the fully assembled EmailReport.
+    """
+    
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self.report: Optional[EmailReport] = None
+    
+    def __iter__(self):
+        self.report = yield from self._chunks
+
+
+def _single_chunk(report: EmailReport):
+    """Generator yielding a finished report's body as one chunk."""
+    yield report.body_html
+    return report
+
 
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ]
+def _stream_worker(
+    llm,
+    cache: ResponseCache,
+    limiter: RateLimiter,
+    user_id: str,
+    request: ReportRequest,
+    messages: list,
+    out: queue.Queue,
+):
+    """
+    Stream the LLM response on a worker thread, publishing each token
+    chunk to out, then the finished EmailReport (or the exception).
+    Retryable errors are retried only before the first chunk arrives.
+    The rate-limit reservation is settled against what each attempt
+    consumed, including attempts that fail.
+    """
+    tokens = reserved_tokens(request.prompt)
+    try:
+        raw = ""
+        attempt = 0
+        while True:
+            limiter.acquire(user_id, tokens)
+            message = None
+            try:
+                for chunk in llm.stream(messages):
+                    # Chunks add up to one message carrying the final usage metadata
+                    message = chunk if message is None else message + chunk
+                    raw += chunk.content
+                    out.put(chunk.content)
+                limiter.settle(tokens, tokens_used(request.prompt, message) if message is not None else 0)
+                break
+            except Exception as e:
+                limiter.settle(tokens, tokens_used(request.prompt, message) if message is not None else 0)
+                if raw or not is_retryable(e) or attempt >= GROQ_MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt, e)
+                print(f"Groq stream failed ({type(e).__name__}), retry {attempt + 1} in {delay:.1f}s")
+                limiter.record_retry()
+                time.sleep(delay)
+                attempt += 1
         
-        print(f"Invoking Groq API with {len(tasks)} tasks...")
-        response = llm.invoke(messages)
-        body_html = response.content
+        body_html = clean_html_response(raw)
+        print(f"Groq API streamed {len(body_html)} characters")
         
-        # Clean markdown code blocks if present
-        if "```html" in body_html:
-            parts = body_html.split("```html")
-            if len(parts) > 1:
-                body_html = parts[1].split("```").strip()
-        elif "```" in body_html:
-            parts = body_html.split("```")
-            if len(parts) >= 3:
-                body_html = parts.strip()[1]
+        report = store_report(
+            cache,
+            request,
+            body_html,
+            {"generation_method": "groq", "model": GROQ_MODEL, "streamed": True},
+        )
+    except Exception as e:
+        out.put(e)
+        raise
+    out.put(report)
+    return report
+
+
+def _stream_report_chunks(
+    request: ReportRequest,
+    force_fresh: bool,
+    fallback_on_error: bool,
+    latency_budget: Optional[float],
+    user_id: str,
+):
+    """
+    Generator yielding HTML chunks and returning the final EmailReport.
+    On fallback the returned report replaces whatever was streamed so far.
+    """
+    cache = get_response_cache()
+    if not force_fresh:
+        cached = cached_report(cache, request)
+        if cached is not None:
+            yield cached.body_html
+            return cached
+    
+    try:
+        llm = bind_output_budget(init_groq_client(), request)
+        messages = request.prompt.messages
         
-        body_html = body_html.strip()
+        print(f"Streaming Groq API response for {len(request.tasks)} tasks...")
+        start = time.perf_counter()
+        out = queue.Queue()
+        future, leader = _submit_generation(
+            request.cache_key, _stream_worker,
+            llm, cache, get_rate_limiter(), user_id, request, messages, out,
+        )
+        if not leader:
+            # Chunks go to the leader's queue; this caller gets the final report
+            future.add_done_callback(lambda done: out.put(done.exception() or done.result()))
         
-        print(f"Groq API generated {len(body_html)} characters")
+        template = template_ms = None
+        if latency_budget is not None:
+            template, template_ms = _render_template_timed(request)
         
-        return EmailReport(
-            subject=subject,
-            body_html=body_html,
-            metadata={"generation_method": "groq", "model": "llama-3.1-8b-instant"},
-        )
+        raw = ""
+        emitted = 0
+        first_chunk_ms = None
+        while True:
+            if first_chunk_ms is None and latency_budget is not None:
+                remaining = latency_budget - (time.perf_counter() - start)
+                try:
+                    item = out.get(timeout=max(remaining, 0))
+                except queue.Empty:
+                    print(f"Groq API gave no output within {latency_budget}s budget, returning template")
+                    future.add_done_callback(_log_late_result(start))
+                    template.metadata.update(_hedge_metadata("template", latency_budget, start, template_ms))
+                    return template
+            else:
+                item = out.get()
+            
+            if isinstance(item, Exception):
+                raise item
+            if isinstance(item, EmailReport):
+                item = _own_copy(item, leader)
+                if not leader:
+                    yield item.body_html
+                if latency_budget is not None:
+                    llm_ms = (time.perf_counter() - start) * 1000
+                    item.metadata.update(_hedge_metadata("llm", latency_budget, start, template_ms, llm_ms))
+                    item.metadata["first_chunk_ms"] = first_chunk_ms
+                return item
+            
+            raw += item
+            visible = _visible_html(raw)
+            if len(visible) > emitted:
+                if first_chunk_ms is None:
+                    first_chunk_ms = (time.perf_counter() - start) * 1000
+                yield visible[emitted:]
+                emitted = len(visible)
         
     except Exception as e:
         print(f"Groq API failed: {e}")
+        if fallback_on_error:
+            st.warning("AI generation unavailable, using the standard template instead.")
+            return render_fallback_report(request, e)
         st.error(f"Failed to generate email: {e}")
         raise
 
 
+def stream_email_report(
+    tasks: List[str],
+    manager_name: str = "Manager",
+    report_date: Optional[date] = None,
+    tone: str = "formal",
+    sender_name: str = "",
+    force_fresh: bool = False,
+    fast_mode: bool = False,
+    fallback_on_error: bool = True,
+    latency_budget: Optional[float] = None,
+    user_id: str = "anonymous",
+) -> ReportStream:
+    """
+    Streaming variant of generate_email_report.
+    
+    Iterate the returned ReportStream to receive HTML chunks as tokens
+    arrive (cache hits and template reports arrive as one chunk);
+    afterwards its .report attribute holds the complete EmailReport for
+    sending.
+    
+    When streaming, latency_budget bounds the wait for the first visible
+    chunk: once output is flowing the stream is allowed to finish.
+    """
+    if fast_mode:
+        report = render_template_report(tasks, manager_name, report_date, tone, sender_name)
+        return ReportStream(_single_chunk(report))
+    
+    request = prepare_request(tasks, manager_name, report_date, tone, sender_name)
+    return ReportStream(
+        _stream_report_chunks(request, force_fresh, fallback_on_error, latency_budget, user_id)
+    )
+
+
 # Legacy compatibility
 class ReportGenerator:
     """Legacy wrapper for backward compatibility."""
@@ -230,4 +780,5 @@ def generate_email_report_with_llm(
     return generate_email_report(
         tasks=tasks,
         manager_name=manager_name,
+        fallback_on_error=use_fallback_on_error,
     )
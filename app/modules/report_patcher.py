@@ -0,0 +1,142 @@
+"""Diff-aware patching of a generated report's task list."""
+import difflib
+import re
+from dataclasses import dataclass, field
+from html import escape
+from typing import Dict, List, Optional, Tuple
+
+UL_REGEX = re.compile(r"(<ul\b[^>]*>)(.*?)(</ul>)", re.IGNORECASE | re.DOTALL)
+LI_REGEX = re.compile(r"<li\b[^>]*>.*?</li>", re.IGNORECASE | re.DOTALL)
+LI_OPEN_REGEX = re.compile(r"<li\b[^>]*>", re.IGNORECASE)
+
+# Above this share of changed items a full regeneration is cheaper to reason about
+PATCH_MAX_CHANGED_FRACTION = 0.5
+
+
+@dataclass
+class TaskDiff:
+    """How a new task list differs from the one a report was built from."""
+    added: List[int] = field(default_factory=list)      # indices into the new list
+    removed: List[int] = field(default_factory=list)    # indices into the old list
+    changed: List[int] = field(default_factory=list)    # indices into the new list
+    kept: Dict[int, int] = field(default_factory=dict)  # new index -> old index
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    @property
+    def is_pure_add_remove(self) -> bool:
+        return not self.changed
+
+    def needs_text(self) -> List[int]:
+        """New indices whose <li> must be produced (not copied from the old list)."""
+        return sorted(self.added + self.changed)
+
+
+def diff_tasks(old_tasks: List[str], new_tasks: List[str]) -> TaskDiff:
+    """
+    Line diff of two task lists. Replaced runs pair up position by
+    position as changes; any surplus on either side is an add or remove.
+    """
+    diff = TaskDiff()
+    matcher = difflib.SequenceMatcher(None, old_tasks, new_tasks, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for offset in range(i2 - i1):
+                diff.kept[j1 + offset] = i1 + offset
+        elif tag == "insert":
+            diff.added.extend(range(j1, j2))
+        elif tag == "delete":
+            diff.removed.extend(range(i1, i2))
+        else:  # replace
+            paired = min(i2 - i1, j2 - j1)
+            diff.changed.extend(range(j1, j1 + paired))
+            diff.added.extend(range(j1 + paired, j2))
+            diff.removed.extend(range(i1 + paired, i2))
+    return diff
+
+
+def should_patch(diff: TaskDiff, new_count: int) -> bool:
+    """Patch only real, modest edits; identical lists mean a full rewrite was asked for."""
+    if diff.is_empty or not new_count:
+        return False
+    return len(diff.changed) <= PATCH_MAX_CHANGED_FRACTION * new_count
+
+
+def split_task_list(body_html: str) -> Optional[Tuple[str, List[str], str]]:
+    """
+    Split a report body around the contents of its first <ul>.
+    Returns (html up to and including <ul>, list of <li> elements,
+    html from </ul> on), or None if there is no list.
+    """
+    match = UL_REGEX.search(body_html)
+    if not match:
+        return None
+    return body_html[:match.start(2)], LI_REGEX.findall(match.group(2)), body_html[match.end(2):]
+
+
+def _list_whitespace(body_html: str, items: List[str]) -> Tuple[str, str, str]:
+    """(leading, between-items, trailing) whitespace used by the existing list."""
+    content = UL_REGEX.search(body_html).group(2)
+    if not items:
+        return content, "", ""
+    leading = content[:content.find(items[0])]
+    trailing = content[content.rfind(items[-1]) + len(items[-1]):]
+    between = "\n"
+    if len(items) > 1:
+        start = content.find(items[0]) + len(items[0])
+        between = content[start:content.find(items[1], start)]
+    return leading, between, trailing
+
+
+def plain_li(task: str, template_li: Optional[str] = None) -> str:
+    """An escaped <li> for a task, reusing a sibling's opening tag for styling."""
+    opening = "<li>"
+    if template_li:
+        match = LI_OPEN_REGEX.match(template_li)
+        if match:
+            opening = match.group(0)
+    return f"{opening}{escape(task)}</li>"
+
+
+def apply_patch(
+    body_html: str,
+    old_tasks: List[str],
+    new_tasks: List[str],
+    diff: TaskDiff,
+    new_items: Optional[Dict[int, str]] = None,
+) -> Optional[str]:
+    """
+    Rebuild the task list of body_html for new_tasks, keeping everything
+    outside the <ul> (greeting, intro, closing, signature) byte for byte.
+
+    Unchanged tasks keep their existing <li>. Tasks listed in
+    diff.needs_text() use new_items[index] when given, else an escaped
+    plain <li>. Returns None if the existing items can't be mapped 1:1 to
+    old_tasks.
+    """
+    parts = split_task_list(body_html)
+    if parts is None:
+        return None
+    head, items, tail = parts
+    if len(items) != len(old_tasks):
+        return None
+
+    new_items = new_items or {}
+    sample = items[0] if items else None
+    rebuilt = []
+    for index, task in enumerate(new_tasks):
+        if index in diff.kept:
+            rebuilt.append(items[diff.kept[index]])
+        else:
+            rebuilt.append(new_items.get(index) or plain_li(task, sample))
+
+    leading, between, trailing = _list_whitespace(body_html, items)
+    return head + leading + between.join(rebuilt) + trailing + tail
+
+
+def parse_items_response(response_text: str, expected: int) -> Optional[List[str]]:
+    """Extract exactly `expected` <li> elements from a model response."""
+    items = LI_REGEX.findall(response_text)
+    return items if len(items) == expected else None
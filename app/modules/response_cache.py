@@ -0,0 +1,189 @@
+"""Two-tier (memory LRU + SQLite) cache for LLM-generated email reports."""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from .storage import connect_private, data_path
+
+RESPONSE_CACHE_PATH = os.getenv(
+    "RESPONSE_CACHE_PATH", data_path("response_cache.sqlite3")
+)
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(24 * 3600)))
+RESPONSE_CACHE_MEMORY_ENTRIES = int(os.getenv("RESPONSE_CACHE_MEMORY_ENTRIES", "256"))
+RESPONSE_CACHE_DISK_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_DISK_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def _normalize_text(value: Optional[str]) -> str:
+    return " ".join(str(value or "").split())
+
+
+def make_cache_key(
+    tasks: List[str],
+    manager_name: str,
+    report_date: date,
+    tone: str,
+    sender_name: str,
+    model: str,
+    **extra: Any,
+) -> str:
+    """
+    Content-addressed key over the normalized generation inputs.
+    Whitespace differences and tone casing do not produce new keys.
+    """
+    payload = {
+        "tasks": [_normalize_text(task) for task in tasks],
+        "manager_name": _normalize_text(manager_name),
+        "report_date": report_date.isoformat(),
+        "tone": _normalize_text(tone).lower(),
+        "sender_name": _normalize_text(sender_name),
+        "model": model,
+        **extra,
+    }
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResponseCache:
+    """
+    In-memory LRU in front of a SQLite table.
+
+    Entries expire after ttl_seconds in both tiers. The memory tier is
+    bounded by entry count; the disk tier by total payload bytes, evicting
+    least recently used rows first. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = RESPONSE_CACHE_PATH,
+        ttl_seconds: int = RESPONSE_CACHE_TTL_SECONDS,
+        memory_max_entries: int = RESPONSE_CACHE_MEMORY_ENTRIES,
+        disk_max_bytes: int = RESPONSE_CACHE_DISK_MAX_BYTES,
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.memory_max_entries = memory_max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._memory: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        if db_path:
+            try:
+                self._conn = connect_private(db_path)
+                self._conn.execute(
+                    """CREATE TABLE IF NOT EXISTS responses (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )"""
+                )
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)"
+                )
+                self._conn.commit()
+            except (sqlite3.Error, OSError) as e:
+                # Disk tier is optional; keep serving from memory
+                print(f"Response cache disk tier disabled: {e}")
+                self._conn = None
+
+    def get(self, key: str) -> Optional[Tuple[Dict, str]]:
+        """Return (value, tier) for a fresh entry, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return value, "memory"
+                del self._memory[key]
+
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute(
+                        "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        if now - row[1] < self.ttl_seconds:
+                            self._conn.execute(
+                                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+                            )
+                            self._conn.commit()
+                            value = json.loads(row[0])
+                            self._remember(key, row[1], value)
+                            self.counters["disk_hits"] += 1
+                            return value, "disk"
+                        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"Response cache read failed: {e}")
+
+            self.counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Dict) -> None:
+        """Store a JSON-serializable value in both tiers."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            self.counters["writes"] += 1
+
+            if self._conn is None:
+                return
+            data = json.dumps(value, ensure_ascii=False)
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, data, len(data.encode("utf-8")), now, now),
+                )
+                self._evict_disk(now)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"Response cache write failed: {e}")
+
+    def _remember(self, key: str, created_at: float, value: Dict) -> None:
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float) -> None:
+        """Drop expired rows, then least recently used rows over the byte budget."""
+        cur = self._conn.execute(
+            "DELETE FROM responses WHERE created_at <= ?", (now - self.ttl_seconds,)
+        )
+        self.counters["evictions"] += max(cur.rowcount, 0)
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.disk_max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+        ).fetchall():
+            if total <= self.disk_max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.counters["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.counters, "memory_entries": len(self._memory)}
@@ -0,0 +1,46 @@
+"""Coalesce identical concurrent calls into a single in-flight execution."""
+import threading
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """
+    Tracks in-flight work by key. The first caller for a key (the leader)
+    submits the work; callers arriving while it runs get the same Future
+    instead of starting a duplicate. The key is forgotten as soon as the
+    work finishes, so later calls start fresh. Thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.counters = {"leaders": 0, "shared": 0}
+
+    def submit(self, key: str, executor: Executor, fn: Callable, *args) -> Tuple[Future, bool]:
+        """
+        Run fn(*args) on executor unless an identical call is in flight.
+
+        Returns:
+            (future, leader) where leader is False for a shared call
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.counters["shared"] += 1
+                return future, False
+            future = executor.submit(fn, *args)
+            self._calls[key] = future
+            self.counters["leaders"] += 1
+
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future, True
+
+    def _forget(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.counters, "in_flight": len(self._calls)}
@@ -0,0 +1,245 @@
+"""Per-account pool of authenticated SMTP sessions."""
+import hashlib
+import os
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+
+# Gmail drops idle sessions after a few minutes; close ours well before that
+SMTP_POOL_IDLE_TIMEOUT = float(os.getenv("SMTP_POOL_IDLE_TIMEOUT", "120"))
+# Sessions idle longer than this get a NOOP before reuse
+SMTP_POOL_HEALTH_CHECK_AFTER = float(os.getenv("SMTP_POOL_HEALTH_CHECK_AFTER", "10"))
+SMTP_POOL_MAX_IDLE_PER_ACCOUNT = int(os.getenv("SMTP_POOL_MAX_IDLE_PER_ACCOUNT", "2"))
+
+# A reused session that fails with these was dropped by the server
+DISCONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError)
+# The server answered (and smtplib reset the transaction), so the session is still usable
+SESSION_INTACT_ERRORS = (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)
+
+
+def _account_key(from_email: str, app_password: str) -> str:
+    """Pool key per login; a changed password never reuses an old session."""
+    digest = hashlib.sha256(f"{from_email}\0{app_password}".encode("utf-8")).hexdigest()
+    return f"{from_email.lower()}:{digest[:16]}"
+
+
+def _close(server: smtplib.SMTP) -> None:
+    try:
+        server.quit()
+    except Exception:
+        server.close()
+
+
+class _Session:
+    __slots__ = ("server", "created_at", "last_used")
+
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class SMTPPool:
+    """
+    Keeps authenticated SMTP sessions open between sends, per account.
+
+    A session is checked out for exclusive use and returned afterwards.
+    Idle sessions expire after idle_timeout; one idle longer than
+    health_check_after is probed with NOOP before reuse and replaced if
+    the server has dropped it. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        timeout: float = SMTP_TIMEOUT_SECONDS,
+        idle_timeout: float = SMTP_POOL_IDLE_TIMEOUT,
+        health_check_after: float = SMTP_POOL_HEALTH_CHECK_AFTER,
+        max_idle_per_account: int = SMTP_POOL_MAX_IDLE_PER_ACCOUNT,
+    ):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.max_idle_per_account = max_idle_per_account
+        self._idle: Dict[str, List[_Session]] = {}
+        self._lock = threading.Lock()
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "connects": 0,
+            "health_checks": 0,
+            "health_failures": 0,
+            "expired": 0,
+            "reconnects": 0,
+        }
+
+    def _connect(self, from_email: str, app_password: str) -> _Session:
+        # 465 is implicit TLS; any other port (587 under docker-compose) upgrades with STARTTLS
+        if self.port == 465:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.port != 465:
+                server.starttls()
+            server.login(from_email, app_password)
+        except Exception:
+            server.close()
+            raise
+        with self._lock:
+            self.counters["connects"] += 1
+        return _Session(server)
+
+    def _expired(self, session: _Session, now: float) -> bool:
+        return now - session.last_used > self.idle_timeout
+
+    def _prune(self, now: float) -> List[_Session]:
+        """Detach expired idle sessions; caller closes them outside the lock."""
+        stale = []
+        for key in list(self._idle):
+            sessions = self._idle[key]
+            keep = [session for session in sessions if not self._expired(session, now)]
+            stale.extend(session for session in sessions if self._expired(session, now))
+            if keep:
+                self._idle[key] = keep
+            else:
+                del self._idle[key]
+        self.counters["expired"] += len(stale)
+        return stale
+
+    def _healthy(self, session: _Session, now: float) -> bool:
+        if now - session.last_used <= self.health_check_after:
+            return True
+        with self._lock:
+            self.counters["health_checks"] += 1
+        try:
+            code, _ = session.server.noop()
+            if code == 250:
+                return True
+        except (smtplib.SMTPException, OSError):
+            pass
+        with self._lock:
+            self.counters["health_failures"] += 1
+        return False
+
+    def acquire(self, from_email: str, app_password: str) -> Tuple[_Session, bool]:
+        """
+        Take an authenticated session for this account, reusing an idle
+        one when it is still alive.
+
+        Returns:
+            (session, reused) where reused is False for a fresh login
+
+        Raises:
+            smtplib.SMTPAuthenticationError: If a fresh login is rejected
+        """
+        key = _account_key(from_email, app_password)
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                stale = self._prune(now)
+                sessions = self._idle.get(key)
+                session = sessions.pop() if sessions else None
+                if sessions is not None and not sessions:
+                    del self._idle[key]
+            for expired in stale:
+                _close(expired.server)
+
+            if session is None:
+                with self._lock:
+                    self.counters["misses"] += 1
+                return self._connect(from_email, app_password), False
+            if self._healthy(session, now):
+                with self._lock:
+                    self.counters["hits"] += 1
+                return session, True
+            session.server.close()
+
+    def release(self, from_email: str, app_password: str, session: _Session, broken: bool = False) -> None:
+        """Return a session to the pool, or close it if broken or surplus."""
+        if broken:
+            session.server.close()
+            return
+        session.last_used = time.monotonic()
+        key = _account_key(from_email, app_password)
+        with self._lock:
+            sessions = self._idle.setdefault(key, [])
+            if len(sessions) < self.max_idle_per_account:
+                sessions.append(session)
+                return
+        _close(session.server)
+
+    @contextmanager
+    def connection(self, from_email: str, app_password: str) -> Iterator[smtplib.SMTP]:
+        """Check out an authenticated smtplib session for the with-block."""
+        session, _ = self.acquire(from_email, app_password)
+        broken = True
+        try:
+            yield session.server
+            broken = False
+        except SESSION_INTACT_ERRORS:
+            broken = False
+            raise
+        finally:
+            self.release(from_email, app_password, session, broken)
+
+    def _send_on(self, from_email: str, app_password: str, session: _Session, recipients: List[str], message: str) -> None:
+        """sendmail on a checked-out session, then hand it back (closed if it broke)."""
+        try:
+            session.server.sendmail(from_email, recipients, message)
+        except SESSION_INTACT_ERRORS:
+            self.release(from_email, app_password, session)
+            raise
+        except BaseException:
+            self.release(from_email, app_password, session, broken=True)
+            raise
+        self.release(from_email, app_password, session)
+
+    def sendmail(self, from_email: str, app_password: str, recipients: List[str], message: str) -> bool:
+        """
+        Send one message over a pooled session.
+
+        If a reused session turns out to have been dropped by the server,
+        the send is retried once on a fresh login.
+
+        Returns:
+            True if the message went over a reused session
+        """
+        session, reused = self.acquire(from_email, app_password)
+        try:
+            self._send_on(from_email, app_password, session, recipients, message)
+            return reused
+        except DISCONNECT_ERRORS:
+            if not reused:
+                raise
+        with self._lock:
+            self.counters["reconnects"] += 1
+        session = self._connect(from_email, app_password)
+        self._send_on(from_email, app_password, session, recipients, message)
+        return False
+
+    def close_all(self) -> None:
+        with self._lock:
+            sessions = [session for pooled in self._idle.values() for session in pooled]
+            self._idle.clear()
+        for session in sessions:
+            _close(session.server)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "idle": sum(len(sessions) for sessions in self._idle.values()),
+                "accounts": len(self._idle),
+                "hit_rate": self.counters["hits"] / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,26 @@
+"""Local data directory and owner-only SQLite files."""
+import os
+import sqlite3
+
+# app/data is the volume docker-compose persists across container rebuilds
+DATA_DIR = os.getenv("APP_DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data"))
+
+
+def data_path(filename: str) -> str:
+    """Default location for a persistent file under DATA_DIR."""
+    return os.path.join(DATA_DIR, filename)
+
+
+def connect_private(db_path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite file readable and writable by the owner only (0600),
+    creating it and its directory if needed. Journal files inherit the
+    database file's mode.
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    os.close(os.open(db_path, os.O_CREAT | os.O_WRONLY, 0o600))
+    # Tighten files created before this existed, or with a looser umask
+    os.chmod(db_path, 0o600)
+    return sqlite3.connect(db_path, check_same_thread=False)
@@ -0,0 +1,179 @@
+"""Offline, deterministic HTML email renderer used as a fast mode and LLM fallback."""
+import zlib
+from datetime import date
+from html import escape
+from typing import Dict, List, Optional, Tuple
+
+from .report_core import EmailReport, ReportRequest, clean_tasks, generate_subject
+
+TEMPLATE_VERSION = 1
+
+# Per-tone phrasing. {date} is filled in the intro; greetings take the name.
+TONE_VARIANTS: Dict[str, Dict[str, List[str]]] = {
+    "formal": {
+        "greetings": ["Dear {name},"],
+        "intros": [
+            "Please find below a summary of the work completed on <strong>{date}</strong>.",
+            "I am writing to share the tasks I completed on <strong>{date}</strong>.",
+            "Below is my progress report for <strong>{date}</strong>.",
+        ],
+        "closings": [
+            "Please let me know if you need any additional details.",
+            "I would be glad to provide further information on any of these items.",
+            "Kindly let me know if any of these require follow-up.",
+        ],
+        "sign_offs": ["Sincerely,", "Best regards,", "Kind regards,"],
+    },
+    "neutral": {
+        "greetings": ["Hello {name},"],
+        "intros": [
+            "Here is a summary of the work completed on <strong>{date}</strong>.",
+            "Here's what I worked on for <strong>{date}</strong>.",
+            "Below are the tasks completed on <strong>{date}</strong>.",
+        ],
+        "closings": [
+            "Feel free to reach out if you have any questions.",
+            "Let me know if you would like more detail on anything.",
+            "Happy to discuss any of these items.",
+        ],
+        "sign_offs": ["Best regards,", "Regards,", "Thanks,"],
+    },
+    "friendly": {
+        "greetings": ["Hi {name},"],
+        "intros": [
+            "Here's a quick rundown of what I got done on <strong>{date}</strong>:",
+            "Sharing a quick update on my work from <strong>{date}</strong>:",
+            "Here's what I wrapped up on <strong>{date}</strong>:",
+        ],
+        "closings": [
+            "Happy to share more details if needed!",
+            "Let me know if anything needs a closer look!",
+            "Ping me anytime if you have questions!",
+        ],
+        "sign_offs": ["Cheers,", "Thanks,", "Warm regards,"],
+    },
+}
+
+DEFAULT_TONE = "formal"
+
+_HEAD = (
+    "<html>\n<head>\n<style>\n"
+    "body { font-family: Arial, Helvetica, sans-serif; font-size: 14px; color: #222; line-height: 1.5; }\n"
+    "ul { padding-left: 20px; }\n"
+    "li { margin-bottom: 6px; }\n"
+    "</style>\n</head>\n<body>\n"
+)
+_TAIL = "</body>\n</html>"
+
+
+def _compile_variants() -> Dict[str, List[Tuple[str, str, str, str]]]:
+    """
+    Pre-assemble every greeting/intro/closing/sign-off combination per tone.
+    Each entry is (greeting, intro, closing, sign_off) with the static HTML
+    already in place, so rendering is a handful of str.format calls.
+    """
+    # _HEAD holds CSS braces; escape them for str.format
+    head = _HEAD.replace("{", "{{").replace("}", "}}")
+    compiled = {}
+    for tone, parts in TONE_VARIANTS.items():
+        combos = []
+        for greeting in parts["greetings"]:
+            for intro in parts["intros"]:
+                for closing in parts["closings"]:
+                    for sign_off in parts["sign_offs"]:
+                        combos.append((
+                            f"{head}<p>{greeting}</p>\n",
+                            f"<p>{intro}</p>\n<ul>\n",
+                            f"</ul>\n<p>{closing}</p>\n",
+                            f"<p>{sign_off}<br>{{sender}}</p>\n{_TAIL}",
+                        ))
+        compiled[tone] = combos
+    return compiled
+
+
+COMPILED_VARIANTS = _compile_variants()
+
+
+def variant_index(tone: str, report_date: date, sender_name: str) -> int:
+    """Stable variant choice: the same sender gets the same wording for a given day."""
+    combos = COMPILED_VARIANTS.get(tone, COMPILED_VARIANTS[DEFAULT_TONE])
+    seed = f"{report_date.isoformat()}|{sender_name}".encode("utf-8")
+    return zlib.crc32(seed) % len(combos)
+
+
+def render_template_report(
+    tasks: List[str],
+    manager_name: str = "Manager",
+    report_date: Optional[date] = None,
+    tone: str = "formal",
+    sender_name: str = "",
+) -> EmailReport:
+    """
+    Render an email report without calling the LLM.
+
+    Takes the same inputs as generate_email_report and produces the same
+    subject line. Output is deterministic for a given set of inputs.
+
+    Args:
+        tasks: List of completed tasks
+        manager_name: Recipient's name for greeting
+        report_date: Date of report (defaults to today)
+        tone: Email tone (formal/neutral/friendly)
+        sender_name: Name to sign email with
+
+    Returns:
+        EmailReport with subject and HTML body
+    """
+    if not tasks:
+        raise ValueError("No tasks provided")
+
+    if not sender_name or not sender_name.strip():
+        sender_name = "Team Member"
+
+    tasks = clean_tasks(tasks)
+    if not tasks:
+        raise ValueError("No valid tasks after cleaning")
+
+    if report_date is None:
+        report_date = date.today()
+
+    tone = (tone or DEFAULT_TONE).lower()
+    if tone not in COMPILED_VARIANTS:
+        tone = DEFAULT_TONE
+
+    index = variant_index(tone, report_date, sender_name)
+    greeting, intro, closing, sign_off = COMPILED_VARIANTS[tone][index]
+
+    body_html = "".join((
+        greeting.format(name=escape(manager_name)),
+        intro.format(date=report_date.strftime("%B %d, %Y")),
+        "".join(f"<li>{escape(task)}</li>\n" for task in tasks),
+        closing,
+        sign_off.format(sender=escape(sender_name)),
+    ))
+
+    return EmailReport(
+        subject=generate_subject(tasks, report_date),
+        body_html=body_html,
+        metadata={
+            "generation_method": "template",
+            "template_version": TEMPLATE_VERSION,
+            "template_variant": index,
+            "tasks": tasks,
+            "tone": tone,
+            "manager_name": manager_name,
+            "sender_name": sender_name,
+            "report_date": report_date.isoformat(),
+            "cache_hit": False,
+            "cache_tier": None,
+        },
+    )
+
+
+def render_fallback_report(request: ReportRequest, error: BaseException) -> EmailReport:
+    """Template report standing in for a failed or timed-out LLM call."""
+    report = render_template_report(
+        request.tasks, request.manager_name, request.report_date, request.tone, request.sender_name
+    )
+    report.metadata["fallback_reason"] = f"{type(error).__name__}: {error}"
+    return report
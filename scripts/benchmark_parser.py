@@ -0,0 +1,369 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.modules.prompt_parser import (
+    extract_recipient_email,
+    extract_task_lines,
+    extract_tasks,
+    parse_prompt,
+    parse_prompts,
+    POOL_OVERHEAD_US,
+    POOL_STARTUP_US_PER_WORKER,
+    PARSE_COST_US,
+    available_cpus,
+    pool_crossover,
+)
+from legacy_parser import legacy_extract_task_lines
+
+DATASET_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "app", "data", "synthetic_dataset.csv"
+)
+RESULTS_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "app", "data", "benchmark_results.json"
+)
+BASELINE_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "app", "data", "benchmark_baseline.json"
+)
+
+TARGETS: Dict[str, Callable] = {
+    "extract_recipient_email": extract_recipient_email,
+    "extract_task_lines": extract_task_lines,
+    "extract_tasks": extract_tasks,
+    "parse_prompt": parse_prompt,
+}
+
+# Prompt length multipliers, and how many prompts to time at each
+SCALES = [1, 10, 100]
+MIN_SAMPLES_PER_SCALE = 50
+
+REPEATS = 3
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+
+# --pool-crossover: prompts per timed batch, and pool sizes to derive thresholds for
+CROSSOVER_BATCH = 10000
+CROSSOVER_WORKERS = [2, 4, 8]
+
+# Percentiles compared in --compare mode
+COMPARED_METRICS = ["p50_us", "p95_us"]
+
+
+def load_prompts() -> List[str]:
+    """Load raw prompts from the synthetic dataset."""
+    with open(DATASET_PATH, "r", encoding="utf-8") as f:
+        return [row["raw_prompt"] for row in csv.DictReader(f)]
+
+
+def scale_prompt(prompt: str, factor: int) -> str:
+    """Make a prompt `factor` times longer by repeating it."""
+    return "\n".join([prompt] * factor)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def time_calls(fn: Callable, prompts: List[str], repeats: int) -> Dict:
+    """
+    Time every call individually.
+    Returns latency percentiles (microseconds) and throughput (prompts/sec).
+    """
+    # Warm up regex caches and code paths
+    for prompt in prompts[:10]:
+        fn(prompt)
+
+    samples = []
+    total = 0.0
+    for _ in range(repeats):
+        for prompt in prompts:
+            start = time.perf_counter()
+            fn(prompt)
+            elapsed = time.perf_counter() - start
+            samples.append(elapsed)
+            total += elapsed
+
+    samples.sort()
+    return {
+        "calls": len(samples),
+        "p50_us": percentile(samples, 50) * 1e6,
+        "p95_us": percentile(samples, 95) * 1e6,
+        "p99_us": percentile(samples, 99) * 1e6,
+        "mean_us": total / len(samples) * 1e6,
+        "throughput_per_sec": len(samples) / total if total else 0.0,
+    }
+
+
+def run_legacy_comparison(prompts: List[str]) -> Dict:
+    """Check the single-pass engine against the frozen multi-pass extractor."""
+    mismatches = [
+        idx for idx, prompt in enumerate(prompts)
+        if extract_task_lines(prompt) != legacy_extract_task_lines(prompt)
+    ]
+    legacy = time_calls(legacy_extract_task_lines, prompts, REPEATS)
+    engine = time_calls(extract_task_lines, prompts, REPEATS)
+    return {
+        "mismatches": mismatches,
+        "legacy_mean_us": legacy["mean_us"],
+        "engine_mean_us": engine["mean_us"],
+        "speedup": legacy["mean_us"] / engine["mean_us"] if engine["mean_us"] else 0.0,
+    }
+
+
+def run_benchmark(scales: List[int], repeats: int) -> Dict:
+    prompts = load_prompts()
+
+    results = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "total_prompts": len(prompts),
+        "repeats": repeats,
+        "benchmarks": {},
+    }
+
+    for scale in scales:
+        sample_size = min(len(prompts), max(MIN_SAMPLES_PER_SCALE, len(prompts) // scale))
+        scaled = [scale_prompt(prompt, scale) for prompt in prompts[:sample_size]]
+        print(f"Timing {len(TARGETS)} functions at {scale}x on {sample_size} prompts...")
+
+        for name, fn in TARGETS.items():
+            stats = time_calls(fn, scaled, repeats)
+            stats["avg_prompt_chars"] = sum(len(prompt) for prompt in scaled) / len(scaled)
+            results["benchmarks"][f"{name}@{scale}x"] = stats
+
+    results["legacy_comparison"] = run_legacy_comparison(prompts)
+    return results
+
+
+def best_of(fn: Callable, repeats: int) -> float:
+    """Fastest of `repeats` timed calls, in seconds."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run_pool_crossover(prompts: List[str], repeats: int, batch_size: int = CROSSOVER_BATCH) -> Dict:
+    """
+    Measure the inputs of prompt_parser's pool cost model and the batch
+    size at which parse_prompts should switch to a process pool.
+
+    parse_us is the in-process cost per prompt and startup_us the cost of
+    bringing up one pool worker. overhead_us is what the pool adds per
+    prompt (pickling and IPC), solved from a forced 2-worker pool run on
+    this host's parallelism.
+    """
+    batch = [prompts[i % len(prompts)] for i in range(batch_size)]
+    cpus = available_cpus()
+    probe_workers = 2
+    print(f"Timing process pool vs in-process on {batch_size} prompts ({cpus} CPU(s))...")
+
+    in_process = best_of(lambda: [parse_prompt(prompt) for prompt in batch], repeats)
+
+    def start_pool():
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            executor.submit(parse_prompt, "").result()
+    startup = best_of(start_pool, repeats)
+
+    pooled = best_of(
+        lambda: list(parse_prompts(batch, workers=probe_workers, min_batch=0)), repeats
+    )
+
+    parse_us = in_process / batch_size * 1e6
+    startup_us = startup * 1e6
+    parallelism = min(probe_workers, cpus)
+    overhead_us = max(
+        0.0, (pooled * 1e6 - startup_us * probe_workers) / batch_size - parse_us / parallelism
+    )
+
+    thresholds = {
+        str(workers): pool_crossover(workers, parse_us, startup_us, overhead_us)
+        for workers in sorted(set(CROSSOVER_WORKERS + [cpus]))
+    }
+    return {
+        "batch_size": batch_size,
+        "cpus": cpus,
+        "in_process_s": in_process,
+        f"pool_{probe_workers}_workers_s": pooled,
+        "parse_us": parse_us,
+        "startup_us_per_worker": startup_us,
+        "overhead_us": overhead_us,
+        "min_batch_by_workers": thresholds,
+        "host_min_batch": thresholds[str(cpus)],
+    }
+
+
+def compare_results(current: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """Flag benchmarks whose compared percentiles grew beyond threshold."""
+    regressions = []
+    for key, stats in current["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(key)
+        if not base:
+            continue
+        for metric in COMPARED_METRICS:
+            if not base.get(metric):
+                continue
+            change = stats[metric] / base[metric] - 1.0
+            if change > threshold:
+                regressions.append({
+                    "benchmark": key,
+                    "metric": metric,
+                    "baseline": base[metric],
+                    "current": stats[metric],
+                    "change": change,
+                })
+    return regressions
+
+
+def print_results(results: Dict):
+    """Print benchmark results in a readable format."""
+    print("\n" + "=" * 80)
+    print("PARSER BENCHMARK RESULTS")
+    print("=" * 80)
+
+    print(f"\n{'Benchmark':<32} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} {'prompts/s':>12}")
+    for key, stats in results["benchmarks"].items():
+        print(
+            f"{key:<32} {stats['p50_us']:>10.2f} {stats['p95_us']:>10.2f} "
+            f"{stats['p99_us']:>10.2f} {stats['throughput_per_sec']:>12.0f}"
+        )
+
+    legacy = results["legacy_comparison"]
+    print("\n--- SINGLE-PASS ENGINE VS LEGACY ---")
+    print(f"Mismatches vs legacy: {len(legacy['mismatches'])}")
+    print(f"Legacy multi-pass: {legacy['legacy_mean_us']:.2f} us/prompt")
+    print(f"Single-pass engine: {legacy['engine_mean_us']:.2f} us/prompt")
+    print(f"Speedup: {legacy['speedup']:.2f}x")
+
+    crossover = results.get("pool_crossover")
+    if crossover:
+        print("\n--- PROCESS POOL CROSSOVER ---")
+        print(
+            f"In-process: {crossover['in_process_s']:.3f}s, "
+            f"2-worker pool: {crossover['pool_2_workers_s']:.3f}s "
+            f"({crossover['batch_size']} prompts, {crossover['cpus']} CPU(s))"
+        )
+        print(
+            f"Measured: parse {crossover['parse_us']:.1f} us/prompt, "
+            f"startup {crossover['startup_us_per_worker']:.0f} us/worker, "
+            f"pool overhead {crossover['overhead_us']:.1f} us/prompt"
+        )
+        print(
+            f"prompt_parser model: parse {PARSE_COST_US} us, "
+            f"startup {POOL_STARTUP_US_PER_WORKER:.0f} us, overhead {POOL_OVERHEAD_US} us"
+        )
+        for workers, threshold in crossover["min_batch_by_workers"].items():
+            pool = f"pool from {threshold} prompts" if threshold else "pool never pays off"
+            print(f"  {workers} worker(s) on this host: {pool}")
+
+    print("\n" + "=" * 80)
+
+
+def print_regressions(regressions: List[Dict], threshold: float):
+    print(f"\n--- REGRESSIONS (> {threshold:.0%} slower than baseline) ---")
+    if not regressions:
+        print("None")
+        return
+    for row in regressions:
+        print(
+            f"{row['benchmark']:<32} {row['metric']:<7} "
+            f"{row['baseline']:>10.2f} -> {row['current']:>10.2f} us ({row['change']:+.1%})"
+        )
+
+
+def save_json(data: Dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    print(f"\nResults saved to: {path}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark prompt parser functions")
+    parser.add_argument(
+        "--scales",
+        type=int,
+        nargs="+",
+        default=SCALES,
+        help="Prompt length multipliers to benchmark",
+    )
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="Timed passes per benchmark")
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help=f"Also write results as the baseline ({os.path.basename(BASELINE_PATH)})",
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Compare against the saved baseline and fail on regressions",
+    )
+    parser.add_argument(
+        "--pool-crossover",
+        action="store_true",
+        help="Also measure the batch size at which parse_prompts should use a process pool",
+    )
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON path")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_REGRESSION_THRESHOLD,
+        help="Allowed slowdown before flagging a regression (0.10 = 10%%)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if not os.path.exists(DATASET_PATH):
+        print(f"Error: Dataset not found at {DATASET_PATH}")
+        print("Please run generate_dataset.py first.")
+        sys.exit(1)
+
+    results = run_benchmark(args.scales, args.repeats)
+    if args.pool_crossover:
+        results["pool_crossover"] = run_pool_crossover(load_prompts(), args.repeats)
+    print_results(results)
+
+    exit_code = 0
+    if results["legacy_comparison"]["mismatches"]:
+        print(f"\n Engine output differs for prompt indices: {results['legacy_comparison']['mismatches'][:20]}")
+        exit_code = 1
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"\nError: Baseline not found at {args.baseline}")
+            print("Run with --save-baseline first.")
+            return 1
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.threshold)
+        results["regressions"] = regressions
+        print_regressions(regressions, args.threshold)
+        if regressions:
+            exit_code = 1
+
+    save_json(results, RESULTS_PATH)
+    if args.save_baseline:
+        save_json(results, args.baseline)
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
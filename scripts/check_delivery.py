@@ -0,0 +1,413 @@
+import asyncio
+import base64
+import os
+import smtplib
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+from unittest import mock
+
+import aiosmtplib
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.modules import email_sender
+from app.modules.async_email_sender import AsyncEmailSender, asend_many
+from app.modules.email_sender import build_message, send_bulk
+from app.modules.outbox import FAILED, QUEUED, SENT, Outbox
+from app.modules.smtp_pool import SMTPPool
+
+FROM_EMAIL = "sender@example.com"
+APP_PASSWORD = "app-password"
+# Logins with this password are rejected with 535
+BAD_PASSWORD = "wrong-password"
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Plaintext SMTP server on localhost that accepts AUTH PLAIN and records
+    what it receives. replies maps a recipient to the RCPT codes it gets,
+    one per attempt (250 once the list runs out).
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubSMTPHandler)
+        self.port = self.server_address[1]
+        self.replies: Dict[str, List[int]] = {}
+        self.delivered: List[str] = []
+        self.counters = {"connections": 0, "logins": 0, "max_active": 0}
+        self._active = 0
+        self._sockets: List[socket.socket] = []
+        self._lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def rcpt_code(self, address: str) -> int:
+        with self._lock:
+            codes = self.replies.get(address.lower())
+            return codes.pop(0) if codes else 250
+
+    def drop_all(self) -> None:
+        """Close every open connection, as a server dropping idle sessions would."""
+        with self._lock:
+            sockets, self._sockets = self._sockets, []
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self):
+        server = self.server
+        with server._lock:
+            server.counters["connections"] += 1
+            server._sockets.append(self.connection)
+        self.reply("220 stub ESMTP")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250-stub")
+                self.reply("250-AUTH PLAIN")
+                self.reply("250 8BITMIME")
+            elif verb == "AUTH":
+                _, _, password = base64.b64decode(command.split()[-1]).decode("utf-8").split("\0")
+                if password == BAD_PASSWORD:
+                    self.reply("535 5.7.8 Username and Password not accepted")
+                else:
+                    with server._lock:
+                        server.counters["logins"] += 1
+                    self.reply("235 2.7.0 Accepted")
+            elif verb == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip().strip("<>")
+                code = server.rcpt_code(address)
+                if code == 250:
+                    recipients.append(address)
+                    self.reply("250 OK")
+                elif code >= 500:
+                    self.reply(f"{code} 5.1.1 No such user")
+                else:
+                    self.reply(f"{code} 4.2.1 Try again later")
+            elif verb == "DATA":
+                if not recipients:
+                    self.reply("554 No valid recipients")
+                    continue
+                self.reply("354 Go ahead")
+                while self.rfile.readline().rstrip(b"\r\n") != b".":
+                    pass
+                with server._lock:
+                    server._active += 1
+                    server.counters["max_active"] = max(server.counters["max_active"], server._active)
+                time.sleep(0.01)
+                with server._lock:
+                    server._active -= 1
+                    server.delivered.extend(recipients)
+                self.reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class PlainSMTP(smtplib.SMTP):
+    """smtplib.SMTP for the plaintext stub: STARTTLS is skipped, everything else is real."""
+
+    def starttls(self, *args, **kwargs):
+        return 220, b"TLS skipped for the stub server"
+
+
+def make_pool(server: StubSMTPServer, **kwargs) -> SMTPPool:
+    return SMTPPool(host="127.0.0.1", port=server.port, **kwargs)
+
+
+def message_for(to_email: str) -> str:
+    msg, _ = build_message(FROM_EMAIL, to_email, "Daily report", "<p>Done</p>")
+    return msg.as_string()
+
+
+def report(name: str, ok: bool, failures: Dict[str, str], detail: str = "") -> None:
+    print(f"  {name:<60} {'OK' if ok else 'FAILED'}")
+    if not ok:
+        failures[name] = detail
+
+
+def check_pool(server: StubSMTPServer, failures: Dict[str, str]) -> None:
+    pool = make_pool(server)
+    logins = server.counters["logins"]
+    for index in range(3):
+        pool.sendmail(FROM_EMAIL, APP_PASSWORD, [f"pool{index}@example.com"], message_for("pool@example.com"))
+    stats = pool.stats()
+    report(
+        "smtp pool: sequential sends share one login",
+        server.counters["logins"] - logins == 1 and stats["hits"] == 2,
+        failures,
+        str(stats),
+    )
+
+    server.replies["nobody@example.com"] = [550]
+    try:
+        pool.sendmail(FROM_EMAIL, APP_PASSWORD, ["nobody@example.com"], message_for("nobody@example.com"))
+        refused = False
+    except smtplib.SMTPRecipientsRefused as e:
+        refused = email_sender.is_permanent_failure(e)
+    pool.sendmail(FROM_EMAIL, APP_PASSWORD, ["after@example.com"], message_for("after@example.com"))
+    report(
+        "smtp pool: refused recipient keeps the session",
+        refused and server.counters["logins"] - logins == 1,
+        failures,
+        f"refused={refused} logins={server.counters['logins'] - logins}",
+    )
+
+    server.drop_all()
+    time.sleep(0.05)
+    reused = pool.sendmail(FROM_EMAIL, APP_PASSWORD, ["dropped@example.com"], message_for("dropped@example.com"))
+    report(
+        "smtp pool: dropped session is replaced and the send retried",
+        not reused and "dropped@example.com" in server.delivered,
+        failures,
+        str(pool.stats()),
+    )
+
+    try:
+        pool.sendmail(FROM_EMAIL, BAD_PASSWORD, ["x@example.com"], message_for("x@example.com"))
+        rejected = False
+    except smtplib.SMTPAuthenticationError as e:
+        rejected = email_sender.is_permanent_failure(e)
+    report("smtp pool: rejected login is a permanent failure", rejected, failures)
+    pool.close_all()
+
+    expiring = make_pool(server, idle_timeout=0.05)
+    expiring.sendmail(FROM_EMAIL, APP_PASSWORD, ["idle1@example.com"], message_for("idle1@example.com"))
+    time.sleep(0.1)
+    expiring.sendmail(FROM_EMAIL, APP_PASSWORD, ["idle2@example.com"], message_for("idle2@example.com"))
+    stats = expiring.stats()
+    report(
+        "smtp pool: idle sessions expire",
+        stats["expired"] == 1 and stats["connects"] == 2,
+        failures,
+        str(stats),
+    )
+    expiring.close_all()
+
+
+def check_outbox(server: StubSMTPServer, failures: Dict[str, str], db_dir: str) -> None:
+    pool = make_pool(server)
+    db_path = os.path.join(db_dir, "outbox.sqlite3")
+    outbox = Outbox(db_path, send_fn=pool.sendmail, workers=2, retry_base_delay=0.05, retry_max_delay=0.1)
+
+    report(
+        "outbox: database is owner-only (0600)",
+        os.stat(db_path).st_mode & 0o777 == 0o600,
+        failures,
+        oct(os.stat(db_path).st_mode & 0o777),
+    )
+
+    server.replies["busy@example.com"] = [451, 451]
+    job = outbox.wait(outbox.submit(FROM_EMAIL, APP_PASSWORD, "busy@example.com", "Report", "<p>x</p>"), 10)
+    report(
+        "outbox: 4xx is retried until sent",
+        job.state == SENT and job.attempts == 3,
+        failures,
+        str(job),
+    )
+
+    server.replies["gone@example.com"] = [550]
+    job_id = outbox.submit(FROM_EMAIL, APP_PASSWORD, "gone@example.com", "Report", "<p>x</p>")
+    job = outbox.wait(job_id, 10)
+    report(
+        "outbox: 5xx fails at once without retrying",
+        job.state == FAILED and job.attempts == 1 and "No such user" in (job.error or ""),
+        failures,
+        str(job),
+    )
+    retried = outbox.retry(job_id)
+    job = outbox.wait(job_id, 10)
+    report(
+        "outbox: retry() resends a failed job",
+        retried and job.state == SENT,
+        failures,
+        str(job),
+    )
+
+    job = outbox.wait(outbox.submit(FROM_EMAIL, BAD_PASSWORD, "auth@example.com", "Report", "<p>x</p>"), 10)
+    report(
+        "outbox: rejected login fails at once",
+        job.state == FAILED and job.attempts == 1,
+        failures,
+        str(job),
+    )
+    pool.close_all()
+
+
+def check_restart_recovery(server: StubSMTPServer, failures: Dict[str, str], db_dir: str) -> None:
+    db_path = os.path.join(db_dir, "restart.sqlite3")
+    claimed = threading.Event()
+
+    def interrupted_send(*args):
+        # The process "dies" while this send is in progress: never returns
+        claimed.set()
+        threading.Event().wait()
+
+    before = Outbox(db_path, send_fn=interrupted_send, workers=1)
+    job_id = before.submit(FROM_EMAIL, APP_PASSWORD, "restart@example.com", "Report", "<p>x</p>")
+    claimed.wait(5)
+
+    pool = make_pool(server)
+    after = Outbox(db_path, send_fn=pool.sendmail, workers=1)
+    time.sleep(0.1)
+    waiting = after.status(job_id)
+    report(
+        "outbox restart: mid-send row is re-queued",
+        after.counters["recovered"] == 1 and waiting.state == QUEUED,
+        failures,
+        f"recovered={after.counters['recovered']} job={waiting}",
+    )
+
+    # Passwords are never stored, so the row waits for the account to log in again
+    after.remember_credentials(FROM_EMAIL, APP_PASSWORD)
+    job = after.wait(job_id, 10)
+    report(
+        "outbox restart: re-queued row is sent after login",
+        job.state == SENT and "restart@example.com" in server.delivered,
+        failures,
+        str(job),
+    )
+    pool.close_all()
+
+
+def check_bulk(server: StubSMTPServer, failures: Dict[str, str]) -> None:
+    pool = make_pool(server)
+    server.replies["bulk-gone@example.com"] = [550]
+    recipients = [
+        ("bulk-a@example.com", {"name": "Ada"}),
+        ("bulk-gone@example.com", {"name": "Gone"}),
+        ("bulk-b@example.com", {}),
+        ("bulk-c@example.com", {"name": "Cy"}),
+    ]
+    logins = server.counters["logins"]
+    with mock.patch.object(email_sender, "get_smtp_pool", return_value=pool):
+        results = send_bulk(
+            FROM_EMAIL, APP_PASSWORD, "Hi {{ name }}", "<p>Hello {{ name }}</p>", recipients, batch_size=0
+        )
+    outcome = [(result.sent, result.permanent) for result in results]
+    report(
+        "bulk send: failures stay per message on one session",
+        outcome == [(True, False), (False, True), (False, True), (True, False)]
+        and server.counters["logins"] - logins == 1,
+        failures,
+        str(results),
+    )
+    pool.close_all()
+
+
+def check_async_sender(server: StubSMTPServer, failures: Dict[str, str]) -> None:
+    server.replies["async-gone@example.com"] = [550]
+    messages = [
+        {
+            "from_email": FROM_EMAIL,
+            "app_password": APP_PASSWORD,
+            "to_email": f"async{index}@example.com",
+            "subject": "Report",
+            "html_body": "<p>x</p>",
+        }
+        for index in range(30)
+    ]
+    messages[5]["to_email"] = "async-gone@example.com"
+    server.counters["max_active"] = 0
+
+    async def run():
+        async with AsyncEmailSender(max_per_account=3, host="127.0.0.1", port=server.port) as sender:
+            results = await asend_many(messages, sender)
+            return results, dict(sender.counters)
+
+    results, counters = asyncio.run(run())
+    errors = [index for index, result in enumerate(results) if result is not None]
+    report(
+        "async sender: batch capped per account, refusals isolated",
+        errors == [5] and server.counters["max_active"] <= 3,
+        failures,
+        f"errors={errors} counters={counters} max_active={server.counters['max_active']}",
+    )
+    report(
+        "async sender: refused recipient keeps the connection",
+        counters["connects"] == 3 and counters["reused"] == len(messages) - 3,
+        failures,
+        str(counters),
+    )
+
+    async def change_password():
+        async with AsyncEmailSender(host="127.0.0.1", port=server.port) as sender:
+            message = {**messages[0], "to_email": "rotated@example.com"}
+            await sender.send_email(**message)
+            await sender.send_email(**{**message, "app_password": "new-app-password"})
+            try:
+                await sender.send_email(**{**message, "app_password": BAD_PASSWORD})
+                revoked = False
+            except aiosmtplib.SMTPAuthenticationError:
+                revoked = True
+            return revoked, dict(sender.counters)
+
+    revoked, counters = asyncio.run(change_password())
+    report(
+        "async sender: a changed password never reuses a session",
+        revoked and counters["connects"] == 2 and counters["reused"] == 0,
+        failures,
+        f"revoked={revoked} counters={counters}",
+    )
+
+
+def run_checks() -> Dict[str, str]:
+    failures: Dict[str, str] = {}
+    server = StubSMTPServer()
+    print(f"Checking email delivery against a stub SMTP server on port {server.port}...\n")
+
+    # The stub speaks plaintext; the pool's STARTTLS upgrade is the only step skipped
+    with mock.patch.object(smtplib, "SMTP", PlainSMTP), tempfile.TemporaryDirectory() as db_dir:
+        check_pool(server, failures)
+        check_outbox(server, failures, db_dir)
+        check_restart_recovery(server, failures, db_dir)
+        check_bulk(server, failures)
+    check_async_sender(server, failures)
+
+    server.shutdown()
+    return failures
+
+
+def main():
+    failures = run_checks()
+
+    if failures:
+        print("\n Delivery checks failed:")
+        for name, detail in failures.items():
+            print(f"  {name}: {detail}")
+        return 1
+
+    print("\n All delivery checks passed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,683 @@
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+# Keep the checks' response cache out of app/data; set before the modules read it
+CACHE_DIR = tempfile.mkdtemp(prefix="check-generation-")
+os.environ["RESPONSE_CACHE_PATH"] = os.path.join(CACHE_DIR, "response_cache.sqlite3")
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from streamlit import config as streamlit_config
+from streamlit.logger import set_log_level
+
+from app.modules import async_report_generator, report_generator
+from app.modules.parse_cache import ParseCache
+from app.modules.prompt_parser import extract_tasks
+from app.modules.prompt_builder import build_multi_tone_prompt, tone_marker
+from app.modules.rate_limiter import GROQ_TOKENS_PER_MINUTE, AcquireTicket, RateLimitCancelled, RateLimiter
+from app.modules.report_core import (
+    EmailReport,
+    prepare_request,
+    report_inputs,
+    reserved_tokens,
+    split_tone_variants,
+    tokens_used,
+)
+from app.modules.report_patcher import apply_patch, diff_tasks, parse_items_response, should_patch
+from app.modules.response_cache import ResponseCache
+
+# Outside `streamlit run`, every cached resource warns about the missing script
+# context. Parse Streamlit's config first: parsing resets the log level
+streamlit_config.get_option("logger.level")
+set_log_level("error")
+
+FAKE_REPORT = (
+    "```html\n<html><body><p>Dear Manager,</p><ul><li>Shipped release</li></ul>"
+    "<p>Best regards,<br>Sam</p></body></html>\n```"
+)
+# Long enough that concurrent identical requests overlap
+FAKE_LATENCY_SECONDS = 0.3
+
+
+class SlowFakeLLM(FakeListChatModel):
+    """FakeListChatModel whose invoke() takes `sleep` seconds, like a network call."""
+
+    def _call(self, *args, **kwargs):
+        time.sleep(self.sleep or 0)
+        return super()._call(*args, **kwargs)
+
+
+def use_fake_llm(responses=None, latency: float = 0.0) -> SlowFakeLLM:
+    """Route report_generator's Groq client to a canned fake taking `latency` per call."""
+    llm = SlowFakeLLM(responses=responses or [FAKE_REPORT] * 100, sleep=latency)
+    report_generator.init_groq_client = lambda: llm
+    return llm
+
+
+def report(name: str, ok: bool, failures: Dict[str, str], detail: str = "") -> None:
+    print(f"  {name:<60} {'OK' if ok else 'FAILED'}")
+    if not ok:
+        failures[name] = detail
+
+
+def drained_limiter(tokens_per_minute: int) -> RateLimiter:
+    """Limiter with an empty token bucket, refilling at tokens_per_minute."""
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=tokens_per_minute)
+    limiter.acquire("warmup", tokens_per_minute)
+    return limiter
+
+
+def check_rate_limiter(failures: Dict[str, str]) -> None:
+    # 10 tokens/s: one 1-token request is granted every 0.1s
+    limiter = drained_limiter(600)
+    order: List[str] = []
+    lock = threading.Lock()
+
+    def request(user_id: str):
+        limiter.acquire(user_id, 1)
+        with lock:
+            order.append(user_id)
+
+    threads = [threading.Thread(target=request, args=("burst",)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    late = [threading.Thread(target=request, args=("other",)) for _ in range(2)]
+    for thread in late:
+        thread.start()
+    for thread in threads + late:
+        thread.join(10)
+    report(
+        "rate limiter: a burst does not starve a later user",
+        order[:4].count("other") == 2,
+        failures,
+        str(order),
+    )
+
+
+def check_limiter_cancel(failures: Dict[str, str]) -> None:
+    limiter = drained_limiter(60)
+    ticket = AcquireTicket()
+    outcome = []
+
+    def queued():
+        try:
+            limiter.acquire("cancelled", 30, ticket=ticket)
+            outcome.append("granted")
+        except RateLimitCancelled:
+            outcome.append("cancelled")
+
+    thread = threading.Thread(target=queued)
+    thread.start()
+    time.sleep(0.05)
+    limiter.cancel(ticket)
+    thread.join(5)
+    stats = limiter.stats()
+    report(
+        "rate limiter: cancel() withdraws a queued waiter",
+        outcome == ["cancelled"] and stats["queue_depth"] == 0 and stats["cancelled"] == 1,
+        failures,
+        f"outcome={outcome} stats={stats}",
+    )
+
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600)
+    ticket = AcquireTicket()
+    limiter.acquire("granted", 500, ticket=ticket)
+    limiter.cancel(ticket)
+    stats = limiter.stats()
+    report(
+        "rate limiter: cancel() refunds unused granted capacity",
+        stats["tokens_available"] > 599 and stats["requests_available"] > 59,
+        failures,
+        str(stats),
+    )
+
+
+def timed_agenerate(tasks: List[str], **kwargs):
+    """Run agenerate_email_report, returning (report, seconds until it returned)."""
+
+    async def run():
+        started = time.monotonic()
+        result = await async_report_generator.agenerate_email_report(
+            tasks, "Manager", sender_name="Sam", force_fresh=True, **kwargs
+        )
+        return result, time.monotonic() - started
+
+    return asyncio.run(run())
+
+
+def check_async_deadline(failures: Dict[str, str]) -> None:
+    # A hung model is cut off at the deadline, not retried with backoff
+    llm = SlowFakeLLM(responses=[FAKE_REPORT] * 10, sleep=1.0)
+    result, elapsed = timed_agenerate(
+        ["Reviewed deadlines"], llm=llm, timeout=0.3, limiter=RateLimiter()
+    )
+    reason = result.metadata.get("fallback_reason", "")
+    report(
+        "async generation: timeout is one deadline, not per attempt",
+        elapsed < 0.8 and llm.i == 1 and "of a 0.3s budget (1 attempt)" in reason,
+        failures,
+        f"elapsed={elapsed:.2f}s llm_calls={llm.i} reason={reason!r}",
+    )
+
+    # Queueing for rate-limit capacity counts against the same deadline
+    limiter = drained_limiter(60)
+    llm = SlowFakeLLM(responses=[FAKE_REPORT] * 10)
+    result, elapsed = timed_agenerate(["Reviewed deadlines"], llm=llm, timeout=0.3, limiter=limiter)
+    reason = result.metadata.get("fallback_reason", "")
+    report(
+        "async generation: limiter wait counts against the deadline",
+        elapsed < 0.8 and llm.i == 0 and "(0 attempts)" in reason
+        and limiter.stats()["queue_depth"] == 0,
+        failures,
+        f"elapsed={elapsed:.2f}s llm_calls={llm.i} reason={reason!r} stats={limiter.stats()}",
+    )
+
+
+def check_token_refunds(failures: Dict[str, str]) -> None:
+    # 10 tokens/s refill: bucket levels barely move while a check runs
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=600)
+    attempts = []
+
+    def flaky():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise ConnectionError("dropped")
+        return "ok"
+
+    limiter.call_with_retry(flaky, "refunds", 300, used=lambda result: 30)
+    available = limiter.stats()["tokens_available"]
+    report(
+        "rate limiter: failed attempts return their reservation",
+        len(attempts) == 2 and 570 <= available < 585,
+        failures,
+        f"attempts={len(attempts)} tokens_available={available:.0f}",
+    )
+
+    tasks = ["Shipped release", "Reviewed token refunds"]
+    request = prepare_request(tasks, "Manager", None, "formal", "Sam")
+    used = tokens_used(request.prompt, AIMessage(content=FAKE_REPORT))
+
+    def stream(limiter: RateLimiter):
+        shared_limiter = report_generator.get_rate_limiter
+        report_generator.get_rate_limiter = lambda: limiter
+        try:
+            for _ in report_generator.stream_email_report(tasks, "Manager", sender_name="Sam", force_fresh=True):
+                pass
+        finally:
+            report_generator.get_rate_limiter = shared_limiter
+
+    paths = {
+        "sync": lambda limiter: report_generator._invoke_and_store(
+            use_fake_llm(), report_generator.get_response_cache(), limiter, "refunds",
+            request, request.prompt.messages,
+        ),
+        "stream": stream,
+        "async": lambda limiter: timed_agenerate(
+            tasks, llm=FakeListChatModel(responses=[FAKE_REPORT]), limiter=limiter
+        ),
+    }
+    for path, generate in paths.items():
+        use_fake_llm()
+        # 20 tokens/s refill, and a bucket larger than the reservation
+        limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=1200)
+        generate(limiter)
+        available = limiter.stats()["tokens_available"]
+        report(
+            f"rate limiter: {path} generation keeps only the tokens used",
+            abs(available - (1200 - used)) < 20,
+            failures,
+            f"tokens_available={available:.0f} expected={1200 - used}",
+        )
+
+
+def check_cached_generation(failures: Dict[str, str]) -> None:
+    llm = use_fake_llm()
+    tasks = ["Shipped release", "Reviewed cache keys"]
+    first = report_generator.generate_email_report(tasks, "Manager", sender_name="Sam")
+    # Whitespace and tone casing do not change the key
+    cached = report_generator.generate_email_report(
+        ["Shipped  release", " Reviewed cache keys"], "Manager", tone="Formal", sender_name="Sam"
+    )
+    report(
+        "response cache: repeat request skips the LLM",
+        llm.i == 1 and not first.metadata.get("cache_hit")
+        and cached.metadata.get("cache_hit") and cached.metadata.get("cache_tier") == "memory",
+        failures,
+        f"llm_calls={llm.i} metadata={cached.metadata}",
+    )
+
+    fresh = report_generator.generate_email_report(tasks, "Manager", sender_name="Sam", force_fresh=True)
+    report(
+        "response cache: force_fresh calls the LLM again",
+        llm.i == 2 and not fresh.metadata.get("cache_hit"),
+        failures,
+        f"llm_calls={llm.i}",
+    )
+
+
+def check_single_flight(failures: Dict[str, str]) -> None:
+    llm = use_fake_llm(latency=FAKE_LATENCY_SECONDS)
+    tasks = ["Shipped release", "Reviewed single-flight"]
+    start = threading.Barrier(5)
+    reports = []
+    lock = threading.Lock()
+
+    def generate():
+        start.wait()
+        result = report_generator.generate_email_report(tasks, "Manager", sender_name="Sam")
+        with lock:
+            reports.append(result)
+
+    threads = [threading.Thread(target=generate) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    shared = sum(1 for result in reports if result.metadata.get("single_flight_shared"))
+    report(
+        "single-flight: identical concurrent requests share one call",
+        llm.i == 1 and len(reports) == 5 and shared == 4,
+        failures,
+        f"llm_calls={llm.i} reports={len(reports)} shared={shared}",
+    )
+    in_flight = report_generator.get_single_flight().stats()["in_flight"]
+    report("single-flight: finished calls are forgotten", in_flight == 0, failures, str(in_flight))
+
+
+def wait_for_idle_generations(timeout: float = 5.0) -> None:
+    """Block until abandoned (hedged) LLM calls have finished and cached."""
+    deadline = time.monotonic() + timeout
+    while report_generator.get_single_flight().stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+
+def check_hedged_generation(failures: Dict[str, str]) -> None:
+    tasks = ["Shipped release", "Reviewed hedging"]
+    llm = use_fake_llm(latency=0.5)
+    started = time.monotonic()
+    hedged = report_generator.generate_email_report(
+        tasks, "Manager", sender_name="Sam", force_fresh=True, latency_budget=0.1
+    )
+    elapsed = time.monotonic() - started
+    report(
+        "hedging: a slow LLM returns the template at the deadline",
+        elapsed < 0.4 and hedged.metadata.get("hedge_outcome") == "template"
+        and hedged.metadata.get("generation_method") == "template",
+        failures,
+        f"elapsed={elapsed:.2f}s metadata={hedged.metadata}",
+    )
+
+    wait_for_idle_generations()
+    later = report_generator.generate_email_report(tasks, "Manager", sender_name="Sam", latency_budget=0.1)
+    report(
+        "hedging: the late LLM result is cached for the next request",
+        llm.i == 1 and later.metadata.get("cache_hit") and later.metadata.get("generation_method") == "groq",
+        failures,
+        f"llm_calls={llm.i} metadata={later.metadata}",
+    )
+
+    llm = use_fake_llm(latency=0.05)
+    quick = report_generator.generate_email_report(
+        tasks, "Manager", sender_name="Sam", force_fresh=True, latency_budget=2.0
+    )
+    report(
+        "hedging: an LLM within the budget wins",
+        llm.i == 1 and quick.metadata.get("hedge_outcome") == "llm"
+        and quick.metadata.get("generation_method") == "groq" and quick.metadata.get("llm_latency_ms") < 2000,
+        failures,
+        str(quick.metadata),
+    )
+
+
+def check_streaming(failures: Dict[str, str]) -> None:
+    tasks = ["Shipped release", "Reviewed streaming"]
+    llm = use_fake_llm()
+    stream = report_generator.stream_email_report(tasks, "Manager", sender_name="Sam", force_fresh=True)
+    chunks = list(stream)
+    generated = report_generator.generate_email_report(tasks, "Manager", sender_name="Sam", force_fresh=True)
+    report(
+        "streaming: chunks and report match generate_email_report",
+        llm.i == 2 and len(chunks) > 1 and stream.report.metadata.get("streamed")
+        and stream.report.body_html == generated.body_html
+        and "".join(chunks).strip() == generated.body_html,
+        failures,
+        f"llm_calls={llm.i} streamed={''.join(chunks)!r} generated={generated.body_html!r}",
+    )
+    # The fake streams one character at a time, so each fence arrives in pieces
+    report(
+        "streaming: code fences never reach the preview",
+        not any("`" in chunk for chunk in chunks) and chunks[0].startswith("<")
+        and "".join(chunks).rstrip().endswith("</html>"),
+        failures,
+        str(chunks[:3] + chunks[-3:]),
+    )
+
+    llm = SlowFakeLLM(responses=[FAKE_REPORT] * 5, error_on_chunk_number=60)
+    report_generator.init_groq_client = lambda: llm
+    stream = report_generator.stream_email_report(tasks, "Manager", sender_name="Sam", force_fresh=True)
+    chunks = list(stream)
+    reason = stream.report.metadata.get("fallback_reason", "")
+    report(
+        "streaming: an error mid-stream gives the fallback report",
+        llm.i == 1 and chunks and "FakeListChatModelError" in reason
+        and stream.report.metadata.get("generation_method") == "template",
+        failures,
+        f"llm_calls={llm.i} chunks={len(chunks)} metadata={stream.report.metadata}",
+    )
+
+
+def multi_tone_response(tones: List[str]) -> str:
+    """Combined response with one marked variant per tone, in the given order."""
+    return "\n".join(
+        f"{tone_marker(tone)}\n<p>Dear Manager,</p><ul><li>{tone} variant</li></ul>" for tone in tones
+    )
+
+
+def check_tone_variants(failures: Dict[str, str]) -> None:
+    tones = ["formal", "neutral", "friendly"]
+    reordered = split_tone_variants(multi_tone_response(["friendly", "formal", "neutral"]), tones)
+    report(
+        "tone variants: markers in any order map to their tone",
+        reordered is not None and all(f"{tone} variant" in reordered[tone] for tone in tones),
+        failures,
+        str(reordered),
+    )
+    missing = split_tone_variants(multi_tone_response(["formal", "friendly"]), tones)
+    report("tone variants: a missing marker rejects the response", missing is None, failures, str(missing))
+
+    tasks = ["Shipped release", "Reviewed tone variants"]
+    llm = use_fake_llm([multi_tone_response(tones)] + [FAKE_REPORT] * 10)
+    reports = report_generator.generate_tone_variants(tasks, "Manager", sender_name="Sam", force_fresh=True)
+    report(
+        "tone variants: one call writes every tone",
+        llm.i == 1 and list(reports) == tones
+        and all(reports[tone].metadata.get("multi_tone") for tone in tones)
+        and all(f"{tone} variant" in reports[tone].body_html for tone in tones),
+        failures,
+        f"llm_calls={llm.i} tones={list(reports)}",
+    )
+
+    llm = use_fake_llm([multi_tone_response(["formal", "friendly"])] + [FAKE_REPORT] * 10)
+    reports = report_generator.generate_tone_variants(tasks, "Manager", sender_name="Sam", force_fresh=True)
+    report(
+        "tone variants: a missing tone falls back to per-tone calls",
+        llm.i == 4 and list(reports) == tones
+        and not any(reports[tone].metadata.get("multi_tone") for tone in tones)
+        and all("Shipped release" in reports[tone].body_html for tone in tones),
+        failures,
+        f"llm_calls={llm.i} tones={list(reports)}",
+    )
+
+    # Largest task list the prompt builder sends, in every tone
+    prompt = build_multi_tone_prompt(
+        [f"Finished task number {index} " * 10 for index in range(60)], "Manager", "October 17, 2026", tones, "Sam"
+    )
+    report(
+        "tone variants: combined reservation fits the default bucket",
+        reserved_tokens(prompt) < GROQ_TOKENS_PER_MINUTE,
+        failures,
+        f"reserved={reserved_tokens(prompt)} tokens_per_minute={GROQ_TOKENS_PER_MINUTE}",
+    )
+
+    shared_limiter = report_generator.get_rate_limiter
+    report_generator.get_rate_limiter = lambda: RateLimiter(tokens_per_minute=1000)
+    try:
+        llm = use_fake_llm()
+        reports = report_generator.generate_tone_variants(tasks, "Manager", sender_name="Sam", force_fresh=True)
+    finally:
+        report_generator.get_rate_limiter = shared_limiter
+    report(
+        "tone variants: no combined call that needs the whole bucket",
+        llm.i == 3 and not any(reports[tone].metadata.get("multi_tone") for tone in tones),
+        failures,
+        f"llm_calls={llm.i}",
+    )
+
+
+def patchable_report(tasks: List[str], body_html: str = "") -> EmailReport:
+    """LLM-written report for tasks, as stored in session state after generation."""
+    request = prepare_request(tasks, "Manager", None, "formal", "Sam")
+    items = "\n".join(f'  <li style="margin:0">{task}</li>' for task in tasks)
+    return EmailReport(
+        subject=request.subject,
+        body_html=body_html or f"<p>Dear Manager,</p>\n<ul>\n{items}\n</ul>\n<p>Best regards,<br>Sam</p>",
+        metadata={"generation_method": "groq", **report_inputs(request)},
+    )
+
+
+def regenerate(previous: EmailReport, tasks: List[str]) -> EmailReport:
+    return report_generator.regenerate_email_report(previous, tasks, "Manager", sender_name="Sam")
+
+
+def check_report_patcher(failures: Dict[str, str]) -> None:
+    old = ["Wrote the design doc", "Fixed the login bug", "Reviewed pull requests"]
+    added = diff_tasks(old, old + ["Planned the sprint"])
+    removed = diff_tasks(old, [old[0], old[2]])
+    reordered = diff_tasks(old, [old[2], old[0], old[1]])
+    report(
+        "report patcher: diff_tasks finds adds, removes and reorders",
+        added.added == [3] and not added.removed and removed.removed == [1] and not removed.added
+        and reordered.added == [0] and reordered.removed == [2] and reordered.kept == {1: 0, 2: 1}
+        and all(should_patch(diff, 3) for diff in (added, removed, reordered))
+        and not should_patch(diff_tasks(old, old), 3),
+        failures,
+        f"added={added} removed={removed} reordered={reordered}",
+    )
+
+    llm = use_fake_llm()
+    previous = patchable_report(old)
+    report(
+        "report patcher: an unchanged task list needs no update",
+        not report_generator.tasks_changed(previous, [f" {task}" for task in old] + [""])
+        and report_generator.tasks_changed(previous, old[:2]),
+        failures,
+    )
+    patched = regenerate(previous, [old[0], old[2], "Planned the sprint"])
+    report(
+        "report patcher: adds and removes patch without the LLM",
+        llm.i == 0 and patched.metadata.get("generation_method") == "patch"
+        and '<li style="margin:0">Planned the sprint</li>' in patched.body_html
+        and old[1] not in patched.body_html
+        and patched.body_html.startswith("<p>Dear Manager,</p>\n<ul>\n")
+        and patched.body_html.endswith("\n</ul>\n<p>Best regards,<br>Sam</p>"),
+        failures,
+        f"llm_calls={llm.i} body={patched.body_html!r}",
+    )
+
+    patched = regenerate(previous, [old[2], old[0], old[1]])
+    positions = [patched.body_html.find(task) for task in (old[2], old[0], old[1])]
+    report(
+        "report patcher: a reorder lists items in the new order",
+        llm.i == 0 and -1 not in positions and positions == sorted(positions),
+        failures,
+        f"llm_calls={llm.i} body={patched.body_html!r}",
+    )
+
+    patched = regenerate(previous, old + ['Fixed <b>bold</b> & "quoted" input'])
+    report(
+        "report patcher: new items are HTML-escaped",
+        "Fixed &lt;b&gt;bold&lt;/b&gt; &amp; &quot;quoted&quot; input</li>" in patched.body_html
+        and "<b>bold</b>" not in patched.body_html,
+        failures,
+        patched.body_html,
+    )
+
+    four = old + ["Planned the sprint"]
+    llm = use_fake_llm(['<li style="margin:0">Fixed the signup bug</li>'] + [FAKE_REPORT] * 10)
+    patched = regenerate(patchable_report(four), [four[0], "Fixed the signup bug", four[2], four[3]])
+    report(
+        "report patcher: changed items are rewritten by the LLM",
+        llm.i == 1 and patched.metadata.get("patch_mode") == "llm_items"
+        and "Fixed the signup bug" in patched.body_html and four[1] not in patched.body_html
+        and all(task in patched.body_html for task in (four[0], four[2], four[3])),
+        failures,
+        f"llm_calls={llm.i} metadata={patched.metadata}",
+    )
+
+    llm = use_fake_llm()
+    patched = regenerate(patchable_report(four), ["Rewrote " + task for task in four[:3]] + [four[3]])
+    report(
+        "report patcher: over half the items changed regenerates",
+        llm.i == 1 and patched.metadata.get("generation_method") == "groq"
+        and "Shipped release" in patched.body_html,
+        failures,
+        f"llm_calls={llm.i} metadata={patched.metadata}",
+    )
+
+    # One item was asked for, two came back
+    llm = use_fake_llm(["<li>Fixed the signup bug</li>\n<li>Extra item</li>"] + [FAKE_REPORT] * 10)
+    patched = regenerate(patchable_report(four), [four[0], "Fixed the signup bug", four[2], four[3]])
+    report(
+        "report patcher: a wrong item count regenerates fully",
+        parse_items_response("<li>a</li>\n<li>b</li>", 2) == ["<li>a</li>", "<li>b</li>"]
+        and parse_items_response("<li>a</li>", 2) is None
+        and llm.i == 2 and patched.metadata.get("generation_method") == "groq",
+        failures,
+        f"llm_calls={llm.i} metadata={patched.metadata}",
+    )
+
+    llm = use_fake_llm()
+    no_list = patchable_report(old, "<p>Dear Manager,</p><p>" + "; ".join(old) + "</p>")
+    new = old + ["Planned the sprint"]
+    patched = regenerate(no_list, new)
+    report(
+        "report patcher: a body without <ul> regenerates fully",
+        apply_patch(no_list.body_html, old, new, diff_tasks(old, new)) is None
+        and llm.i == 1 and patched.metadata.get("generation_method") == "groq",
+        failures,
+        f"llm_calls={llm.i} metadata={patched.metadata}",
+    )
+
+    two_lists = patchable_report(old)
+    next_week = "<p>Next week:</p><ul><li>Release planning</li></ul>"
+    two_lists.body_html += next_week
+    patched = regenerate(two_lists, old + ["Planned the sprint"])
+    report(
+        "report patcher: with two lists only the task list is patched",
+        patched.metadata.get("generation_method") == "patch"
+        and patched.body_html.endswith(next_week)
+        and patched.body_html.count("<li") == 5
+        and patched.body_html.find("Planned the sprint") < patched.body_html.find("Next week"),
+        failures,
+        patched.body_html,
+    )
+
+
+def check_response_cache(failures: Dict[str, str]) -> None:
+    db_path = os.path.join(CACHE_DIR, "tiers.sqlite3")
+    value = {"subject": "Report", "body_html": "<p>x</p>", "metadata": {}}
+
+    ResponseCache(db_path).set("key", value)
+    restarted = ResponseCache(db_path)
+    hit = restarted.get("key")
+    report(
+        "response cache: entries survive a restart (disk tier)",
+        hit is not None and hit[1] == "disk" and restarted.get("key")[1] == "memory",
+        failures,
+        str(hit),
+    )
+    report(
+        "response cache: database is owner-only (0600)",
+        os.stat(db_path).st_mode & 0o777 == 0o600,
+        failures,
+        oct(os.stat(db_path).st_mode & 0o777),
+    )
+
+    expiring = ResponseCache(os.path.join(CACHE_DIR, "ttl.sqlite3"), ttl_seconds=0)
+    expiring.set("key", value)
+    report("response cache: expired entries miss", expiring.get("key") is None, failures)
+
+    # Room for two rows on disk; the least recently read one goes first
+    row_size = len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+    bounded = ResponseCache(
+        os.path.join(CACHE_DIR, "bounded.sqlite3"), memory_max_entries=1, disk_max_bytes=2 * row_size
+    )
+    for key in ("old", "recent"):
+        bounded.set(key, value)
+        time.sleep(0.01)
+    ResponseCache(bounded.db_path).get("old")
+    time.sleep(0.01)
+    bounded.set("new", value)
+    kept = [key for key in ("old", "recent", "new") if ResponseCache(bounded.db_path).get(key) is not None]
+    report(
+        "response cache: disk tier evicts least recently used rows",
+        kept == ["old", "new"] and bounded.stats()["evictions"] == 1,
+        failures,
+        f"kept={kept} stats={bounded.stats()}",
+    )
+
+
+def check_parse_cache(failures: Dict[str, str]) -> None:
+    cache = ParseCache(max_bytes=600)
+    log = "- Shipped release\n- Reviewed pull requests"
+    first = cache.get_or_parse(log, extract_tasks)
+    first.append("mutated by caller")
+    second = cache.get_or_parse(log, extract_tasks)
+    stats = cache.stats()
+    report(
+        "parse cache: hits return the cached tasks as a fresh list",
+        second == extract_tasks(log) and stats["hits"] == 1 and stats["misses"] == 1,
+        failures,
+        f"second={second} stats={stats}",
+    )
+
+    for index in range(20):
+        cache.get_or_parse(f"- Task number {index} done", extract_tasks)
+    stats = cache.stats()
+    report(
+        "parse cache: size stays within max_bytes",
+        0 < stats["size_bytes"] <= stats["max_bytes"] and stats["entries"] < 21,
+        failures,
+        str(stats),
+    )
+
+
+def run_checks() -> Dict[str, str]:
+    failures: Dict[str, str] = {}
+    print("Checking report generation with a fake LLM...\n")
+
+    check_rate_limiter(failures)
+    check_limiter_cancel(failures)
+    check_async_deadline(failures)
+    check_token_refunds(failures)
+    check_cached_generation(failures)
+    check_single_flight(failures)
+    check_hedged_generation(failures)
+    check_streaming(failures)
+    check_tone_variants(failures)
+    check_report_patcher(failures)
+    check_response_cache(failures)
+    check_parse_cache(failures)
+    return failures
+
+
+def main():
+    try:
+        failures = run_checks()
+    finally:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+    if failures:
+        print("\n Generation checks failed:")
+        for name, detail in failures.items():
+            print(f"  {name}: {detail}")
+        return 1
+
+    print("\n All generation checks passed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
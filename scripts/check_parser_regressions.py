@@ -0,0 +1,196 @@
+import csv
+import io
+import json
+import os
+import sys
+from typing import Callable, Dict, List, Tuple
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.modules.prompt_parser import (
+    LIST_MARKER_REGEX,
+    POLICY_PROMPT,
+    POLICY_WORKLOG,
+    IncrementalParser,
+    extract_task_lines,
+    extract_tasks,
+    iter_task_lines,
+    parse_prompt,
+    parse_prompts_with_llm_fallback,
+)
+from legacy_parser import legacy_extract_task_lines, legacy_extract_tasks
+
+DATASET_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "app", "data", "synthetic_dataset.csv"
+)
+
+# Worklog lines whose output intentionally changed with the shared tokenizer
+WORKLOG_FIXED_CASES: List[Tuple[str, List[str]]] = [
+    ("10. Shipped release", ["Shipped release"]),
+    ("2025 roadmap drafted", ["2025 roadmap drafted"]),
+    ("1.5 hours on incident triage", ["1.5 hours on incident triage"]),
+    ("3) Reviewed 4 pull requests", ["Reviewed 4 pull requests"]),
+    ("- 3 bugs fixed in checkout", ["3 bugs fixed in checkout"]),
+    ("• - nested marker", ["nested marker"]),
+]
+
+
+# LLM answers with the wrong types: each affected prompt must keep its regex result
+MALFORMED_LLM_TASKS = ["LLM task"] * 50
+MALFORMED_LLM_CASES: List[Tuple[str, int, str, List[int]]] = [
+    ("null fields", 1, '{"recipient_email": null, "tasks": null}', [0, 1]),
+    ("non-string tasks", 1, '{"recipient_email": "llm@example.com", "tasks": [1, 2]}', [0, 1]),
+    (
+        "packed, one bad entry",
+        2,
+        json.dumps([
+            {"index": 0, "recipient_email": None, "tasks": None},
+            {"index": 1, "recipient_email": "llm@example.com", "tasks": MALFORMED_LLM_TASKS},
+        ]),
+        [0],
+    ),
+]
+
+
+class CannedLLM:
+    """LLM client that answers every prompt with the same text."""
+
+    def __init__(self, answer: str):
+        self.answer = answer
+
+    def invoke(self, prompt: str) -> str:
+        return self.answer
+
+
+def load_prompts() -> List[str]:
+    """Load raw prompts from the synthetic dataset."""
+    with open(DATASET_PATH, "r", encoding="utf-8") as f:
+        return [row["raw_prompt"] for row in csv.DictReader(f)]
+
+
+def legacy_worklog_expected(text: str) -> List[str]:
+    """
+    Legacy extract_tasks output with only the intended change applied:
+    leftover list markers are removed, and marker-only lines are dropped.
+    """
+    expected = []
+    for task in legacy_extract_tasks(text):
+        cleaned = LIST_MARKER_REGEX.sub("", task, count=1)
+        if cleaned:
+            expected.append(cleaned)
+    return expected
+
+
+def check_policy(
+    name: str,
+    prompts: List[str],
+    actual: Callable[[str], List[str]],
+    expected: Callable[[str], List[str]],
+) -> List[int]:
+    """Return indices where a front-end disagrees with its expected output."""
+    failures = [idx for idx, prompt in enumerate(prompts) if actual(prompt) != expected(prompt)]
+    status = "OK" if not failures else f"FAILED ({len(failures)})"
+    print(f"  {name:<48} {status}")
+    return failures
+
+
+def run_checks() -> Dict[str, List]:
+    prompts = load_prompts()
+    failures: Dict[str, List] = {}
+
+    print(f"Checking parser policies on {len(prompts)} prompts...\n")
+
+    checks = [
+        (
+            "prompt policy: extract_task_lines vs legacy",
+            extract_task_lines,
+            legacy_extract_task_lines,
+        ),
+        (
+            "prompt policy: streaming vs extract_task_lines",
+            lambda prompt: list(iter_task_lines(io.StringIO(prompt), policy=POLICY_PROMPT)),
+            extract_task_lines,
+        ),
+        (
+            "worklog policy: extract_tasks vs legacy",
+            extract_tasks,
+            legacy_worklog_expected,
+        ),
+        (
+            "worklog policy: streaming vs extract_tasks",
+            lambda prompt: list(iter_task_lines(io.StringIO(prompt), policy=POLICY_WORKLOG)),
+            extract_tasks,
+        ),
+    ]
+    for name, actual, expected in checks:
+        failed = check_policy(name, prompts, actual, expected)
+        if failed:
+            failures[name] = failed
+
+    # Incremental parsing: grow each prompt line by line, as typing would
+    for policy, expected in ((POLICY_PROMPT, extract_task_lines), (POLICY_WORKLOG, extract_tasks)):
+        name = f"{policy} policy: incremental vs full parse"
+        failed = []
+        for idx, prompt in enumerate(prompts):
+            parser = IncrementalParser(policy)
+            lines = prompt.splitlines()
+            for end in range(1, len(lines) + 1):
+                text = "\n".join(lines[:end])
+                if parser.update(text) != expected(text):
+                    failed.append(idx)
+                    break
+        print(f"  {name:<48} {'OK' if not failed else f'FAILED ({len(failed)})'}")
+        if failed:
+            failures[name] = failed
+
+    name = "worklog policy: leading-digit fixes"
+    failed = [text for text, expected in WORKLOG_FIXED_CASES if extract_tasks(text) != expected]
+    print(f"  {name:<48} {'OK' if not failed else f'FAILED ({len(failed)})'}")
+    if failed:
+        failures[name] = failed
+
+    # Force every prompt through the LLM; only entries listed as bad must keep regex output
+    name = "llm fallback: bad entries keep regex results"
+    failed = []
+    for case, pack_size, answer, bad in MALFORMED_LLM_CASES:
+        batch = prompts[:2]
+        try:
+            results = parse_prompts_with_llm_fallback(
+                batch, CannedLLM(answer), confidence_threshold=2.0, pack_size=pack_size
+            )
+        except Exception as e:
+            failed.append(f"{case}: {type(e).__name__}: {e}")
+            continue
+        for idx, prompt in enumerate(batch):
+            if idx in bad and results[idx] != parse_prompt(prompt):
+                failed.append(f"{case}: prompt {idx} lost its regex result")
+            if idx not in bad and results[idx] != ("llm@example.com", MALFORMED_LLM_TASKS):
+                failed.append(f"{case}: prompt {idx} lost its LLM result")
+    print(f"  {name:<48} {'OK' if not failed else f'FAILED ({len(failed)})'}")
+    if failed:
+        failures[name] = failed
+
+    return failures
+
+
+def main():
+    if not os.path.exists(DATASET_PATH):
+        print(f"Error: Dataset not found at {DATASET_PATH}")
+        print("Please run generate_dataset.py first.")
+        sys.exit(1)
+
+    failures = run_checks()
+
+    if failures:
+        print("\n Parser regressions found:")
+        for name, failed in failures.items():
+            print(f"  {name}: {failed[:10]}")
+        return 1
+
+    print("\n No parser regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,20 @@
+import argparse
 import csv
 import json
 import os
 import sys
+import time
 from typing import Dict, List, Tuple
 from collections import defaultdict
 
 # Add parent directory to path to import app modules
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-from app.modules.prompt_parser import parse_prompt
+from app.modules.prompt_parser import (
+    parse_prompt_scored,
+    parse_prompts,
+    parse_prompts_with_llm_fallback,
+)
 
 DATASET_PATH = os.path.join(
     os.path.dirname(__file__), "..", "app", "data", "synthetic_dataset.csv"
@@ -17,6 +23,8 @@ RESULTS_PATH = os.path.join(
     os.path.dirname(__file__), "..", "app", "data", "evaluation_results.json"
 )
 
+DEFAULT_THRESHOLDS = [0.0, 0.2, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+
 
 def load_dataset() -> List[Dict]:
     """Load synthetic dataset from CSV."""
@@ -83,7 +91,7 @@ def calculate_task_metrics(predicted: List[str], ground_truth: List[str]) -> Dic
     }
 
 
-def evaluate_parser() -> Dict:
+def evaluate_parser(workers: int = 1) -> Dict:
     """
     Run evaluation on entire dataset.
     Returns comprehensive metrics and failure cases.
@@ -101,14 +109,14 @@ def evaluate_parser() -> Dict:
     
     print(f"Evaluating parser on {total} samples...\n")
     
-    for i, row in enumerate(dataset, 1):
+    parsed = parse_prompts((row["raw_prompt"] for row in dataset), workers=workers)
+    
+    for i, (row, (pred_email, pred_tasks)) in enumerate(zip(dataset, parsed), 1):
         row_id = row["id"]
         raw_prompt = row["raw_prompt"]
         gt_email = normalize_email(row["recipient_email"])
         gt_tasks = json.loads(row["tasks"])
         
-        # Parse with our parser
-        pred_email, pred_tasks = parse_prompt(raw_prompt)
         pred_email_norm = normalize_email(pred_email) if pred_email else ""
         pred_tasks_norm = normalize_tasks(pred_tasks)
         gt_tasks_norm = normalize_tasks(gt_tasks)
@@ -179,6 +187,106 @@ def evaluate_parser() -> Dict:
     return results
 
 
+def evaluate_thresholds(thresholds: List[float]) -> List[Dict]:
+    """
+    Sweep LLM-fallback confidence thresholds.
+    For each threshold, report how many prompts would be sent to the LLM and
+    how accurate the regex results kept below the LLM are. The projected
+    accuracy assumes every routed prompt is fixed by the LLM (upper bound).
+    """
+    dataset = load_dataset()
+    total = len(dataset)
+    
+    scored = []
+    for row in dataset:
+        result = parse_prompt_scored(row["raw_prompt"])
+        email_match = normalize_email(result.recipient_email) == normalize_email(row["recipient_email"])
+        metrics = calculate_task_metrics(
+            normalize_tasks(result.tasks), normalize_tasks(json.loads(row["tasks"]))
+        )
+        scored.append((result.confidence, email_match and metrics["exact_match"]))
+    
+    sweep = []
+    for threshold in thresholds:
+        routed = [correct for confidence, correct in scored if confidence < threshold]
+        kept = [correct for confidence, correct in scored if confidence >= threshold]
+        kept_correct = sum(kept)
+        sweep.append({
+            "threshold": threshold,
+            "llm_calls": len(routed),
+            "llm_call_rate": len(routed) / total,
+            "kept_accuracy": kept_correct / len(kept) if kept else 1.0,
+            "missed_failures": len(kept) - kept_correct,
+            "needless_llm_calls": sum(routed),
+            "projected_accuracy": (kept_correct + len(routed)) / total,
+        })
+    return sweep
+
+
+def print_threshold_sweep(sweep: List[Dict]):
+    """Print LLM-call rate vs accuracy tradeoff table."""
+    print("\n--- LLM FALLBACK THRESHOLD SWEEP ---")
+    print(f"{'Threshold':>9} {'LLM calls':>10} {'Call rate':>10} {'Kept acc':>9} {'Missed':>7} {'Needless':>9} {'Projected':>10}")
+    for row in sweep:
+        print(
+            f"{row['threshold']:>9.2f} {row['llm_calls']:>10} {row['llm_call_rate']:>10.2%} "
+            f"{row['kept_accuracy']:>9.2%} {row['missed_failures']:>7} "
+            f"{row['needless_llm_calls']:>9} {row['projected_accuracy']:>10.2%}"
+        )
+
+
+def evaluate_llm_fallback(
+    pack_size: int,
+    max_concurrency: int,
+    latency: float,
+    failure_rate: float,
+) -> Dict:
+    """
+    Run the batched LLM fallback against the offline stand-in LLM.
+    Reports request count, peak concurrency, wall time and accuracy.
+    """
+    from llm_standin import StandInLLM
+    
+    dataset = load_dataset()
+    llm = StandInLLM(latency=latency, failure_rate=failure_rate)
+    
+    start = time.perf_counter()
+    parsed = parse_prompts_with_llm_fallback(
+        [row["raw_prompt"] for row in dataset],
+        llm_client=llm,
+        max_concurrency=max_concurrency,
+        pack_size=pack_size,
+    )
+    elapsed = time.perf_counter() - start
+    
+    exact_matches = 0
+    for row, (pred_email, pred_tasks) in zip(dataset, parsed):
+        email_match = normalize_email(pred_email) == normalize_email(row["recipient_email"])
+        metrics = calculate_task_metrics(
+            normalize_tasks(pred_tasks), normalize_tasks(json.loads(row["tasks"]))
+        )
+        if email_match and metrics["exact_match"]:
+            exact_matches += 1
+    
+    return {
+        "pack_size": pack_size,
+        "max_concurrency": max_concurrency,
+        "llm_requests": llm.calls,
+        "peak_in_flight": llm.max_in_flight,
+        "wall_time_sec": elapsed,
+        "exact_match_rate": exact_matches / len(dataset),
+    }
+
+
+def print_llm_fallback(results: Dict):
+    """Print stand-in LLM fallback run summary."""
+    print("\n--- BATCHED LLM FALLBACK (STAND-IN LLM) ---")
+    print(f"Pack size: {results['pack_size']}, Max concurrency: {results['max_concurrency']}")
+    print(f"LLM requests: {results['llm_requests']} (peak in flight: {results['peak_in_flight']})")
+    print(f"Wall time: {results['wall_time_sec']:.2f}s")
+    print(f"Exact Match Rate: {results['exact_match_rate']:.2%}")
+
+
 def print_results(results: Dict):
     """Print evaluation results in a readable format."""
     print("\n" + "=" * 80)
@@ -226,14 +334,58 @@ def save_results(results: Dict):
     print(f"\nDetailed results saved to: {RESULTS_PATH}")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evaluate prompt parser accuracy")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parser processes (default: 1 = in-process; a pool only starts past "
+        "the batch size measured by benchmark_parser.py --pool-crossover)",
+    )
+    parser.add_argument(
+        "--sweep-thresholds",
+        nargs="*",
+        type=float,
+        default=None,
+        metavar="THRESHOLD",
+        help="Also report LLM-call rate vs accuracy across confidence thresholds",
+    )
+    parser.add_argument(
+        "--llm-standin",
+        action="store_true",
+        help="Also run the batched LLM fallback against the offline stand-in LLM",
+    )
+    parser.add_argument("--pack-size", type=int, default=1, help="Logs per stand-in LLM request")
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="Max concurrent stand-in LLM requests")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Simulated seconds per LLM request")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0, help="Simulated LLM failure rate")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+    
     if not os.path.exists(DATASET_PATH):
         print(f"Error: Dataset not found at {DATASET_PATH}")
         print("Please run generate_dataset.py first.")
         sys.exit(1)
     
-    results = evaluate_parser()
+    results = evaluate_parser(workers=args.workers)
     print_results(results)
+    
+    if args.sweep_thresholds is not None:
+        results["llm_threshold_sweep"] = evaluate_thresholds(args.sweep_thresholds or DEFAULT_THRESHOLDS)
+        print_threshold_sweep(results["llm_threshold_sweep"])
+    
+    if args.llm_standin:
+        results["llm_fallback"] = evaluate_llm_fallback(
+            pack_size=args.pack_size,
+            max_concurrency=args.llm_concurrency,
+            latency=args.llm_latency,
+            failure_rate=args.llm_failure_rate,
+        )
+        print_llm_fallback(results["llm_fallback"])
     save_results(results)
     
     # Exit code based on performance
@@ -0,0 +1,117 @@
+"""
+Frozen copies of the original prompt_parser extractors.
+Used only as baselines by the parser benchmark and regression scripts.
+"""
+import os
+import re
+import sys
+from typing import List
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.modules.prompt_parser import EMAIL_REGEX
+
+
+def legacy_extract_task_lines(raw_prompt: str) -> List[str]:
+    """
+    Frozen copy of the original multi-pass extractor.
+    Kept only as the baseline for equivalence checks and timing.
+    """
+    lines = raw_prompt.splitlines()
+    tasks: List[str] = []
+
+    skip_patterns = [
+        r"^(send\s+to|recipient|to|date|for\s+date)[\s:=-]",
+        r"^(today'?s?\s+tasks?|summary|work\s+log|tasks?\s+completed)[\s:]",
+    ]
+
+    def should_skip_line(line: str) -> bool:
+        line_lower = line.lower().strip()
+        if not line_lower:
+            return True
+        for pattern in skip_patterns:
+            if re.match(pattern, line_lower):
+                return True
+        if EMAIL_REGEX.search(line):
+            return True
+        return False
+
+    for line in lines:
+        stripped = line.strip()
+        if should_skip_line(line):
+            continue
+        if stripped.startswith("- ") or stripped.startswith("* "):
+            task = stripped[2:].strip()
+            if task:
+                tasks.append(task)
+            continue
+        num_match = re.match(r"^\d+[\.\)]\s+(.+)", stripped)
+        if num_match:
+            task = num_match.group(1).strip()
+            if task:
+                tasks.append(task)
+            continue
+
+    if tasks:
+        return tasks
+
+    header_keywords = [
+        "today's tasks",
+        "tasks completed today",
+        "summary of today's work",
+        "work log for today",
+        "here is what i completed today",
+        "completed today",
+        "today i",
+    ]
+
+    normalized_lines = [l.lower() for l in lines]
+    start_idx = -1
+
+    for idx, l in enumerate(normalized_lines):
+        if any(keyword in l for keyword in header_keywords):
+            start_idx = idx + 1
+            break
+
+    if start_idx != -1:
+        for line in lines[start_idx:]:
+            if should_skip_line(line):
+                continue
+            stripped = line.strip()
+            if len(stripped) > 5:
+                tasks.append(stripped)
+
+    if not tasks:
+        for line in lines:
+            if should_skip_line(line):
+                continue
+            stripped = line.strip()
+            if len(stripped) > 10:
+                tasks.append(stripped)
+
+    return tasks
+
+
+def legacy_extract_tasks(text: str) -> list:
+    """
+    Frozen copy of the original extract_tasks.
+    Note the per-line lstrip also eats leading digits of the task itself.
+    """
+    lines = text.strip().split("\n")
+    tasks = []
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.lower().startswith(("today", "completed", "tasks:", "work log")):
+            continue
+
+        cleaned = line.lstrip("•-*#123456789.").strip()
+
+        if cleaned:
+            tasks.append(cleaned)
+
+    return tasks
@@ -0,0 +1,72 @@
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from typing import Dict, List
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.modules.prompt_parser import parse_prompt
+
+SINGLE_LOG_REGEX = re.compile(r"Work log:\n(.*?)\n\nRespond in JSON format:", re.DOTALL)
+PACKED_LOG_REGEX = re.compile(r"### Log (\d+)\n(.*?)(?=\n\n### Log \d+\n|\n\nRespond with a JSON array)", re.DOTALL)
+
+
+class StandInLLM:
+    """
+    Offline stand-in for the fallback LLM client.
+
+    Answers the extraction prompts built by prompt_parser (single and packed)
+    by running the regex parser on each embedded log and naively splitting
+    inline comma-separated task lists. Latency and failure rate are tunable
+    so batching, concurrency and per-prompt fallback can be exercised
+    without network access.
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 42):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _extract(self, raw_prompt: str) -> Dict:
+        email, tasks = parse_prompt(raw_prompt)
+        split_tasks: List[str] = []
+        for task in tasks:
+            split_tasks.extend(part.strip() for part in task.split(",") if part.strip())
+        return {"recipient_email": email, "tasks": split_tasks}
+
+    def invoke(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+            fail = self._random.random() < self.failure_rate
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if fail:
+                raise RuntimeError("stand-in LLM simulated failure")
+
+            packed = PACKED_LOG_REGEX.findall(prompt)
+            if packed:
+                answer = [
+                    {"index": int(idx), **self._extract(raw_prompt)}
+                    for idx, raw_prompt in packed
+                ]
+                return json.dumps(answer)
+
+            match = SINGLE_LOG_REGEX.search(prompt)
+            if not match:
+                return "I could not find a work log."
+            return "```json\n" + json.dumps(self._extract(match.group(1))) + "\n```"
+        finally:
+            with self._lock:
+                self._in_flight -= 1